@@ -39,6 +39,31 @@ def add_missing_columns():
                 "ALTER TABLE review ADD COLUMN IF NOT EXISTS voice_recording_path VARCHAR(500);",
                 "ALTER TABLE review ADD COLUMN IF NOT EXISTS voice_transcription TEXT;",
                 "ALTER TABLE review ADD COLUMN IF NOT EXISTS review_category VARCHAR(100);",
+                
+                # Reviews queued for AI enrichment, and the claim on them
+                "ALTER TABLE review ADD COLUMN IF NOT EXISTS enrichment_pending BOOLEAN NOT NULL DEFAULT FALSE;",
+                "ALTER TABLE review ADD COLUMN IF NOT EXISTS enrichment_locked_until TIMESTAMP;",
+                
+                # Referral rewards are sent once per review
+                "ALTER TABLE referral ADD COLUMN IF NOT EXISTS review_id INTEGER;",
+                
+                # Link review requests to bulk campaigns
+                "ALTER TABLE review_request ADD COLUMN IF NOT EXISTS campaign_id INTEGER;",
+                "ALTER TABLE IF EXISTS outbound_email ADD COLUMN IF NOT EXISTS campaign_id INTEGER;",
+                
+                # Rendered subjects can be longer than the 200 characters first allowed
+                "ALTER TABLE IF EXISTS outbound_email ALTER COLUMN subject TYPE TEXT;",
+                
+                # Email attachments stored with the queued email
+                "ALTER TABLE IF EXISTS outbound_email ADD COLUMN IF NOT EXISTS attachment_name VARCHAR(255);",
+                "ALTER TABLE IF EXISTS outbound_email ADD COLUMN IF NOT EXISTS attachment_data BYTEA;",
+                
+                # Follow-ups are marked sent or failed by the outbox worker
+                "ALTER TABLE IF EXISTS outbound_email ADD COLUMN IF NOT EXISTS follow_up_id INTEGER;",
+                
+                # Timing of scheduled report generation
+                "ALTER TABLE report_generation ADD COLUMN IF NOT EXISTS collect_ms INTEGER;",
+                "ALTER TABLE report_generation ADD COLUMN IF NOT EXISTS render_ms INTEGER;",
             ]
             
             print("Adding missing columns to existing tables...")
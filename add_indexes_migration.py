@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Build the composite indexes declared on the models in an existing database.
+On PostgreSQL the indexes are created with CREATE INDEX CONCURRENTLY so the
+production tables stay writable while they build.
+"""
+
+import sys
+from sqlalchemy import text
+
+def index_statements(dialect_name):
+    """Yield (index name, SQL) for every index declared in models.py"""
+    from app import db
+    import models  # noqa: F401 - registers the tables on the metadata
+
+    concurrently = "CONCURRENTLY " if dialect_name == 'postgresql' else ""
+
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            columns = ", ".join(column.name for column in index.columns)
+            unique = "UNIQUE " if index.unique else ""
+            yield index.name, (
+                f"CREATE {unique}INDEX {concurrently}IF NOT EXISTS {index.name} "
+                f"ON {table.name} ({columns});"
+            )
+
+def add_missing_indexes():
+    """Create any declared index that is missing from the database"""
+    try:
+        from app import app, db
+
+        with app.app_context():
+            engine = db.engine
+            dialect_name = engine.dialect.name
+            print(f"Connecting to {dialect_name} database...")
+
+            # CONCURRENTLY cannot run inside a transaction block
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for name, sql_command in index_statements(dialect_name):
+                    try:
+                        conn.execute(text(sql_command))
+                        print(f"✓ Executed: {sql_command}")
+                    except Exception as e:
+                        print(f"⚠ Skipped: {name} - {str(e)}")
+
+                if dialect_name == 'postgresql':
+                    # A failed concurrent build leaves an INVALID index behind
+                    invalid = conn.execute(text(
+                        "SELECT c.relname FROM pg_index i "
+                        "JOIN pg_class c ON c.oid = i.indexrelid "
+                        "WHERE NOT i.indisvalid"
+                    )).scalars().all()
+                    for name in invalid:
+                        print(f"⚠ Index {name} is INVALID - drop it and re-run this script")
+
+            print("✓ Index migration completed successfully!")
+
+    except Exception as e:
+        print(f"✗ Index migration failed: {str(e)}")
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    success = add_missing_indexes()
+    sys.exit(0 if success else 1)
@@ -1,157 +1,723 @@
 import os
 import json
+import time
+import random
+import hashlib
 import logging
+import tempfile
 import requests
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from threading import Lock
 from typing import Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+
+from metrics import registry
 
 logger = logging.getLogger(__name__)
 
-class MistralAIService:
-    """Service class for Mistral AI API interactions"""
+class CompletionCache(ABC):
+    """
+    Base class for completion caches. Entries are keyed by a hash of the
+    request payload and expire after ttl seconds; backends evict the least
+    recently used entries once max_entries is exceeded.
+    """
     
-    def __init__(self):
-        self.api_key = os.environ.get('MISTRAL_API_KEY')
-        self.base_url = "https://api.mistral.ai/v1"
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+    def __init__(self, ttl: int = 86400, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self._counter_lock = Lock()
+    
+    @staticmethod
+    def make_key(endpoint: str, data: dict) -> str:
+        """Content address of a request: model, messages, temperature and the other sampling options"""
+        payload = json.dumps({"endpoint": endpoint, **data}, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[dict]:
+        value = self._get(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+    
+    def set(self, key: str, value: dict):
+        self._set(key, value)
+    
+    def record_bypass(self):
+        with self._counter_lock:
+            self.bypasses += 1
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "evictions": self.evictions,
+            "size": self.size(),
         }
     
-    def _make_request(self, endpoint: str, data: dict) -> Optional[dict]:
-        """Make API request to Mistral"""
+    @abstractmethod
+    def _get(self, key: str) -> Optional[dict]:
+        pass
+    
+    @abstractmethod
+    def _set(self, key: str, value: dict):
+        pass
+    
+    @abstractmethod
+    def size(self) -> int:
+        pass
+    
+    @abstractmethod
+    def clear(self):
+        pass
+
+class MemoryCompletionCache(CompletionCache):
+    """In-process LRU cache"""
+    
+    def __init__(self, ttl: int = 86400, max_entries: int = 1024):
+        super().__init__(ttl, max_entries)
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = Lock()
+    
+    def _get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def _set(self, key: str, value: dict):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def size(self) -> int:
+        return len(self._entries)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class DatabaseCompletionCache(CompletionCache):
+    """
+    Cache stored in a database table, shared by every process that points at
+    the same database. Uses its own engine so it works outside the Flask app
+    context (e.g. from worker threads).
+    """
+    
+    def __init__(self, database_url: str = "sqlite:///ai_completion_cache.db",
+                 ttl: int = 86400, max_entries: int = 10000):
+        super().__init__(ttl, max_entries)
+        from sqlalchemy import create_engine, MetaData, Table, Column, String, Text, Float
+        
+        self.engine = create_engine(database_url, pool_pre_ping=True)
+        self.table = Table(
+            'ai_completion_cache', MetaData(),
+            Column('key', String(64), primary_key=True),
+            Column('response', Text, nullable=False),
+            Column('expires_at', Float, nullable=False, index=True),
+            Column('last_used_at', Float, nullable=False, index=True),
+        )
+        self.table.create(self.engine, checkfirst=True)
+    
+    def _get(self, key: str) -> Optional[dict]:
+        from sqlalchemy import select, update
+        
+        now = time.time()
         try:
-            response = requests.post(
-                f"{self.base_url}/{endpoint}",
-                headers=self.headers,
-                json=data,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            logger.error(f"Mistral API error: {e}")
+            with self.engine.begin() as conn:
+                row = conn.execute(
+                    select(self.table.c.response).where(
+                        self.table.c.key == key,
+                        self.table.c.expires_at > now
+                    )
+                ).first()
+                if row is None:
+                    return None
+                conn.execute(update(self.table).where(self.table.c.key == key).values(last_used_at=now))
+                return json.loads(row.response)
+        except Exception as e:
+            logger.warning(f"Completion cache read failed: {e}")
             return None
     
-    def analyze_sentiment(self, text: str) -> Tuple[str, float]:
-        """
-        Analyze sentiment of review text
-        Returns: (sentiment, confidence_score)
-        """
-        prompt = f"""Analyze the sentiment of this customer review and categorize it as one of: satisfied, confused, frustrated, angry, neutral.
+    def _set(self, key: str, value: dict):
+        from sqlalchemy import delete, insert, select, func
+        
+        now = time.time()
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(delete(self.table).where(self.table.c.key == key))
+                conn.execute(insert(self.table).values(
+                    key=key,
+                    response=json.dumps(value),
+                    expires_at=now + self.ttl,
+                    last_used_at=now
+                ))
+            
+            with self.engine.begin() as conn:
+                expired = conn.execute(delete(self.table).where(self.table.c.expires_at <= now)).rowcount
+                overflow = conn.execute(select(func.count()).select_from(self.table)).scalar() - self.max_entries
+                if overflow > 0:
+                    oldest = select(self.table.c.key).order_by(self.table.c.last_used_at).limit(overflow)
+                    overflow = conn.execute(delete(self.table).where(self.table.c.key.in_(oldest))).rowcount
+                with self._counter_lock:
+                    self.evictions += max(expired, 0) + max(overflow, 0)
+        except Exception as e:
+            # Another process may have cached the same key first
+            logger.warning(f"Completion cache write failed: {e}")
+    
+    def size(self) -> int:
+        from sqlalchemy import select, func
+        
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(self.table)).scalar()
+    
+    def clear(self):
+        from sqlalchemy import delete
+        
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table))
 
-Review: "{text}"
+def create_completion_cache() -> Optional[CompletionCache]:
+    """Build the completion cache selected by AI_CACHE_BACKEND (memory, database or none)"""
+    backend = os.environ.get('AI_CACHE_BACKEND', 'memory').lower()
+    ttl = int(os.environ.get('AI_CACHE_TTL', 86400))
+    
+    if backend == 'none':
+        return None
+    if backend == 'database':
+        database_url = os.environ.get('AI_CACHE_DATABASE_URL', 'sqlite:///ai_completion_cache.db')
+        max_entries = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 10000))
+        return DatabaseCompletionCache(database_url, ttl, max_entries)
+    
+    max_entries = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 1024))
+    return MemoryCompletionCache(ttl, max_entries)
 
-Respond with only the sentiment category and a confidence score (0-1) in this exact format:
-SENTIMENT: [category]
-CONFIDENCE: [score]"""
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
 
-        data = {
-            "model": "mistral-small-latest",
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 100,
-            "temperature": 0.1
-        }
+_request_priority = ContextVar('mistral_request_priority', default=BACKGROUND)
+
+@contextmanager
+def ai_priority(priority: str):
+    """
+    Run the enclosed AI calls in the given rate limit lane, e.g.
+        with ai_priority(INTERACTIVE):
+            mistral_service.generate_response_suggestion(...)
+    Calls default to the BACKGROUND lane.
+    """
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+class RateLimitBackend(ABC):
+    """
+    Storage for the shared token buckets. Subclasses only need to apply
+    update() atomically across every process that shares the limit.
+    """
+    
+    @abstractmethod
+    def update(self, apply):
+        """Call apply(state) -> result with exclusive access to the mutable state dict"""
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Buckets held in this process only"""
+    
+    def __init__(self):
+        self._state = {}
+        self._lock = Lock()
+    
+    def update(self, apply):
+        with self._lock:
+            return apply(self._state)
+
+class FileRateLimitBackend(RateLimitBackend):
+    """Buckets kept in a JSON file guarded by an exclusive flock, shared by all workers on a host"""
+    
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'reviewpilot_mistral_ratelimit.json')
+    
+    def update(self, apply):
+        import fcntl
         
-        response = self._make_request("chat/completions", data)
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    state = {}
+                result = apply(state)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+class RateLimiter:
+    """
+    Client-side token buckets for requests/minute and tokens/minute.
+    
+    Callers wait for capacity instead of failing. Background calls leave a
+    reserved share of both buckets for interactive calls (which works across
+    processes because it is part of the shared bucket check) and also step
+    aside while an interactive call in this process is waiting.
+    """
+    
+    def __init__(self, backend: RateLimitBackend, requests_per_minute: int, tokens_per_minute: int,
+                 background_reserve: float = 0.2, max_wait: Dict[str, float] = None):
+        self.backend = backend
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.background_reserve = background_reserve
+        self.max_wait = max_wait or {INTERACTIVE: 10.0, BACKGROUND: 60.0}
+        self.throttled = 0
+        self.rejected = 0
+        self._interactive_waiting = 0
+        self._lock = Lock()
+    
+    def _take(self, requests_needed: int, tokens_needed: int, priority: str):
+        rpm, tpm = self.requests_per_minute, self.tokens_per_minute
+        tokens_needed = min(tokens_needed, tpm)
+        reserve = self.background_reserve if priority == BACKGROUND else 0.0
         
-        if response and 'choices' in response:
-            content = response['choices'][0]['message']['content'].strip()
-            
-            # Parse response
-            sentiment = "neutral"
-            confidence = 0.5
+        def apply(state):
+            now = time.time()
+            elapsed = max(now - state.get('updated_at', now), 0.0)
+            request_level = min(rpm, state.get('requests', rpm) + elapsed * rpm / 60)
+            token_level = min(tpm, state.get('tokens', tpm) + elapsed * tpm / 60)
             
-            lines = content.split('\n')
-            for line in lines:
-                if line.startswith('SENTIMENT:'):
-                    sentiment = line.split(':', 1)[1].strip().lower()
-                elif line.startswith('CONFIDENCE:'):
-                    try:
-                        confidence = float(line.split(':', 1)[1].strip())
-                    except:
-                        confidence = 0.5
+            wait = max(
+                (requests_needed + reserve * rpm - request_level) / (rpm / 60),
+                (tokens_needed + reserve * tpm - token_level) / (tpm / 60),
+                0.0
+            )
+            if wait == 0.0:
+                request_level -= requests_needed
+                token_level -= tokens_needed
             
-            return sentiment, confidence
+            state.update(requests=request_level, tokens=token_level, updated_at=now)
+            return wait
         
-        return "neutral", 0.5
+        return self.backend.update(apply)
     
-    def generate_response_suggestion(self, review_text: str, rating: int, business_name: str, tone: str = "professional") -> str:
-        """
-        Generate AI response suggestion for a review
-        """
-        tone_instructions = {
-            "professional": "professional and courteous",
-            "friendly": "warm and friendly", 
-            "casual": "casual and conversational"
-        }
+    def try_acquire(self, tokens: int, priority: str = None) -> float:
+        """Take capacity if available; returns 0 on success or the seconds to wait before retrying"""
+        priority = priority or _request_priority.get()
+        if priority == BACKGROUND and self._interactive_waiting:
+            return 0.05
+        return self._take(1, tokens, priority)
+    
+    def _start_wait(self, priority: str):
+        with self._lock:
+            self.throttled += 1
+            if priority == INTERACTIVE:
+                self._interactive_waiting += 1
+    
+    def _end_wait(self, priority: str, acquired: bool):
+        with self._lock:
+            if priority == INTERACTIVE:
+                self._interactive_waiting -= 1
+            if not acquired:
+                self.rejected += 1
+    
+    def acquire(self, tokens: int, priority: str = None) -> bool:
+        """Block until capacity is available or the lane's max wait runs out"""
+        priority = priority or _request_priority.get()
+        wait = self.try_acquire(tokens, priority)
+        if wait == 0.0:
+            return True
+        
+        self._start_wait(priority)
+        deadline = time.monotonic() + self.max_wait.get(priority, 0)
+        acquired = False
+        try:
+            while time.monotonic() + wait <= deadline:
+                time.sleep(wait)
+                wait = self.try_acquire(tokens, priority)
+                if wait == 0.0:
+                    acquired = True
+                    break
+        finally:
+            self._end_wait(priority, acquired)
+        return acquired
+    
+    async def acquire_async(self, tokens: int, priority: str = None) -> bool:
+        """Async counterpart of acquire"""
+        import asyncio
         
-        tone_style = tone_instructions.get(tone, "professional and courteous")
+        priority = priority or _request_priority.get()
+        wait = self.try_acquire(tokens, priority)
+        if wait == 0.0:
+            return True
         
-        prompt = f"""You are a customer service representative for {business_name}. Generate a {tone_style} response to this customer review.
+        self._start_wait(priority)
+        deadline = time.monotonic() + self.max_wait.get(priority, 0)
+        acquired = False
+        try:
+            while time.monotonic() + wait <= deadline:
+                await asyncio.sleep(wait)
+                wait = self.try_acquire(tokens, priority)
+                if wait == 0.0:
+                    acquired = True
+                    break
+        finally:
+            self._end_wait(priority, acquired)
+        return acquired
+    
+    @staticmethod
+    def estimate_tokens(data: dict) -> int:
+        """Rough prompt size (4 characters per token) plus the completion budget"""
+        prompt_chars = sum(len(m.get('content', '')) for m in data.get('messages', []))
+        return prompt_chars // 4 + int(data.get('max_tokens', 0))
 
-Rating: {rating}/5 stars
-Review: "{review_text}"
+def create_rate_limiter() -> Optional[RateLimiter]:
+    """Build the rate limiter selected by MISTRAL_RATE_LIMIT_BACKEND (file, memory or none)"""
+    backend_name = os.environ.get('MISTRAL_RATE_LIMIT_BACKEND', 'file').lower()
+    if backend_name == 'none':
+        return None
+    
+    if backend_name == 'memory':
+        backend = MemoryRateLimitBackend()
+    else:
+        backend = FileRateLimitBackend(os.environ.get('MISTRAL_RATE_LIMIT_FILE'))
+    
+    return RateLimiter(
+        backend,
+        requests_per_minute=int(os.environ.get('MISTRAL_REQUESTS_PER_MINUTE', 60)),
+        tokens_per_minute=int(os.environ.get('MISTRAL_TOKENS_PER_MINUTE', 500000)),
+        background_reserve=float(os.environ.get('MISTRAL_BACKGROUND_RESERVE', 0.2))
+    )
 
-Guidelines:
-- Be empathetic and understanding
-- Thank the customer for their feedback
-- Address specific concerns if rating is low
-- For high ratings, express gratitude and encourage future visits
-- Keep response under 150 words
-- Be genuine and avoid overly scripted language
+class CircuitBreaker:
+    """
+    Fails fast after repeated upstream failures. Once failure_threshold
+    consecutive failures are seen the circuit opens and calls are refused
+    for recovery_timeout seconds; after that one trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit. Calls
+    that fail without reaching an unhealthy upstream (client errors,
+    unparseable bodies, rate limit waits) count as neither.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = Lock()
+    
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Mistral circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+    
+    def release(self):
+        """End a call that says nothing about upstream health, such as a client error"""
+        with self._lock:
+            self._trial_in_flight = False
 
-Response:"""
+MISTRAL_CALLS = registry.counter(
+    'mistral_calls_total', 'Mistral calls by service method and outcome', ['method', 'outcome'])
+MISTRAL_CALL_SECONDS = registry.histogram(
+    'mistral_call_duration_seconds', 'Time for a Mistral call including retries, by service method', ['method'])
 
-        data = {
-            "model": "mistral-small-latest",
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 200,
-            "temperature": 0.7
+class EndpointLatency:
+    """Running latency and outcome totals for one API endpoint"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.rate_limited = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+    
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "short_circuited": self.short_circuited,
+            "rate_limited": self.rate_limited,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 1) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 1),
+        }
+
+class BaseMistralService:
+    """Configuration, caching, resilience and prompts shared by the sync and async Mistral clients"""
+    
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    # Sampling above this temperature is only cached when the caller opts in
+    MAX_CACHEABLE_TEMPERATURE = 0.5
+    
+    # How long analyze_sentiment and categorize_feedback share one analysis of a text
+    ANALYSIS_MEMO_SECONDS = 300
+    ANALYSIS_MEMO_SIZE = 256
+    
+    SENTIMENTS = ('satisfied', 'confused', 'frustrated', 'angry', 'neutral')
+    CATEGORIES = ('complaint', 'praise', 'suggestion')
+    TONE_INSTRUCTIONS = {
+        "professional": "professional and courteous",
+        "friendly": "warm and friendly",
+        "casual": "casual and conversational"
+    }
+    
+    def __init__(self, cache: Optional[CompletionCache] = None, rate_limiter: Optional[RateLimiter] = None):
+        self.api_key = os.environ.get('MISTRAL_API_KEY')
+        self.base_url = os.environ.get('MISTRAL_BASE_URL', "https://api.mistral.ai/v1").rstrip('/')
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
         }
+        self.cache = cache
+        self.rate_limiter = rate_limiter
         
-        response = self._make_request("chat/completions", data)
+        self.max_retries = int(os.environ.get('MISTRAL_MAX_RETRIES', 3))
+        self.backoff_base = float(os.environ.get('MISTRAL_BACKOFF_BASE', 0.5))
+        self.backoff_max = float(os.environ.get('MISTRAL_BACKOFF_MAX', 10))
+        self.timeout = (
+            float(os.environ.get('MISTRAL_CONNECT_TIMEOUT', 5)),
+            float(os.environ.get('MISTRAL_READ_TIMEOUT', 30))
+        )
+        # Total time one call may spend on attempts and backoff, by rate limit lane
+        self.deadlines = {
+            INTERACTIVE: float(os.environ.get('MISTRAL_INTERACTIVE_DEADLINE', 15)),
+            BACKGROUND: float(os.environ.get('MISTRAL_BACKGROUND_DEADLINE', 120)),
+        }
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.environ.get('MISTRAL_BREAKER_THRESHOLD', 5)),
+            recovery_timeout=float(os.environ.get('MISTRAL_BREAKER_RECOVERY', 30))
+        )
         
-        if response and 'choices' in response:
-            return response['choices'][0]['message']['content'].strip()
+        self._latency = {}
+        self._latency_lock = Lock()
         
-        return f"Thank you for your {rating}-star review. We appreciate your feedback and look forward to serving you again."
+        self._analyses = OrderedDict()
+        self._analyses_lock = Lock()
     
-    def categorize_feedback(self, text: str) -> str:
+    def _remembered_analysis(self, text: str) -> Optional[Dict]:
+        """A recent analyze_review(text, include_response=False) result, if there is one"""
+        with self._analyses_lock:
+            hit = self._analyses.get(text)
+            if hit is None or hit[0] <= time.monotonic():
+                return None
+            self._analyses.move_to_end(text)
+            return hit[1]
+    
+    def _remember_analysis(self, text: str, analysis: Dict):
+        with self._analyses_lock:
+            self._analyses[text] = (time.monotonic() + self.ANALYSIS_MEMO_SECONDS, analysis)
+            self._analyses.move_to_end(text)
+            while len(self._analyses) > self.ANALYSIS_MEMO_SIZE:
+                self._analyses.popitem(last=False)
+    
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-endpoint call counts, outcomes and latency"""
+        with self._latency_lock:
+            return {endpoint: stats.as_dict() for endpoint, stats in self._latency.items()}
+    
+    def _record_latency(self, endpoint: str, **changes):
+        with self._latency_lock:
+            stats = self._latency.setdefault(endpoint, EndpointLatency())
+            seconds = changes.pop('seconds', None)
+            if seconds is not None:
+                stats.calls += 1
+                stats.total_seconds += seconds
+                stats.max_seconds = max(stats.max_seconds, seconds)
+            for name, delta in changes.items():
+                setattr(stats, name, getattr(stats, name) + delta)
+    
+    @staticmethod
+    def _observe_call(method: str, outcome: str, seconds: float = None):
+        """Export one call's outcome (ok, failed, rate_limited, circuit_open, cached) and time"""
+        MISTRAL_CALLS.inc(method=method, outcome=outcome)
+        if seconds is not None:
+            MISTRAL_CALL_SECONDS.observe(seconds, method=method)
+    
+    def _call_deadline(self) -> float:
+        """Monotonic time by which the current call must stop retrying"""
+        return time.monotonic() + self.deadlines.get(_request_priority.get(), self.deadlines[BACKGROUND])
+    
+    def _attempt_timeout(self, deadline: float) -> Tuple[float, float]:
+        """Connect and read timeouts for one attempt, cut short by the call's deadline"""
+        remaining = max(deadline - time.monotonic(), 0.1)
+        return min(self.timeout[0], remaining), min(self.timeout[1], remaining)
+    
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After when it sends one"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def _cache_key(self, endpoint: str, data: dict, cache: Optional[bool]) -> Optional[str]:
         """
-        Categorize feedback as complaint, praise, or suggestion
+        Cache key for a request, or None when it should not be cached.
+        cache=None caches low-temperature requests only, True always caches
+        and False skips the cache.
         """
-        prompt = f"""Categorize this customer feedback as one of: complaint, praise, suggestion
+        if self.cache is None:
+            return None
+        if cache is None:
+            cache = data.get('temperature', 0) <= self.MAX_CACHEABLE_TEMPERATURE
+        if not cache:
+            self.cache.record_bypass()
+            return None
+        return self.cache.make_key(endpoint, data)
+    
+    @staticmethod
+    def _fallback_response(rating: int) -> str:
+        return f"Thank you for your {rating}-star review. We appreciate your feedback and look forward to serving you again."
+    
+    @classmethod
+    def _review_analysis_request(cls, review_text: str, rating: Optional[int], business_name: Optional[str],
+                                 tone: str, include_response: bool) -> dict:
+        """Build the chat completion payload for analyze_review"""
+        fields = f"""- "sentiment": one of {", ".join(cls.SENTIMENTS)}
+- "confidence": a number from 0 to 1 for the sentiment
+- "category": one of {", ".join(cls.CATEGORIES)}"""
+        
+        if include_response:
+            tone_style = cls.TONE_INSTRUCTIONS.get(tone, "professional and courteous")
+            fields += f"""
+- "suggested_response": a {tone_style} reply from a customer service representative for {business_name or "our business"}. Be empathetic, thank the customer, address specific concerns if the rating is low, express gratitude and encourage future visits if it is high, stay under 150 words and avoid overly scripted language."""
+        
+        prompt = f"""Analyze this customer review.
 
-Feedback: "{text}"
+Rating: {rating if rating is not None else "unknown"}/5 stars
+Review: "{review_text}"
 
-Respond with only the category:"""
+Respond with only a JSON object with these keys:
+{fields}"""
 
-        data = {
+        return {
             "model": "mistral-small-latest",
             "messages": [
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": 20,
-            "temperature": 0.1
+            "max_tokens": 300 if include_response else 60,
+            "temperature": 0.3 if include_response else 0.1,
+            "response_format": {"type": "json_object"}
+        }
+    
+    @classmethod
+    def _parse_review_analysis(cls, response: Optional[dict], rating: Optional[int], include_response: bool) -> Dict:
+        """Validate an analyze_review completion field by field, falling back to defaults"""
+        result = {
+            "sentiment": "neutral",
+            "confidence": 0.5,
+            "category": "feedback",
+            "suggested_response": cls._fallback_response(rating) if include_response else None
         }
         
-        response = self._make_request("chat/completions", data)
+        if not (response and 'choices' in response):
+            return result
         
-        if response and 'choices' in response:
-            category = response['choices'][0]['message']['content'].strip().lower()
-            if category in ['complaint', 'praise', 'suggestion']:
-                return category
+        parsed = cls._parse_json_content(response['choices'][0]['message']['content'])
+        if not parsed:
+            logger.warning("Mistral returned unparseable review analysis, using fallbacks")
+            return result
+        
+        sentiment = str(parsed.get('sentiment', '')).strip().lower()
+        if sentiment in cls.SENTIMENTS:
+            result['sentiment'] = sentiment
+        
+        try:
+            result['confidence'] = min(max(float(parsed.get('confidence')), 0.0), 1.0)
+        except (TypeError, ValueError):
+            pass
+        
+        category = str(parsed.get('category', '')).strip().lower()
+        if category in cls.CATEGORIES:
+            result['category'] = category
+        
+        suggestion = parsed.get('suggested_response')
+        if include_response and isinstance(suggestion, str) and suggestion.strip():
+            result['suggested_response'] = suggestion.strip()
         
-        return "feedback"
+        return result
     
-    def generate_follow_up_email(self, customer_name: str, business_name: str, step: int, incentive: str = None) -> Dict[str, str]:
-        """
-        Generate follow-up email content for sequence steps
-        """
+    @staticmethod
+    def _parse_json_content(content: str) -> Optional[dict]:
+        """Parse a JSON object from model output, tolerating markdown code fences"""
+        content = content.strip()
+        if content.startswith('```'):
+            content = content.strip('`')
+            if content.startswith('json'):
+                content = content[4:]
+        try:
+            parsed = json.loads(content)
+        except ValueError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
+    
+    @staticmethod
+    def _follow_up_request(customer_name: str, business_name: str, step: int, incentive: Optional[str]) -> dict:
+        """Build the chat completion payload for generate_follow_up_email"""
         step_prompts = {
             1: f"Write a friendly reminder email asking {customer_name} to leave a review for {business_name}. Keep it brief and polite.",
             2: f"Write a second follow-up email to {customer_name} emphasizing the importance of customer feedback for {business_name}. Mention how reviews help improve service.",
@@ -161,7 +727,7 @@ Respond with only the category:"""
         prompt = step_prompts.get(step, step_prompts[1])
         prompt += "\n\nProvide both a subject line and email body. Format as:\nSUBJECT: [subject]\nBODY: [body]"
         
-        data = {
+        return {
             "model": "mistral-small-latest", 
             "messages": [
                 {"role": "user", "content": prompt}
@@ -169,9 +735,10 @@ Respond with only the category:"""
             "max_tokens": 300,
             "temperature": 0.7
         }
-        
-        response = self._make_request("chat/completions", data)
-        
+    
+    @staticmethod
+    def _parse_follow_up_email(response: Optional[dict], customer_name: str, business_name: str) -> Dict[str, str]:
+        """Split a follow-up completion into subject and body"""
         if response and 'choices' in response:
             content = response['choices'][0]['message']['content'].strip()
             
@@ -197,5 +764,158 @@ Respond with only the category:"""
             "body": f"Hi {customer_name},\n\nWe'd love to hear about your experience with {business_name}. Your feedback helps us improve our service.\n\nThank you!"
         }
 
+class MistralAIService(BaseMistralService):
+    """Service class for Mistral AI API interactions"""
+    
+    def __init__(self, cache: Optional[CompletionCache] = None, rate_limiter: Optional[RateLimiter] = None):
+        super().__init__(cache, rate_limiter)
+        
+        # Keep-alive connection pool shared by every thread using this service
+        pool_size = int(os.environ.get('MISTRAL_POOL_SIZE', 20))
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    
+    def _make_request(self, endpoint: str, data: dict, cache: Optional[bool] = None,
+                      method: str = None) -> Optional[dict]:
+        """
+        Make API request to Mistral, serving repeats from the completion cache.
+        Returns None on failure, or immediately while the circuit breaker is
+        open, so callers fall back to their canned responses.
+        """
+        cache_key = self._cache_key(endpoint, data, cache)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._observe_call(method or endpoint, 'cached')
+                return cached
+        
+        if not self.circuit_breaker.allow_request():
+            self._record_latency(endpoint, short_circuited=1)
+            self._observe_call(method or endpoint, 'circuit_open')
+            logger.warning(f"Mistral circuit open, skipping {endpoint}")
+            return None
+        
+        started = time.monotonic()
+        deadline = self._call_deadline()
+        result = None
+        upstream_failure = False
+        rate_limited = False
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter and not self.rate_limiter.acquire(self.rate_limiter.estimate_tokens(data)):
+                logger.warning(f"Mistral rate limit wait exceeded, skipping {endpoint}")
+                self._record_latency(endpoint, rate_limited=1)
+                rate_limited = True
+                break
+            
+            response = None
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/{endpoint}",
+                    json=data,
+                    timeout=self._attempt_timeout(deadline)
+                )
+                if response.status_code not in self.RETRY_STATUSES:
+                    response.raise_for_status()
+                    result = response.json()
+                    upstream_failure = False
+                    break
+                upstream_failure = True
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                upstream_failure = True
+                error = str(e)
+            except (requests.RequestException, ValueError) as e:
+                # Client errors won't succeed on retry and don't indicate an outage
+                logger.error(f"Mistral API error: {e}")
+                upstream_failure = False
+                break
+            
+            if attempt == self.max_retries:
+                logger.error(f"Mistral API error after {attempt + 1} attempts: {error}")
+                break
+            delay = self._retry_delay(attempt, response)
+            if time.monotonic() + delay >= deadline:
+                logger.error(f"Mistral API error after {attempt + 1} attempts, out of time to retry: {error}")
+                break
+            logger.warning(f"Mistral API error ({error}), retrying in {delay:.2f}s")
+            self._record_latency(endpoint, retries=1)
+            time.sleep(delay)
+        
+        seconds = time.monotonic() - started
+        self._record_latency(endpoint, seconds=seconds, failures=0 if result is not None else 1)
+        self._observe_call(method or endpoint,
+                           'ok' if result is not None else 'rate_limited' if rate_limited else 'failed', seconds)
+        if result is not None:
+            self.circuit_breaker.record_success()
+        elif upstream_failure:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.release()
+        
+        if result is not None and cache_key is not None:
+            self.cache.set(cache_key, result)
+        return result
+    
+    def analyze_review(self, review_text: str, rating: int = None, business_name: str = None,
+                       tone: str = "professional", include_response: bool = True,
+                       fallback: bool = True) -> Optional[Dict]:
+        """
+        Analyze sentiment, category and (optionally) draft a reply in one request.
+        Returns: {"sentiment", "confidence", "category", "suggested_response"}
+        Any field the model omits or gets wrong falls back to the same default
+        the single-purpose methods have always returned. With fallback=False
+        a failed request returns None instead of canned values.
+        """
+        data = self._review_analysis_request(review_text, rating, business_name, tone, include_response)
+        response = self._make_request("chat/completions", data, method='analyze_review')
+        if response is None and not fallback:
+            return None
+        return self._parse_review_analysis(response, rating, include_response)
+    
+    def _text_analysis(self, text: str) -> Dict:
+        """
+        Sentiment and category of a text from one analyze_review call, which
+        analyze_sentiment and categorize_feedback share so asking for both
+        costs one request. Fallback values are not remembered.
+        """
+        analysis = self._remembered_analysis(text)
+        if analysis is None:
+            analysis = self.analyze_review(text, include_response=False, fallback=False)
+            if analysis is None:
+                return self._parse_review_analysis(None, None, False)
+            self._remember_analysis(text, analysis)
+        return analysis
+    
+    def analyze_sentiment(self, text: str) -> Tuple[str, float]:
+        """
+        Analyze sentiment of review text
+        Returns: (sentiment, confidence_score)
+        """
+        analysis = self._text_analysis(text)
+        return analysis['sentiment'], analysis['confidence']
+    
+    def generate_response_suggestion(self, review_text: str, rating: int, business_name: str, tone: str = "professional") -> str:
+        """
+        Generate AI response suggestion for a review
+        """
+        return self.analyze_review(review_text, rating, business_name, tone)['suggested_response']
+    
+    def categorize_feedback(self, text: str) -> str:
+        """
+        Categorize feedback as complaint, praise, or suggestion
+        """
+        return self._text_analysis(text)['category']
+    
+    def generate_follow_up_email(self, customer_name: str, business_name: str, step: int, incentive: str = None) -> Dict[str, str]:
+        """
+        Generate follow-up email content for sequence steps
+        """
+        data = self._follow_up_request(customer_name, business_name, step, incentive)
+        # Same customer, business and step always gets the same email, so it is worth caching
+        response = self._make_request("chat/completions", data, cache=True, method='generate_follow_up_email')
+        return self._parse_follow_up_email(response, customer_name, business_name)
+
 # Initialize global service instance
-mistral_service = MistralAIService()
\ No newline at end of file
+mistral_service = MistralAIService(cache=create_completion_cache(), rate_limiter=create_rate_limiter())
\ No newline at end of file
@@ -1,10 +1,12 @@
 import os
 import logging
-from flask import Flask
+from flask import Flask, g, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from sql_profiler import sql_profiler
+from metrics import registry as metrics_registry
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -38,6 +40,14 @@ else:
 
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# SQL statements a request may run before it fails; 0 turns the guard off.
+# On by default under FLASK_ENV=testing so N+1 queries show up as errors.
+app.config["SQL_STATEMENT_BUDGET"] = int(os.environ.get(
+    "SQL_STATEMENT_BUDGET", 30 if os.environ.get("FLASK_ENV") == "testing" else 0))
+
+# Usernames allowed to see the /_perf page
+app.config["PERF_ADMINS"] = {name.strip() for name in os.environ.get("PERF_ADMINS", "").split(",") if name.strip()}
+
 # Initialize extensions
 db.init_app(app)
 login_manager = LoginManager()
@@ -46,10 +56,37 @@ login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'info'
 
+# Count and time every request's SQL; the statement budget reads its count
+sql_profiler.init_app(app)
+# Request latency and SQL per endpoint for /metrics
+metrics_registry.init_app(app)
+
+class StatementBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its budget allows"""
+
+def statement_budget(limit):
+    """Give a view its own SQL statement budget instead of SQL_STATEMENT_BUDGET"""
+    def decorator(view):
+        view.statement_budget = limit
+        return view
+    return decorator
+
+@app.after_request
+def check_statement_budget(response):
+    budget = app.config["SQL_STATEMENT_BUDGET"]
+    if budget and request.endpoint:
+        limit = getattr(app.view_functions[request.endpoint], "statement_budget", budget)
+        count = g.get("sql_statements", 0)
+        if count > limit:
+            raise StatementBudgetExceeded(
+                f"{request.method} {request.path} ran {count} SQL statements, budget is {limit}")
+    return response
+
 @login_manager.user_loader
 def load_user(user_id):
-    from models import User
-    return User.query.get(int(user_id))
+    # A cached read-only snapshot, so most requests skip loading the user row
+    from user_cache import load_cached_user
+    return load_cached_user(int(user_id))
 
 # Import models first to register them
 import models
@@ -0,0 +1,252 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import Future
+from threading import Thread, Lock
+from typing import Awaitable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from ai_service import BaseMistralService, CompletionCache, RateLimiter, mistral_service
+
+logger = logging.getLogger(__name__)
+
+class AsyncMistralAIService(BaseMistralService):
+    """
+    asyncio variant of MistralAIService for bulk and scheduler work.
+
+    Shares prompts, parsing, caching, retry policy and circuit breaking with
+    the sync client. Requests go through one pooled httpx.AsyncClient and a
+    semaphore caps how many are in flight. The client and semaphore belong
+    to the event loop they were first used on.
+    """
+
+    def __init__(self, cache: Optional[CompletionCache] = None, rate_limiter: Optional[RateLimiter] = None,
+                 max_concurrency: int = None):
+        if httpx is None:
+            raise RuntimeError("httpx is required for AsyncMistralAIService (pip install httpx)")
+        super().__init__(cache, rate_limiter)
+        self.max_concurrency = max_concurrency or int(os.environ.get('MISTRAL_ASYNC_CONCURRENCY', 16))
+        self._client = None
+        self._semaphore = None
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            connect_timeout, read_timeout = self.timeout
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _make_request(self, endpoint: str, data: dict, cache: Optional[bool] = None,
+                            method: str = None) -> Optional[dict]:
+        """Async counterpart of MistralAIService._make_request"""
+        cache_key = self._cache_key(endpoint, data, cache)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._observe_call(method or endpoint, 'cached')
+                return cached
+
+        if not self.circuit_breaker.allow_request():
+            self._record_latency(endpoint, short_circuited=1)
+            self._observe_call(method or endpoint, 'circuit_open')
+            logger.warning(f"Mistral circuit open, skipping {endpoint}")
+            return None
+
+        client = self._get_client()
+        started = time.monotonic()
+        deadline = self._call_deadline()
+        result = None
+        upstream_failure = False
+        rate_limited = False
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter and not await self.rate_limiter.acquire_async(self.rate_limiter.estimate_tokens(data)):
+                logger.warning(f"Mistral rate limit wait exceeded, skipping {endpoint}")
+                self._record_latency(endpoint, rate_limited=1)
+                rate_limited = True
+                break
+            
+            response = None
+            try:
+                async with self._semaphore:
+                    connect_timeout, read_timeout = self._attempt_timeout(deadline)
+                    response = await client.post(f"/{endpoint}", json=data,
+                                                 timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+                if response.status_code not in self.RETRY_STATUSES:
+                    response.raise_for_status()
+                    result = response.json()
+                    upstream_failure = False
+                    break
+                upstream_failure = True
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                upstream_failure = True
+                error = str(e) or type(e).__name__
+            except (httpx.HTTPError, ValueError) as e:
+                # Client errors won't succeed on retry and don't indicate an outage
+                logger.error(f"Mistral API error: {e}")
+                upstream_failure = False
+                break
+
+            if attempt == self.max_retries:
+                logger.error(f"Mistral API error after {attempt + 1} attempts: {error}")
+                break
+            delay = self._retry_delay(attempt, response)
+            if time.monotonic() + delay >= deadline:
+                logger.error(f"Mistral API error after {attempt + 1} attempts, out of time to retry: {error}")
+                break
+            logger.warning(f"Mistral API error ({error}), retrying in {delay:.2f}s")
+            self._record_latency(endpoint, retries=1)
+            await asyncio.sleep(delay)
+
+        seconds = time.monotonic() - started
+        self._record_latency(endpoint, seconds=seconds, failures=0 if result is not None else 1)
+        self._observe_call(method or endpoint,
+                           'ok' if result is not None else 'rate_limited' if rate_limited else 'failed', seconds)
+        if result is not None:
+            self.circuit_breaker.record_success()
+        elif upstream_failure:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.release()
+
+        if result is not None and cache_key is not None:
+            self.cache.set(cache_key, result)
+        return result
+
+    async def analyze_review(self, review_text: str, rating: int = None, business_name: str = None,
+                             tone: str = "professional", include_response: bool = True,
+                             fallback: bool = True) -> Optional[Dict]:
+        """See MistralAIService.analyze_review"""
+        data = self._review_analysis_request(review_text, rating, business_name, tone, include_response)
+        response = await self._make_request("chat/completions", data, method='analyze_review')
+        if response is None and not fallback:
+            return None
+        return self._parse_review_analysis(response, rating, include_response)
+
+    async def _text_analysis(self, text: str) -> Dict:
+        """See MistralAIService._text_analysis"""
+        analysis = self._remembered_analysis(text)
+        if analysis is None:
+            analysis = await self.analyze_review(text, include_response=False, fallback=False)
+            if analysis is None:
+                return self._parse_review_analysis(None, None, False)
+            self._remember_analysis(text, analysis)
+        return analysis
+
+    async def analyze_sentiment(self, text: str) -> Tuple[str, float]:
+        """See MistralAIService.analyze_sentiment"""
+        analysis = await self._text_analysis(text)
+        return analysis['sentiment'], analysis['confidence']
+
+    async def generate_response_suggestion(self, review_text: str, rating: int, business_name: str, tone: str = "professional") -> str:
+        """See MistralAIService.generate_response_suggestion"""
+        analysis = await self.analyze_review(review_text, rating, business_name, tone)
+        return analysis['suggested_response']
+
+    async def categorize_feedback(self, text: str) -> str:
+        """See MistralAIService.categorize_feedback"""
+        analysis = await self._text_analysis(text)
+        return analysis['category']
+
+    async def generate_follow_up_email(self, customer_name: str, business_name: str, step: int, incentive: str = None) -> Dict[str, str]:
+        """See MistralAIService.generate_follow_up_email"""
+        data = self._follow_up_request(customer_name, business_name, step, incentive)
+        response = await self._make_request("chat/completions", data, cache=True, method='generate_follow_up_email')
+        return self._parse_follow_up_email(response, customer_name, business_name)
+
+    async def gather(self, calls: Iterable[Awaitable], return_exceptions: bool = True) -> List:
+        """
+        Run many calls concurrently, e.g.
+            await service.gather(service.analyze_review(r.comment, r.rating) for r in reviews)
+        The semaphore keeps the number of in-flight requests bounded however
+        many calls are passed. Failed calls come back as exceptions unless
+        return_exceptions is False.
+        """
+        return await asyncio.gather(*calls, return_exceptions=return_exceptions)
+
+class SyncMistralFacade:
+    """
+    Blocking interface over AsyncMistralAIService for Flask routes and other
+    sync code. Calls are scheduled on a private event loop running in a
+    daemon thread, so concurrent requests share one connection pool.
+    """
+
+    def __init__(self, service: AsyncMistralAIService = None):
+        self.service = service or AsyncMistralAIService(
+            cache=mistral_service.cache,
+            rate_limiter=mistral_service.rate_limiter
+        )
+        self._loop = None
+        self._lock = Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                Thread(target=self._loop.run_forever, name='mistral-async-loop', daemon=True).start()
+            return self._loop
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Schedule a coroutine on the facade's loop without waiting"""
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    def _run(self, coro: Awaitable):
+        return self.submit(coro).result()
+
+    def analyze_review(self, *args, **kwargs) -> Dict:
+        return self._run(self.service.analyze_review(*args, **kwargs))
+
+    def analyze_sentiment(self, text: str) -> Tuple[str, float]:
+        return self._run(self.service.analyze_sentiment(text))
+
+    def generate_response_suggestion(self, *args, **kwargs) -> str:
+        return self._run(self.service.generate_response_suggestion(*args, **kwargs))
+
+    def categorize_feedback(self, text: str) -> str:
+        return self._run(self.service.categorize_feedback(text))
+
+    def generate_follow_up_email(self, *args, **kwargs) -> Dict[str, str]:
+        return self._run(self.service.generate_follow_up_email(*args, **kwargs))
+
+    def analyze_reviews(self, reviews: List[Dict]) -> List:
+        """
+        Analyze many reviews concurrently. Each item holds analyze_review
+        keyword arguments; results (or exceptions) come back in order.
+        """
+        return self._run(self.service.gather(
+            self.service.analyze_review(**review) for review in reviews
+        ))
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.service.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
@@ -1,25 +1,59 @@
 import os
 import json
 import uuid
+import hashlib
+import time
 import logging
+import multiprocessing
 from datetime import datetime, timedelta
 from typing import List, Optional
 from flask import current_app
-import schedule
-import time
-from threading import Thread
+from threading import Thread, Event
+from sqlalchemy import func, insert, literal_column, true
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import contains_eager, joinedload
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import DateTime
 
 from app import db
 from models import (
     User, Customer, Review, ReviewConversation, FollowUpSequence, 
-    Referral, AutomationSettings, ReportGeneration
+    Referral, AutomationSettings, ReportGeneration, ReviewStats, ReviewDailyStats, OutboundEmail
 )
 from ai_service import mistral_service
-from gmail_service import send_email
-from report_generator import generate_pdf_report
+from email_outbox_service import enqueue_email, outbox_worker
+from metrics import registry
+from report_generator import collect_report_data, report_filename, ReportRenderPool
+from scheduler_service import job_scheduler
+from shard_service import ShardLeaseManager, ShardHeartbeat
 
 logger = logging.getLogger(__name__)
 
+FOLLOW_UP_ROUND_SECONDS = registry.histogram(
+    'follow_up_round_duration_seconds', 'Time for one follow-up round over the shards this process holds')
+FOLLOW_UPS_SENT = registry.counter('follow_ups_sent_total', 'Follow-up emails queued')
+FOLLOW_UP_BACKLOG = registry.gauge('follow_up_backlog', 'Follow-ups due but not yet sent, across all shards')
+
+class days_before(FunctionElement):
+    """SQL for a datetime column minus a whole number of days"""
+    name = 'days_before'
+    type = DateTime()
+    inherit_cache = True
+    
+    def __init__(self, column, days: int):
+        super().__init__(column, literal_column(str(int(days))))
+
+@compiles(days_before)
+def _days_before_default(element, compiler, **kw):
+    column, days = element.clauses
+    return f"({compiler.process(column, **kw)} - INTERVAL '{days.name} days')"
+
+@compiles(days_before, 'sqlite')
+def _days_before_sqlite(element, compiler, **kw):
+    column, days = element.clauses
+    return f"datetime({compiler.process(column, **kw)}, '-{days.name} days')"
+
 class AutomationService:
     """Service class for handling automation workflows"""
     
@@ -31,28 +65,29 @@ class AutomationService:
             if not review or not review.comment:
                 return
             
-            # Analyze sentiment
-            sentiment, score = mistral_service.analyze_sentiment(review.comment)
-            review.sentiment = sentiment
-            review.sentiment_score = score
+            # Sentiment, category and (if enabled) a suggested reply in one AI call
+            user_settings = AutomationSettings.query.filter_by(user_id=review.user_id).first()
+            auto_reply = bool(user_settings and user_settings.ai_auto_reply_enabled)
             
-            # Categorize feedback
-            review.review_category = mistral_service.categorize_feedback(review.comment)
+            analysis = mistral_service.analyze_review(
+                review.comment,
+                review.rating,
+                review.user.business_name or "our business",
+                user_settings.ai_tone if user_settings else "professional",
+                include_response=auto_reply
+            )
+            sentiment = analysis['sentiment']
+            review.sentiment = sentiment
+            review.sentiment_score = analysis['confidence']
+            review.review_category = analysis['category']
+            ReviewDailyStats.invalidate([review])
             
-            # Generate AI suggestion if enabled
-            user_settings = AutomationSettings.query.filter_by(user_id=review.user_id).first()
-            if user_settings and user_settings.ai_auto_reply_enabled:
-                suggestion = mistral_service.generate_response_suggestion(
-                    review.comment,
-                    review.rating,
-                    review.user.business_name or "our business",
-                    user_settings.ai_tone
-                )
-                review.ai_suggested_response = suggestion
+            if auto_reply:
+                review.ai_suggested_response = analysis['suggested_response']
             
             # For 5-star reviews, trigger referral system
             if review.rating == 5:
-                AutomationService.trigger_referral_reward(review.customer_id)
+                AutomationService.trigger_referral_reward(review.customer_id, review.id)
             
             db.session.commit()
             logger.info(f"Processed review {review_id} with sentiment: {sentiment}")
@@ -63,7 +98,10 @@ class AutomationService:
     
     @staticmethod
     def send_ai_response(review_id: int, custom_message: str = None):
-        """Send AI-generated or custom response to customer"""
+        """
+        Queue an AI-generated or custom response to the customer. Returns
+        True once it is queued; the outbox worker delivers it.
+        """
         try:
             review = Review.query.get(review_id)
             if not review:
@@ -73,32 +111,35 @@ class AutomationService:
             if not message:
                 return False
             
-            # Send email response
+            # Queue email response; resending the same text is a no-op
             subject = f"Thank you for your review - {review.user.business_name}"
-            success = send_email(
+            enqueue_email(
                 to_email=review.customer.email,
                 subject=subject,
                 message=message,
-                user_id=review.user_id
+                user_id=review.user_id,
+                idempotency_key=f"review-response:{review_id}:{hashlib.sha256(message.encode()).hexdigest()[:16]}",
+                commit=False
             )
             
-            if success:
-                # Log in conversation history
-                conversation = ReviewConversation(
-                    review_id=review_id,
-                    message=message,
-                    sender='ai' if not custom_message else 'admin',
-                    is_ai_generated=not bool(custom_message)
-                )
-                db.session.add(conversation)
-                
-                # Update review status
-                review.admin_response = message
-                review.response_date = datetime.utcnow()
-                review.status = 'responded'
-                
-                db.session.commit()
-                return True
+            # Log in conversation history
+            conversation = ReviewConversation(
+                review_id=review_id,
+                message=message,
+                sender='ai' if not custom_message else 'admin',
+                is_ai_generated=not bool(custom_message)
+            )
+            db.session.add(conversation)
+            
+            # Update review status
+            ReviewStats.record_status_change(review.user_id, review.status, 'responded')
+            review.admin_response = message
+            review.response_date = datetime.utcnow()
+            review.status = 'responded'
+            
+            db.session.commit()
+            outbox_worker.wake()
+            return True
             
         except Exception as e:
             logger.error(f"Error sending AI response for review {review_id}: {e}")
@@ -151,69 +192,130 @@ class AutomationService:
             db.session.rollback()
     
     @staticmethod
-    def process_pending_follow_ups():
-        """Process and send pending follow-up emails"""
-        try:
-            now = datetime.utcnow()
-            pending_follow_ups = FollowUpSequence.query.filter(
-                FollowUpSequence.status == 'scheduled',
-                FollowUpSequence.scheduled_for <= now
-            ).all()
-            
-            for follow_up in pending_follow_ups:
-                # Check if customer has already submitted a review
-                recent_review = Review.query.filter_by(
-                    customer_id=follow_up.customer_id
-                ).filter(Review.created_at >= follow_up.scheduled_for - timedelta(days=1)).first()
-                
-                if recent_review:
-                    # Cancel remaining follow-ups
-                    FollowUpSequence.query.filter_by(
-                        customer_id=follow_up.customer_id,
-                        status='scheduled'
-                    ).update({'status': 'cancelled'})
-                    db.session.commit()
-                    continue
+    def process_pending_follow_ups(page_size: int = None, shard: int = None, shard_count: int = None) -> int:
+        """
+        Send due follow-up emails, a page at a time. Each page is loaded in
+        one query with its customers, users and settings, flagged where the
+        customer has reviewed since the day before the follow-up was due.
+        Those customers' remaining follow-ups are cancelled in one UPDATE,
+        the rest are queued in one insert, and the page is committed once.
+        Given a shard, only tenants whose user_id falls in it are processed.
+        Returns how many follow-ups were sent.
+        """
+        page_size = page_size or int(os.environ.get('FOLLOW_UP_PAGE_SIZE', 500))
+        now = datetime.utcnow()
+        last_id = 0
+        sent = 0
+        
+        reviewed = db.session.query(Review.id).filter(
+            Review.customer_id == FollowUpSequence.customer_id,
+            Review.created_at >= days_before(FollowUpSequence.scheduled_for, 1)
+        ).exists()
+        
+        while True:
+            try:
+                page = db.session.query(FollowUpSequence, reviewed).options(
+                    joinedload(FollowUpSequence.customer)
+                    .joinedload(Customer.user)
+                    .joinedload(User.automation_settings)
+                ).filter(
+                    FollowUpSequence.status == 'scheduled',
+                    FollowUpSequence.scheduled_for <= now,
+                    FollowUpSequence.id > last_id,
+                    FollowUpSequence.user_id % shard_count == shard if shard_count else true()
+                ).order_by(FollowUpSequence.id).limit(page_size).all()
                 
-                # Generate email content if not provided
-                email_content = follow_up.email_content
-                if not email_content:
-                    settings = AutomationSettings.query.filter_by(user_id=follow_up.user_id).first()
-                    incentive = settings.referral_reward_value if settings and follow_up.sequence_step == 3 else None
-                    
-                    email_data = mistral_service.generate_follow_up_email(
-                        follow_up.customer.name,
-                        follow_up.customer.user.business_name or "our business",
-                        follow_up.sequence_step,
-                        incentive
-                    )
-                    email_content = email_data['body']
-                    subject = email_data['subject']
-                else:
-                    subject = f"Reminder - Share your experience"
+                if not page:
+                    break
+                last_id = page[-1][0].id
                 
-                # Send email
-                success = send_email(
-                    to_email=follow_up.customer.email,
-                    subject=subject,
-                    message=email_content,
-                    user_id=follow_up.user_id
-                )
+                sent += AutomationService._send_follow_up_page(page)
+                db.session.commit()
                 
-                if success:
-                    follow_up.sent_at = datetime.utcnow()
-                    follow_up.status = 'sent'
-                    follow_up.email_content = email_content
+            except Exception as e:
+                logger.error(f"Error processing follow-ups: {e}")
+                db.session.rollback()
+                break
+            
+            if len(page) < page_size:
+                break
+        
+        if sent:
+            outbox_worker.wake()
+        return sent
+    
+    @staticmethod
+    def _send_follow_up_page(page: List[tuple]) -> int:
+        """Cancel or queue one page of (follow-up, customer reviewed) rows; the caller commits"""
+        # A customer who has reviewed gets no more follow-ups
+        reviewed_customers = {follow_up.customer_id for follow_up, reviewed in page if reviewed}
+        if reviewed_customers:
+            FollowUpSequence.query.filter(
+                FollowUpSequence.customer_id.in_(reviewed_customers),
+                FollowUpSequence.status == 'scheduled'
+            ).update({'status': 'cancelled'}, synchronize_session=False)
+        
+        due = [follow_up for follow_up, reviewed in page if follow_up.customer_id not in reviewed_customers]
+        if not due:
+            return 0
+        
+        keys = {follow_up.id: f"follow-up:{follow_up.id}" for follow_up in due}
+        already_queued = {key for (key,) in db.session.query(OutboundEmail.idempotency_key).filter(
+            OutboundEmail.idempotency_key.in_(list(keys.values()))
+        ).all()}
+        
+        now = datetime.utcnow()
+        emails = []
+        for follow_up in due:
+            customer = follow_up.customer
+            
+            # Generate email content if not provided
+            email_content = follow_up.email_content
+            if not email_content:
+                settings = customer.user.automation_settings
+                incentive = settings.referral_reward_value if settings and follow_up.sequence_step == 3 else None
                 
-                db.session.commit()
+                email_data = mistral_service.generate_follow_up_email(
+                    customer.name,
+                    customer.user.business_name or "our business",
+                    follow_up.sequence_step,
+                    incentive
+                )
+                email_content = email_data['body']
+                subject = email_data['subject']
+            else:
+                subject = f"Reminder - Share your experience"
             
-        except Exception as e:
-            logger.error(f"Error processing follow-ups: {e}")
-            db.session.rollback()
+            if keys[follow_up.id] not in already_queued:
+                emails.append({
+                    'user_id': follow_up.user_id,
+                    'follow_up_id': follow_up.id,
+                    'kind': 'generic',
+                    'to_email': customer.email,
+                    'subject': subject,
+                    'body': email_content,
+                    'idempotency_key': keys[follow_up.id],
+                    'status': 'queued',
+                    'attempts': 0,
+                    'max_attempts': outbox_worker.max_attempts,
+                    'next_attempt_at': now,
+                })
+            
+            # The outbox worker marks it sent or failed once it is delivered
+            follow_up.status = 'queued'
+            follow_up.email_content = email_content
+        
+        if emails:
+            db.session.execute(insert(OutboundEmail), emails)
+        return len(due)
     
     @staticmethod
-    def trigger_referral_reward(customer_id: int):
-        """Trigger referral reward for 5-star review customer"""
+    def trigger_referral_reward(customer_id: int, review_id: int = None):
+        """
+        Trigger referral reward for 5-star review customer. With review_id
+        the reward is sent at most once for that review, however many times
+        the review is processed.
+        """
         try:
             customer = Customer.query.get(customer_id)
             if not customer:
@@ -223,15 +325,25 @@ class AutomationService:
             if not settings or not settings.referral_reward_enabled:
                 return
             
+            if review_id and Referral.query.filter_by(review_id=review_id).first():
+                return
+            
             # Generate unique referral token
             referral_token = str(uuid.uuid4())[:8].upper()
             
             referral = Referral(
                 user_id=customer.user_id,
                 customer_id=customer_id,
+                review_id=review_id,
                 referral_token=referral_token
             )
-            db.session.add(referral)
+            try:
+                # Savepoint: another process may reward the same review at the same time
+                with db.session.begin_nested():
+                    db.session.add(referral)
+            except IntegrityError:
+                logger.info(f"Referral for review {review_id} already created")
+                return
             
             # Send thank you email with referral link
             business_name = customer.user.business_name or "our business"
@@ -254,14 +366,17 @@ Thank you again for your support.
 Best regards,
 {business_name} Team"""
 
-            send_email(
+            enqueue_email(
                 to_email=customer.email,
                 subject=f"Thank you for your 5-star review! + Exclusive referral rewards",
                 message=email_content,
-                user_id=customer.user_id
+                user_id=customer.user_id,
+                idempotency_key=f"referral:review:{review_id}" if review_id else f"referral:{referral_token}",
+                commit=False
             )
             
             db.session.commit()
+            outbox_worker.wake()
             logger.info(f"Created referral {referral_token} for customer {customer_id}")
             
         except Exception as e:
@@ -270,27 +385,39 @@ Best regards,
     
     @staticmethod
     def generate_and_send_reports():
-        """Generate and send scheduled reports"""
+        """
+        Generate and send scheduled reports. The data for every due report
+        is gathered first; the PDFs are then rendered in parallel worker
+        processes and each report is emailed as soon as its render finishes.
+        """
         try:
             # Find users with report settings
-            users_with_reports = User.query.join(AutomationSettings).filter(
+            users_with_reports = User.query.join(AutomationSettings).options(
+                contains_eager(User.automation_settings)
+            ).filter(
                 AutomationSettings.report_recipients.isnot(None)
             ).all()
             
+            last_generated = {
+                (user_id, report_type): generated_at
+                for user_id, report_type, generated_at in db.session.query(
+                    ReportGeneration.user_id,
+                    ReportGeneration.report_type,
+                    func.max(ReportGeneration.generated_at)
+                ).group_by(ReportGeneration.user_id, ReportGeneration.report_type).all()
+            }
+            
+            jobs = []
             for user in users_with_reports:
                 settings = user.automation_settings
                 if not settings.report_recipients:
                     continue
                 
                 # Check if report is due
-                last_report = ReportGeneration.query.filter_by(
-                    user_id=user.id,
-                    report_type=settings.report_frequency
-                ).order_by(ReportGeneration.generated_at.desc()).first()
-                
+                last_report_at = last_generated.get((user.id, settings.report_frequency))
                 days_since_last = 999
-                if last_report:
-                    days_since_last = (datetime.utcnow() - last_report.generated_at).days
+                if last_report_at:
+                    days_since_last = (datetime.utcnow() - last_report_at).days
                 
                 should_generate = False
                 if settings.report_frequency == 'weekly' and days_since_last >= 7:
@@ -299,55 +426,201 @@ Best regards,
                     should_generate = True
                 
                 if should_generate:
-                    # Generate report
-                    report_path = generate_pdf_report(user.id, settings.report_frequency)
-                    if report_path:
-                        # Send to recipients
-                        recipients = json.loads(settings.report_recipients)
-                        for email in recipients:
-                            send_email(
-                                to_email=email,
-                                subject=f"{settings.report_frequency.title()} Review Report - {user.business_name}",
-                                message=f"Please find attached your {settings.report_frequency} review report.",
-                                user_id=user.id,
-                                attachment_path=report_path
-                            )
-                        
-                        # Log report generation
-                        report_record = ReportGeneration(
-                            user_id=user.id,
-                            report_type=settings.report_frequency,
-                            file_path=report_path,
-                            sent_to=settings.report_recipients
-                        )
-                        db.session.add(report_record)
+                    started = time.perf_counter()
+                    data = collect_report_data(user.id, settings.report_frequency)
+                    if data:
+                        jobs.append({
+                            'user_id': user.id,
+                            'business_name': user.business_name,
+                            'report_type': settings.report_frequency,
+                            'recipients': settings.report_recipients,
+                            'data': data,
+                            'filename': report_filename(data),
+                            'collect_seconds': time.perf_counter() - started,
+                        })
             
-            db.session.commit()
+            for result in ReportRenderPool().render(jobs):
+                job = result.job
+                if result.error:
+                    logger.error(f"Error rendering {job['report_type']} report for user {job['user_id']}: {result.error}")
+                    continue
+                
+                logger.info(
+                    f"{job['report_type'].title()} report for user {job['user_id']}: "
+                    f"data {job['collect_seconds'] * 1000:.0f}ms, "
+                    + ("served from cache" if result.cached else
+                       f"render {result.render_seconds * 1000:.0f}ms after {result.wait_seconds * 1000:.0f}ms queued")
+                )
+                
+                # Send to recipients
+                recipients = json.loads(job['recipients'])
+                for email in recipients:
+                    enqueue_email(
+                        to_email=email,
+                        subject=f"{job['report_type'].title()} Review Report - {job['business_name']}",
+                        message=f"Please find attached your {job['report_type']} review report.",
+                        user_id=job['user_id'],
+                        attachment_path=result.filename,
+                        idempotency_key=f"report:{os.path.basename(result.filename)}:{email}",
+                        commit=False
+                    )
+                
+                # Log report generation
+                report_record = ReportGeneration(
+                    user_id=job['user_id'],
+                    report_type=job['report_type'],
+                    file_path=result.filename,
+                    sent_to=job['recipients'],
+                    collect_ms=round(job['collect_seconds'] * 1000),
+                    render_ms=round(result.render_seconds * 1000)
+                )
+                db.session.add(report_record)
+                
+                # Let the outbox send this report while the others render
+                db.session.commit()
+                outbox_worker.wake()
             
         except Exception as e:
             logger.error(f"Error generating reports: {e}")
             db.session.rollback()
 
+class FollowUpShardWorker:
+    """
+    Runs process_pending_follow_ups in every process that polls for
+    background work, with the tenants split between them. Follow-ups are
+    sharded by user_id modulo FOLLOW_UP_SHARDS. Each worker leases an even
+    share of the shards, so throughput grows with the number of workers.
+    Shards are rebalanced between workers as they join or leave.
+    """
+    
+    GROUP = 'follow_ups'
+    
+    def __init__(self, shard_count: int = None, interval: float = None, lease_seconds: int = None):
+        self.shard_count = shard_count or int(os.environ.get('FOLLOW_UP_SHARDS', 16))
+        self.interval = interval or float(os.environ.get('FOLLOW_UP_INTERVAL', 600))
+        self.leases = ShardLeaseManager(self.GROUP, self.shard_count, lease_seconds)
+        self._stopping = Event()
+        self._thread = None
+    
+    def run_round(self) -> int:
+        """Process every shard held during one tick; returns how many follow-ups were sent"""
+        sent = 0
+        done = set()
+        heartbeat = ShardHeartbeat(self.leases)
+        heartbeat.start()
+        try:
+            with FOLLOW_UP_ROUND_SECONDS.time():
+                while not self._stopping.is_set():
+                    # Rebalance before each shard so newly joined workers get theirs promptly
+                    pending = [shard for shard in self.leases.rebalance() if shard not in done]
+                    if not pending:
+                        break
+                    shard = pending[0]
+                    done.add(shard)
+                    sent += AutomationService.process_pending_follow_ups(shard=shard, shard_count=self.shard_count)
+        finally:
+            heartbeat.stop()
+        
+        FOLLOW_UPS_SENT.inc(sent)
+        FOLLOW_UP_BACKLOG.set(FollowUpSequence.query.filter(
+            FollowUpSequence.status == 'scheduled',
+            FollowUpSequence.scheduled_for <= datetime.utcnow()
+        ).count())
+        return sent
+    
+    def run_forever(self):
+        """Process held shards every interval and rebalance in between; needs an app context"""
+        # Let workers started together see each other before the first claim
+        self.leases.heartbeat()
+        self._stopping.wait(self.leases.lease_seconds / 3)
+        
+        next_round = 0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() >= next_round:
+                    next_round = time.monotonic() + self.interval
+                    sent = self.run_round()
+                    logger.info(f"Follow-up shards {self.leases.held_shards()} sent {sent} follow-ups")
+                else:
+                    self.leases.rebalance()
+            except Exception as e:
+                logger.error(f"Error processing follow-up shards: {e}")
+                db.session.rollback()
+            self._stopping.wait(max(0, min(self.leases.lease_seconds / 3, next_round - time.monotonic())))
+        
+        try:
+            self.leases.leave()
+        except Exception as e:
+            logger.error(f"Error leaving follow-up shard group: {e}")
+    
+    def start(self):
+        """Run the worker in a background thread"""
+        from app import app
+        
+        def run():
+            with app.app_context():
+                self.run_forever()
+        
+        self._thread = Thread(target=run, name='follow-up-shards', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+
+# Initialize global follow-up worker instance
+follow_up_worker = FollowUpShardWorker()
+
+# Recurring jobs, run by whichever worker leases them (cron expressions, UTC)
+job_scheduler.register('generate_and_send_reports', '0 9 * * *', AutomationService.generate_and_send_reports)
+
+def sweep_review_enrichment():
+    """Enrich reviews whose queued analysis was lost with a restarted process"""
+    from enrichment_service import enrichment_pipeline
+    enrichment_pipeline.sweep_pending()
+
+job_scheduler.register('sweep_review_enrichment', '*/10 * * * *', sweep_review_enrichment)
+
 def start_automation_scheduler():
-    """Start the background scheduler for automation tasks"""
+    """
+    Resume background work interrupted by a restart and, unless
+    SCHEDULER_IN_WEB is false because worker.py runs separately, poll for
+    scheduled jobs and follow-up shards in this process
+    """
     def run_scheduler():
         from app import app
         with app.app_context():
-            schedule.every(10).minutes.do(lambda: AutomationService.process_pending_follow_ups())
-            schedule.every().day.at("09:00").do(lambda: AutomationService.generate_and_send_reports())
+            # Pick up bulk reply jobs and campaigns interrupted by a restart
+            try:
+                from bulk_reply_service import bulk_reply_runner
+                bulk_reply_runner.resume_incomplete()
+            except Exception as e:
+                logger.error(f"Error resuming bulk reply jobs: {e}")
+            
+            try:
+                from campaign_service import campaign_runner
+                campaign_runner.resume_incomplete()
+            except Exception as e:
+                logger.error(f"Error resuming review request campaigns: {e}")
+            
+            # Deliver email left in the outbox by a previous run
+            outbox_worker.start()
             
-            while True:
-                with app.app_context():
-                    schedule.run_pending()
-                time.sleep(60)
+            if os.environ.get('SCHEDULER_IN_WEB', 'true').lower() != 'false':
+                # Leases keep each due job and follow-up shard to one process
+                follow_up_worker.start()
+                job_scheduler.run_forever()
     
     # Start scheduler in background thread
     scheduler_thread = Thread(target=run_scheduler, daemon=True)
     scheduler_thread.start()
     logger.info("Automation scheduler started")
 
-# Initialize scheduler on import (but not in Vercel serverless environment)
+# Initialize scheduler on import (but not in Vercel serverless environment, nor in
+# report render workers, which re-import the entry script and with it this module)
 if (os.environ.get('FLASK_ENV') != 'testing' and 
     not os.environ.get('VERCEL') and 
-    not os.environ.get('VERCEL_ENV')):
-    start_automation_scheduler()
\ No newline at end of file
+    not os.environ.get('VERCEL_ENV') and
+    multiprocessing.current_process().name == 'MainProcess'):
+    start_automation_scheduler()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Measure review request throughput (requests per minute) against a local
+fake SMTP server: the one-customer-per-submit flow send_review_request used
+to run (a commit and a synchronous send per customer, over the pooled SMTP
+connections), versus a ReviewRequestCampaign covering the whole list.
+
+Usage: python benchmarks/campaign_benchmark.py [--customers 5000] [--connect-latency 0.05]
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import tempfile
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "reviewpilot_campaign_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+os.environ.setdefault("GMAIL_USER", "bench@example.com")
+os.environ.setdefault("GMAIL_PASSWORD", "password")
+os.environ["SMTP_USE_TLS"] = "false"
+
+from fake_smtp import start_fake_smtp
+
+def seed(db, models, n_customers):
+    from sqlalchemy import insert
+
+    db.session.execute(insert(models.User), [
+        {"id": 1, "username": "bench", "email": "bench@example.com",
+         "password_hash": "x", "business_name": "Bench Cafe"}
+    ])
+    db.session.execute(insert(models.ReviewTemplate), [
+        {"id": 1, "user_id": 1, "name": "Default", "subject": "How did we do?",
+         "message": "Hi {customer_name}, thanks for visiting {business_name}! Review us: {review_link}",
+         "is_default": True, "is_active": True}
+    ])
+    db.session.execute(insert(models.Customer), [
+        {"id": c, "user_id": 1, "name": f"Customer {c}", "email": f"customer{c}@example.com",
+         "location": "Accra"}
+        for c in range(1, n_customers + 1)
+    ])
+    db.session.commit()
+
+def send_one_by_one(db, models, customer_ids):
+    """What send_review_request did per submit before the outbox and campaigns"""
+    from gmail_service import send_review_request_email
+    from utils import generate_review_link
+
+    template = models.ReviewTemplate.query.get(1)
+    user = models.User.query.get(1)
+    for customer_id in customer_ids:
+        customer = models.Customer.query.get(customer_id)
+        token = str(uuid.uuid4())
+        db.session.add(models.ReviewRequest(user_id=1, customer_id=customer_id,
+                                            template_id=template.id, unique_token=token))
+        customer.review_requested = True
+        db.session.commit()
+        send_review_request_email(customer.email, template.subject, template.message,
+                                  customer.name, user.business_name, generate_review_link(token))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--connect-latency", type=float, default=0.05,
+                        help="simulated seconds for connect and again for login")
+    parser.add_argument("--baseline", type=int, default=30,
+                        help="customers to time for the one-by-one baseline")
+    parser.add_argument("--max-per-minute", type=int, default=1000000,
+                        help="campaign throttle; the default effectively disables it")
+    args = parser.parse_args()
+
+    server = start_fake_smtp(connect_latency=args.connect_latency)
+    os.environ["SMTP_HOST"], port = server.server_address
+    os.environ["SMTP_PORT"] = str(port)
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    from app import app, db
+    import models
+    from campaign_service import ReviewRequestCampaignRunner
+
+    with app.app_context():
+        seed(db, models, args.customers + args.baseline)
+
+        with app.test_request_context():
+            started = time.perf_counter()
+            send_one_by_one(db, models, range(args.customers + 1, args.customers + args.baseline + 1))
+            baseline_rate = args.baseline * 60 / (time.perf_counter() - started)
+
+        runner = ReviewRequestCampaignRunner(max_per_minute=args.max_per_minute)
+        user = models.User.query.get(1)
+        template = models.ReviewTemplate.query.get(1)
+
+        with app.test_request_context():
+            started = time.perf_counter()
+            campaign = runner.create_campaign(user, template, customer_ids=list(range(1, args.customers + 1)))
+            created = time.perf_counter() - started
+
+        messages_before = server.stats.messages
+        started = time.perf_counter()
+        runner.run(campaign.id)
+        sent_in = time.perf_counter() - started
+
+        db.session.refresh(campaign)
+        campaign_rate = campaign.sent_count * 60 / (created + sent_in)
+
+    print(f"Fake SMTP connect/login latency: {args.connect_latency * 1000:.0f} ms each")
+    print(f"One request per submit: {baseline_rate:10.0f} requests/min")
+    print(f"Campaign:               {campaign_rate:10.0f} requests/min "
+          f"(create {created:.2f}s, send {sent_in:.2f}s)")
+    print(f"Speedup: {campaign_rate / baseline_rate:.1f}x; campaign {campaign.status}, "
+          f"{campaign.sent_count} sent, {campaign.failed_count} failed, "
+          f"{server.stats.messages - messages_before} delivered")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Measure AI enrichment throughput (reviews per second) against a local fake
+Mistral server: sequential AutomationService.process_new_review versus the
+concurrent batched ReviewEnrichmentPipeline.
+
+Usage: python benchmarks/enrichment_benchmark.py [--reviews 200] [--latency 0.3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "reviewpilot_enrichment_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+os.environ.setdefault("MISTRAL_API_KEY", "fake")
+os.environ.setdefault("MISTRAL_RATE_LIMIT_BACKEND", "none")
+
+from fake_mistral import start_fake_mistral
+
+def seed(db, models, n_reviews):
+    from sqlalchemy import insert
+
+    db.session.execute(insert(models.User), [
+        {"id": 1, "username": "bench", "email": "bench@example.com",
+         "password_hash": "x", "business_name": "Bench Cafe"}
+    ])
+    db.session.execute(insert(models.AutomationSettings), [
+        {"user_id": 1, "ai_auto_reply_enabled": True, "referral_reward_enabled": False}
+    ])
+    db.session.execute(insert(models.Customer), [
+        {"id": 1, "user_id": 1, "name": "Customer", "email": "customer@example.com"}
+    ])
+    db.session.execute(insert(models.Review), [
+        {"id": r, "user_id": 1, "customer_id": 1, "rating": 4,
+         "comment": f"Great service, visit number {r}!"}
+        for r in range(1, n_reviews + 1)
+    ])
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--sequential", type=int, default=20,
+                        help="reviews to time for the sequential baseline")
+    args = parser.parse_args()
+
+    server = start_fake_mistral(latency=args.latency)
+    os.environ["MISTRAL_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    from app import app, db
+    import models
+    from automation_service import AutomationService
+    from enrichment_service import ReviewEnrichmentPipeline
+
+    with app.app_context():
+        seed(db, models, args.reviews + args.sequential)
+
+        baseline_ids = range(args.reviews + 1, args.reviews + args.sequential + 1)
+        started = time.perf_counter()
+        for review_id in baseline_ids:
+            AutomationService.process_new_review(review_id)
+        sequential_rate = args.sequential / (time.perf_counter() - started)
+
+    pipeline = ReviewEnrichmentPipeline(
+        max_concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        batch_timeout=0.05
+    )
+    started = time.perf_counter()
+    for review_id in range(1, args.reviews + 1):
+        pipeline.enqueue(review_id)
+    pipeline.stop()
+    elapsed = time.perf_counter() - started
+    pipeline_rate = pipeline.processed / elapsed
+
+    with app.app_context():
+        enriched = models.Review.query.filter(models.Review.sentiment.isnot(None)).count()
+
+    print(f"Fake Mistral latency: {args.latency * 1000:.0f} ms per call")
+    print(f"Sequential process_new_review: {sequential_rate:8.2f} reviews/s")
+    print(f"Enrichment pipeline:           {pipeline_rate:8.2f} reviews/s "
+          f"(concurrency={args.concurrency}, batch={args.batch_size})")
+    print(f"Speedup: {pipeline_rate / sequential_rate:.1f}x, "
+          f"{enriched} reviews enriched, {pipeline.failed} failed")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
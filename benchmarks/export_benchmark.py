@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Measure review export throughput (rows per second) and peak Python memory
+for a large review history: loading every Review with .all() and writing
+CSV from the ORM objects versus build_export's projected, server-side
+cursor stream. Output goes to a null sink, so only query and formatting
+costs are timed.
+
+Usage: python benchmarks/export_benchmark.py [--rows 200000] [--batch-size 1000]
+"""
+
+import os
+import sys
+import io
+import csv
+import time
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "reviewpilot_export_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+
+def seed(db, models, n_rows, n_customers=1000):
+    from sqlalchemy import insert
+
+    now = datetime.utcnow()
+    db.session.execute(insert(models.User), [
+        {"id": 1, "username": "user1", "email": "user1@example.com", "password_hash": "x",
+         "business_name": "Business 1"}
+    ])
+    db.session.execute(insert(models.Customer), [
+        {"id": c, "user_id": 1, "name": f"Customer {c}", "email": f"customer{c}@example.com"}
+        for c in range(1, n_customers + 1)
+    ])
+    for offset in range(0, n_rows, 50000):
+        db.session.execute(insert(models.Review), [
+            {"user_id": 1, "customer_id": r % n_customers + 1, "rating": r % 5 + 1, "status": "pending",
+             "comment": "Friendly staff, but the wait was longer than promised. " * 2,
+             "sentiment": ("frustrated", "satisfied", "neutral")[r % 3], "sentiment_score": 0.8,
+             "created_at": now - timedelta(minutes=r)}
+            for r in range(offset, min(offset + 50000, n_rows))
+        ])
+    db.session.commit()
+
+def export_all(models):
+    """Load every review as an ORM object, then write CSV"""
+    Review = models.Review
+    out = io.StringIO()
+    writer = csv.writer(out)
+    reviews = Review.query.filter_by(user_id=1).order_by(Review.id).all()
+    for review in reviews:
+        writer.writerow([review.id, review.created_at.isoformat(), review.customer.name, review.rating,
+                         review.status, review.comment, review.sentiment])
+        out.seek(0)
+        out.truncate()
+    return len(reviews)
+
+def export_streamed(build_export):
+    rows = 0
+    for chunk in build_export(1, 'reviews', 'csv',
+                              columns='id,created_at,customer_name,rating,status,comment,sentiment'):
+        rows += chunk.count('\n')
+    return rows - 1
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    os.environ["EXPORT_BATCH_SIZE"] = str(args.batch_size)
+
+    from app import app, db
+    import models
+    from export_service import build_export
+
+    with app.app_context():
+        seed(db, models, args.rows)
+
+    with app.app_context():
+        all_rows, all_time, all_peak = measure(lambda: export_all(models))
+    with app.app_context():
+        rows, streamed_time, streamed_peak = measure(lambda: export_streamed(build_export))
+
+    print(f"{args.rows} reviews, batch size {args.batch_size}")
+    print(f"ORM .all(): {all_rows / all_time:10.0f} rows/s ({all_time:.1f}s), peak {all_peak / 2**20:7.1f} MiB")
+    print(f"Streamed:   {rows / streamed_time:10.0f} rows/s ({streamed_time:.1f}s), peak {streamed_peak / 2**20:7.1f} MiB")
+    print(f"Speedup: {all_time / streamed_time:.1f}x, peak memory {all_peak / streamed_peak:.0f}x lower")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Mistral chat completions API.
+
+Answers POST /v1/chat/completions with canned content shaped like the real
+model output for each prompt in ai_service.py, after a configurable delay.
+Point the app at it with MISTRAL_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage: python benchmarks/fake_mistral.py [--port 8765] [--latency 0.3]
+"""
+
+import json
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+def fake_completion(prompt):
+    """Return plausible model output for the prompt shapes used by MistralAIService"""
+    if '"sentiment"' in prompt and '"category"' in prompt:
+        return json.dumps({
+            "sentiment": "satisfied",
+            "confidence": 0.9,
+            "category": "praise",
+            "suggested_response": "Thank you for the kind words! We look forward to seeing you again.",
+        })
+    if "SENTIMENT:" in prompt:
+        return "SENTIMENT: satisfied\nCONFIDENCE: 0.9"
+    if "Categorize this customer feedback" in prompt:
+        return "praise"
+    if "SUBJECT:" in prompt:
+        return "SUBJECT: We'd love your feedback\nBODY: Hi there,\n\nHow did we do?\n\nThanks!"
+    return "Thank you for your review. We appreciate your feedback and look forward to serving you again."
+
+class FakeMistralHandler(BaseHTTPRequestHandler):
+    latency = 0.3
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+
+        time.sleep(self.latency)
+
+        body = json.dumps({
+            "id": "fake",
+            "object": "chat.completion",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": fake_completion(prompt)}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20},
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_mistral(port=0, latency=0.3):
+    """Start the server in a daemon thread and return it; server_address has the bound port"""
+    handler = type("Handler", (FakeMistralHandler,), {"latency": latency})
+    server_class = type("Server", (ThreadingHTTPServer,), {"request_queue_size": 1024})
+    server = server_class(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Mistral API server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    server = start_fake_mistral(args.port, args.latency)
+    print(f"Fake Mistral listening on http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an SMTP submission server.
+
+Speaks enough ESMTP for smtplib (EHLO, AUTH, MAIL, RCPT, DATA, NOOP, RSET,
+QUIT) and discards every message. A configurable delay before the greeting
+and after AUTH stands in for the TCP, STARTTLS and login round trips a real
+provider costs per connection. Point the app at it with SMTP_HOST=127.0.0.1,
+SMTP_PORT=<port> and SMTP_USE_TLS=false.
+
+Usage: python benchmarks/fake_smtp.py [--port 2525] [--connect-latency 0.2]
+"""
+
+import time
+import argparse
+import socketserver
+from threading import Lock, Thread
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    connect_latency = 0.2
+    stats = None
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        time.sleep(self.connect_latency)
+        self.stats.record("connections")
+        self.reply("220 fake-smtp ESMTP ready")
+
+        for raw in self.rfile:
+            command = raw.decode(errors="replace").strip()
+            verb = command[:4].upper()
+
+            if verb == "EHLO":
+                self.wfile.write(b"250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 35882577\r\n")
+            elif verb == "HELO":
+                self.reply("250 fake-smtp")
+            elif verb == "AUTH":
+                time.sleep(self.connect_latency)
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                self.stats.record("messages")
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class FakeSMTPStats:
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+        self._lock = Lock()
+
+    def record(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+def start_fake_smtp(port=0, connect_latency=0.2):
+    """Start the server in a daemon thread and return it; server.stats counts connections and messages"""
+    stats = FakeSMTPStats()
+    handler = type("Handler", (FakeSMTPHandler,), {"connect_latency": connect_latency, "stats": stats})
+    server_class = type("Server", (socketserver.ThreadingTCPServer,),
+                        {"request_queue_size": 1024, "allow_reuse_address": True, "daemon_threads": True})
+    server = server_class(("127.0.0.1", port), handler)
+    server.stats = stats
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake SMTP server")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--connect-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = start_fake_smtp(args.port, args.connect_latency)
+    print(f"Fake SMTP listening on 127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
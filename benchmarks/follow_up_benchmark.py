@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Measure follow-up processing throughput (follow-ups per second) over a
+large backlog of due FollowUpSequence rows: the row-at-a-time loop
+process_pending_follow_ups used to run (a review lookup, lazy loads and a
+commit per follow-up) versus the paged, set-based version.
+
+A tenth of the customers have reviewed, so their follow-ups are cancelled
+rather than sent. Emails are only queued; nothing is delivered.
+
+Usage: python benchmarks/follow_up_benchmark.py [--follow-ups 100000] [--page-size 500]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "reviewpilot_follow_up_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+
+STEPS = 3
+
+def seed(db, models, n_follow_ups, n_users=50):
+    from sqlalchemy import insert
+
+    n_customers = -(-n_follow_ups // STEPS)
+    now = datetime.utcnow()
+
+    db.session.execute(insert(models.User), [
+        {"id": u, "username": f"user{u}", "email": f"user{u}@example.com",
+         "password_hash": "x", "business_name": f"Business {u}"}
+        for u in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(models.AutomationSettings), [
+        {"user_id": u} for u in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(models.Customer), [
+        {"id": c, "user_id": c % n_users + 1, "name": f"Customer {c}",
+         "email": f"customer{c}@example.com"}
+        for c in range(1, n_customers + 1)
+    ])
+    # Every tenth customer reviewed after their first follow-up was scheduled
+    db.session.execute(insert(models.Review), [
+        {"user_id": c % n_users + 1, "customer_id": c, "rating": 5, "created_at": now - timedelta(hours=1)}
+        for c in range(10, n_customers + 1, 10)
+    ])
+    db.session.execute(insert(models.FollowUpSequence), [
+        {"user_id": (i // STEPS + 1) % n_users + 1, "customer_id": i // STEPS + 1,
+         "sequence_step": i % STEPS + 1, "scheduled_for": now - timedelta(minutes=i % STEPS + 1),
+         "status": "scheduled", "email_content": "Just checking in - how was your visit?"}
+        for i in range(n_follow_ups)
+    ])
+    db.session.commit()
+
+def process_one_by_one(db, models, limit):
+    """What process_pending_follow_ups did per follow-up before paging"""
+    from email_outbox_service import enqueue_email
+
+    Review, FollowUpSequence = models.Review, models.FollowUpSequence
+    now = datetime.utcnow()
+    pending_follow_ups = FollowUpSequence.query.filter(
+        FollowUpSequence.status == 'scheduled',
+        FollowUpSequence.scheduled_for <= now
+    ).order_by(FollowUpSequence.id).limit(limit).all()
+
+    for follow_up in pending_follow_ups:
+        recent_review = Review.query.filter_by(
+            customer_id=follow_up.customer_id
+        ).filter(Review.created_at >= follow_up.scheduled_for - timedelta(days=1)).first()
+
+        if recent_review:
+            FollowUpSequence.query.filter_by(
+                customer_id=follow_up.customer_id,
+                status='scheduled'
+            ).update({'status': 'cancelled'})
+            db.session.commit()
+            continue
+
+        enqueue_email(
+            to_email=follow_up.customer.email,
+            subject="Reminder - Share your experience",
+            message=follow_up.email_content,
+            user_id=follow_up.user_id,
+            idempotency_key=f"follow-up:{follow_up.id}",
+            commit=False
+        )
+        follow_up.sent_at = datetime.utcnow()
+        follow_up.status = 'sent'
+        db.session.commit()
+
+def scheduled_count(models):
+    return models.FollowUpSequence.query.filter_by(status='scheduled').count()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--follow-ups", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--baseline", type=int, default=1000,
+                        help="follow-ups to time for the row-at-a-time baseline")
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    from app import app, db
+    import models
+    from automation_service import AutomationService
+    from email_outbox_service import outbox_worker
+
+    # Measure queueing only; don't start the delivery thread
+    outbox_worker.wake = lambda: None
+
+    with app.app_context():
+        seed(db, models, args.follow_ups)
+        total = scheduled_count(models)
+
+        started = time.perf_counter()
+        process_one_by_one(db, models, args.baseline)
+        baseline_time = time.perf_counter() - started
+        remaining = scheduled_count(models)
+        baseline_rate = (total - remaining) / baseline_time
+
+        started = time.perf_counter()
+        sent = AutomationService.process_pending_follow_ups(page_size=args.page_size)
+        paged_time = time.perf_counter() - started
+        paged_rate = remaining / paged_time
+
+        queued = models.OutboundEmail.query.count()
+        left = scheduled_count(models)
+
+    print(f"Due follow-ups: {total}")
+    print(f"Row at a time: {baseline_rate:10.0f} follow-ups/s ({total - remaining} in {baseline_time:.1f}s)")
+    print(f"Paged:         {paged_rate:10.0f} follow-ups/s ({remaining} in {paged_time:.1f}s, "
+          f"{sent} sent, page size {args.page_size})")
+    print(f"Speedup: {paged_rate / baseline_rate:.1f}x; {queued} emails queued, {left} still scheduled")
+
+if __name__ == "__main__":
+    main()
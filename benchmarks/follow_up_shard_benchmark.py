@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Measure how follow-up throughput scales with the number of worker
+processes when processing is sharded by tenant. Each worker is a separate
+process running FollowUpShardWorker rounds over its leased shards until no
+due follow-ups are left. The follow-ups have no stored content, so each one
+needs a (fake) Mistral call like in production.
+
+Usage: python benchmarks/follow_up_shard_benchmark.py [--workers 1 2 4] [--follow-ups 800] [--latency 0.05]
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "reviewpilot_follow_up_shard_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+os.environ.setdefault("MISTRAL_API_KEY", "fake")
+os.environ.setdefault("MISTRAL_RATE_LIMIT_BACKEND", "none")
+os.environ["AI_CACHE_BACKEND"] = "none"
+
+def seed(db, models, n_follow_ups, n_users):
+    from sqlalchemy import insert
+
+    now = datetime.utcnow()
+    db.session.execute(insert(models.User), [
+        {"id": u, "username": f"user{u}", "email": f"user{u}@example.com",
+         "password_hash": "x", "business_name": f"Business {u}"}
+        for u in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(models.Customer), [
+        {"id": c, "user_id": c % n_users + 1, "name": f"Customer {c}", "email": f"customer{c}@example.com"}
+        for c in range(1, n_follow_ups + 1)
+    ])
+    db.session.execute(insert(models.FollowUpSequence), [
+        {"user_id": c % n_users + 1, "customer_id": c, "sequence_step": 1,
+         "scheduled_for": now - timedelta(minutes=5), "status": "scheduled"}
+        for c in range(1, n_follow_ups + 1)
+    ])
+    db.session.commit()
+
+def reset(db, models):
+    """Make every follow-up due again and clear queued mail and shard state"""
+    models.FollowUpSequence.query.update({"status": "scheduled", "sent_at": None, "email_content": None})
+    models.OutboundEmail.query.delete()
+    models.ShardMember.query.delete()
+    models.ShardLease.query.update({"owner": None, "lease_until": None})
+    db.session.commit()
+
+def due_count(models):
+    return models.FollowUpSequence.query.filter_by(status="scheduled").count()
+
+def run_worker(workers, shard_count, lease_seconds):
+    """One worker process: wait for the others, then run rounds until nothing is due"""
+    from app import app, db
+    import models
+    from automation_service import FollowUpShardWorker
+    from email_outbox_service import outbox_worker
+
+    # Measure queueing only; don't start the delivery thread
+    outbox_worker.wake = lambda: None
+
+    with app.app_context():
+        worker = FollowUpShardWorker(shard_count=shard_count, lease_seconds=lease_seconds)
+        worker.leases.heartbeat()
+        while worker.leases.live_members() < workers:
+            time.sleep(0.05)
+
+        sent = 0
+        while True:
+            sent += worker.run_round()
+            db.session.commit()
+            if not due_count(models):
+                break
+            time.sleep(0.1)
+        worker.leases.leave()
+    print(sent)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--follow-ups", type=int, default=800)
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--lease-seconds", type=int, default=30)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_worker(args.child, args.shards, args.lease_seconds)
+        return
+
+    from fake_mistral import start_fake_mistral
+
+    server = start_fake_mistral(latency=args.latency)
+    os.environ["MISTRAL_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    from app import app, db
+    import models
+
+    with app.app_context():
+        seed(db, models, args.follow_ups, args.users)
+
+    print(f"{args.follow_ups} due follow-ups, {args.shards} shards, {args.latency * 1000:.0f} ms per AI call")
+    baseline = None
+    for workers in args.workers:
+        with app.app_context():
+            reset(db, models)
+
+        started = time.perf_counter()
+        children = [
+            subprocess.Popen([sys.executable, __file__, "--child", str(workers),
+                              "--shards", str(args.shards), "--lease-seconds", str(args.lease_seconds)],
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            for _ in range(workers)
+        ]
+        sent = [int(child.communicate()[0].strip().splitlines()[-1]) for child in children]
+        elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            left = due_count(models)
+        rate = sum(sent) / elapsed
+        baseline = baseline or rate
+        print(f"{workers} worker(s): {rate:8.1f} follow-ups/s ({sum(sent)} sent in {elapsed:.1f}s, "
+              f"per worker {sent}, {left} left) - {rate / baseline:.1f}x")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
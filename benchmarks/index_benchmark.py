@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Compare query plans and latency for the hot query shapes with and without
+the composite indexes declared in models.py, on a seeded SQLite database.
+
+Usage: python benchmarks/index_benchmark.py [--reviews 200000] [--users 50]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "reviewpilot_index_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+
+QUERIES = {
+    "reviews page": (
+        "SELECT id FROM review WHERE user_id = :user_id AND status = 'pending' "
+        "ORDER BY created_at DESC LIMIT 20"
+    ),
+    "customer reviews": (
+        "SELECT id FROM review WHERE customer_id = :customer_id AND rating = 5 "
+        "AND created_at >= :since"
+    ),
+    "customers page": (
+        "SELECT id FROM customer WHERE user_id = :user_id "
+        "ORDER BY created_at DESC LIMIT 20"
+    ),
+    "due follow-ups": (
+        "SELECT id FROM follow_up_sequence WHERE status = 'scheduled' "
+        "AND scheduled_for <= :now"
+    ),
+    "conversation": (
+        "SELECT id FROM review_conversation WHERE review_id = :review_id "
+        "ORDER BY sent_at"
+    ),
+}
+
+def seed(db, models, n_users, n_reviews):
+    """Bulk insert a synthetic multi-tenant dataset"""
+    from sqlalchemy import insert
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    n_customers = max(n_reviews // 4, 1)
+
+    db.session.execute(insert(models.User), [
+        {"id": u, "username": f"user{u}", "email": f"user{u}@example.com",
+         "password_hash": "x", "business_name": f"Business {u}"}
+        for u in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(models.Customer), [
+        {"id": c, "user_id": c % n_users + 1, "name": f"Customer {c}",
+         "email": f"c{c}@example.com",
+         "created_at": now - timedelta(minutes=rng.randint(0, 525600))}
+        for c in range(1, n_customers + 1)
+    ])
+    db.session.execute(insert(models.Review), [
+        {"id": r, "user_id": (r % n_customers) % n_users + 1,
+         "customer_id": r % n_customers + 1, "rating": rng.randint(1, 5),
+         "status": rng.choice(["pending", "responded", "responded"]),
+         "created_at": now - timedelta(minutes=rng.randint(0, 525600))}
+        for r in range(1, n_reviews + 1)
+    ])
+    db.session.execute(insert(models.FollowUpSequence), [
+        {"id": f, "user_id": f % n_customers % n_users + 1, "customer_id": f % n_customers + 1,
+         "sequence_step": f % 3 + 1,
+         "status": rng.choice(["scheduled", "sent", "sent", "cancelled"]),
+         "scheduled_for": now + timedelta(minutes=rng.randint(-43200, 43200))}
+        for f in range(1, n_customers + 1)
+    ])
+    db.session.execute(insert(models.ReviewConversation), [
+        {"id": m, "review_id": m % n_reviews + 1, "message": "Thanks!", "sender": "admin",
+         "sent_at": now - timedelta(minutes=rng.randint(0, 525600))}
+        for m in range(1, n_reviews + 1)
+    ])
+    db.session.commit()
+
+def run_queries(conn, params, repeat):
+    from sqlalchemy import text
+
+    results = {}
+    for label, sql in QUERIES.items():
+        plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(text(sql), params).fetchall()
+        elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+        results[label] = (elapsed_ms, " | ".join(row[-1] for row in plan))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    from sqlalchemy import text
+    from app import app, db
+    import models
+    from add_indexes_migration import index_statements
+
+    with app.app_context():
+        print(f"Seeding {args.reviews} reviews across {args.users} users...")
+        seed(db, models, args.users, args.reviews)
+
+        params = {
+            "user_id": 1,
+            "customer_id": 1,
+            "review_id": 1,
+            "since": datetime.utcnow() - timedelta(days=90),
+            "now": datetime.utcnow(),
+        }
+        declared = list(index_statements("sqlite"))
+
+        with db.engine.connect() as conn:
+            for name, _ in declared:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            conn.execute(text("ANALYZE"))
+            before = run_queries(conn, params, args.repeat)
+
+            for _, sql_command in declared:
+                conn.execute(text(sql_command))
+            conn.execute(text("ANALYZE"))
+            after = run_queries(conn, params, args.repeat)
+            conn.commit()
+
+    print()
+    print(f"{'query':<18} {'no index (ms)':>14} {'indexed (ms)':>13} {'speedup':>8}")
+    for label in QUERIES:
+        slow, fast = before[label][0], after[label][0]
+        speedup = slow / fast if fast else float("inf")
+        print(f"{label:<18} {slow:>14.3f} {fast:>13.3f} {speedup:>7.1f}x")
+
+    print()
+    for label in QUERIES:
+        print(f"{label}:")
+        print(f"  before: {before[label][1]}")
+        print(f"  after:  {after[label][1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Measure the latency of fetching a deep page of one tenant's review list:
+Flask-SQLAlchemy's .paginate() (OFFSET plus a COUNT(*) on every page)
+versus keyset_paginate with a cursor, which seeks straight to the page
+through the (user_id, created_at, id) index.
+
+Usage: python benchmarks/pagination_benchmark.py [--reviews 100000] [--page 1000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "reviewpilot_pagination_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+
+PER_PAGE = 20
+
+def seed(db, models, n_reviews, n_users=5):
+    from sqlalchemy import insert
+
+    now = datetime.utcnow()
+    db.session.execute(insert(models.User), [
+        {"id": u, "username": f"user{u}", "email": f"user{u}@example.com",
+         "password_hash": "x", "business_name": f"Business {u}"}
+        for u in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(models.Customer), [
+        {"id": u, "user_id": u, "name": f"Customer {u}", "email": f"customer{u}@example.com"}
+        for u in range(1, n_users + 1)
+    ])
+    # The benchmarked tenant owns n_reviews; the others add the same again between them
+    for offset in range(0, 2 * n_reviews, 50000):
+        db.session.execute(insert(models.Review), [
+            {"user_id": 1 if r % 2 else r % (n_users - 1) + 2, "customer_id": 1, "rating": r % 5 + 1,
+             "status": "pending", "comment": "Great service.", "created_at": now - timedelta(seconds=r // 2)}
+            for r in range(offset, min(offset + 50000, 2 * n_reviews))
+        ])
+    db.session.commit()
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=100000, help="reviews owned by the listed tenant")
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+    from app import app, db
+    import models
+    from pagination import encode_cursor, keyset_paginate
+
+    Review = models.Review
+
+    with app.app_context():
+        seed(db, models, args.reviews)
+        query = Review.query.filter_by(user_id=1)
+
+        offset_page, offset_time = timed(lambda: query.order_by(Review.created_at.desc(), Review.id.desc())
+                                         .paginate(page=args.page, per_page=PER_PAGE, error_out=False),
+                                         args.repeat)
+        _, first_time = timed(lambda: query.order_by(Review.created_at.desc(), Review.id.desc())
+                              .paginate(page=1, per_page=PER_PAGE, error_out=False), args.repeat)
+
+        # The cursor a client holds after reading the page before: the last row on it
+        last_seen = query.order_by(Review.created_at.desc(), Review.id.desc())\
+            .offset((args.page - 1) * PER_PAGE - 1).first()
+        cursor = encode_cursor(last_seen.created_at, last_seen.id, 'next')
+
+        keyset_page, keyset_time = timed(lambda: keyset_paginate(query, Review, cursor), args.repeat)
+        assert [r.id for r in keyset_page.items] == [r.id for r in offset_page.items]
+
+    print(f"{args.reviews} reviews for the tenant, page {args.page} at {PER_PAGE} per page")
+    print(f"Offset, page 1:    {first_time * 1000:8.2f} ms")
+    print(f"Offset, page {args.page}: {offset_time * 1000:8.2f} ms")
+    print(f"Keyset, page {args.page}: {keyset_time * 1000:8.2f} ms")
+    print(f"Speedup: {offset_time / keyset_time:.0f}x")
+
+if __name__ == "__main__":
+    main()
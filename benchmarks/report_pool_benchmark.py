@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measure scheduled report rendering across many tenants: building each PDF
+one after another in the calling thread versus ReportRenderPool's worker
+processes. The report data is collected once up front and shared by both
+runs; only rendering is timed. Speedup depends on the CPU cores available.
+
+Usage: python benchmarks/report_pool_benchmark.py [--users 32] [--workers 4]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORK_DIR = os.path.join(tempfile.gettempdir(), "reviewpilot_report_pool_benchmark")
+DB_PATH = os.path.join(WORK_DIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+
+def seed(db, models, n_users, reviews_per_user):
+    from sqlalchemy import insert
+
+    now = datetime.utcnow()
+    db.session.execute(insert(models.User), [
+        {"id": u, "username": f"user{u}", "email": f"user{u}@example.com",
+         "password_hash": "x", "business_name": f"Business {u}"}
+        for u in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(models.Customer), [
+        {"id": u, "user_id": u, "name": f"Customer {u}", "email": f"customer{u}@example.com"}
+        for u in range(1, n_users + 1)
+    ])
+    db.session.execute(insert(models.Review), [
+        {"user_id": u, "customer_id": u, "rating": r % 5 + 1, "status": "pending",
+         "comment": "The service was slow and nobody followed up on my booking. " * 3,
+         "sentiment": ("frustrated", "satisfied", "neutral")[r % 3], "created_at": now - timedelta(hours=r)}
+        for u in range(1, n_users + 1) for r in range(reviews_per_user)
+    ])
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--reviews", type=int, default=200, help="reviews per user")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    os.makedirs(WORK_DIR)
+    os.chdir(WORK_DIR)
+
+    from app import app, db
+    import models
+    from report_generator import collect_report_data, report_filename, ReportRenderPool
+    from report_renderer import write_report
+
+    with app.app_context():
+        seed(db, models, args.users, args.reviews)
+        jobs = []
+        for user_id in range(1, args.users + 1):
+            data = collect_report_data(user_id, 'monthly')
+            jobs.append({'user_id': user_id, 'data': data, 'filename': report_filename(data)})
+
+    started = time.perf_counter()
+    for job in jobs:
+        write_report(job['data'], job['filename'].replace(".pdf", "_serial.pdf"))
+    serial_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    first = None
+    renders = []
+    for result in ReportRenderPool(workers=args.workers).render(jobs):
+        first = first or time.perf_counter() - started
+        assert result.error is None, result.error
+        renders.append(result.render_seconds)
+    pool_time = time.perf_counter() - started
+
+    print(f"{args.users} monthly reports, {os.cpu_count()} CPU(s), {args.workers} workers")
+    print(f"Serial: {serial_time:6.2f}s ({serial_time / args.users * 1000:.0f} ms/report)")
+    print(f"Pool:   {pool_time:6.2f}s (first report ready after {first:.2f}s, "
+          f"median render {sorted(renders)[len(renders) // 2] * 1000:.0f} ms)")
+    print(f"Speedup: {serial_time / pool_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
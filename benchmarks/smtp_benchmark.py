@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measure email throughput (messages per second) against a local fake SMTP
+server: one connection and login per message, as gmail_service used to do,
+versus the pooled connections now used by send_email.
+
+Usage: python benchmarks/smtp_benchmark.py [--messages 200] [--connect-latency 0.2]
+"""
+
+import os
+import sys
+import time
+import smtplib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_smtp import start_fake_smtp
+from gmail_service import SMTPConnectionPool
+
+def build_message(i):
+    msg = MIMEText(f"Hi customer {i},\n\nHow was your visit?\n", "plain")
+    msg["Subject"] = "We'd love your feedback"
+    msg["From"] = "bench@example.com"
+    msg["To"] = f"customer{i}@example.com"
+    return msg
+
+def send_unpooled(host, port, msg):
+    """The previous per-email flow: connect, log in, send, quit"""
+    server = smtplib.SMTP(host, port)
+    server.login("bench@example.com", "password")
+    server.send_message(msg)
+    server.quit()
+
+def timed(label, n, fn, threads):
+    started = time.perf_counter()
+    if threads == 1:
+        for i in range(n):
+            fn(build_message(i))
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(fn, (build_message(i) for i in range(n))))
+    rate = n / (time.perf_counter() - started)
+    print(f"{label:<38} {rate:9.2f} msgs/s")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--connect-latency", type=float, default=0.2,
+                        help="simulated seconds for connect and again for login")
+    parser.add_argument("--unpooled", type=int, default=20,
+                        help="messages to time for the per-connection baseline")
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    server = start_fake_smtp(connect_latency=args.connect_latency)
+    host, port = server.server_address
+
+    print(f"Fake SMTP connect/login latency: {args.connect_latency * 1000:.0f} ms each")
+    baseline = timed("Connection per message:", args.unpooled,
+                     lambda msg: send_unpooled(host, port, msg), 1)
+
+    pool = SMTPConnectionPool(host, port, "bench@example.com", "password",
+                              use_tls=False, max_size=args.pool_size)
+    connections_before = server.stats.connections
+    pooled = timed("Pooled, single thread:", args.messages, pool.send_message, 1)
+    concurrent = timed(f"Pooled, {args.pool_size} threads:", args.messages,
+                       pool.send_message, args.pool_size)
+    pool.close_all()
+
+    print(f"Speedup: {pooled / baseline:.1f}x single thread, {concurrent / baseline:.1f}x concurrent; "
+          f"{server.stats.connections - connections_before} pooled connections for "
+          f"{pool.messages_sent} messages")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Measure review request rendering throughput (messages per second):
+str.format on the raw template per message, as send_review_request_email
+used to do, versus template_engine.render_many on the compiled template.
+
+Usage: python benchmarks/template_benchmark.py [--messages 100000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+# Add the parent directory to the Python path so we can import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "reviewpilot_template_benchmark.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("FLASK_ENV", "testing")
+
+SUBJECT = "How was your visit to {business_name}?"
+MESSAGE = """Hi {customer_name},
+
+Thank you for choosing {business_name}! We hope you enjoyed your visit.
+
+We'd love to hear about your experience - it only takes a minute:
+{review_link}
+
+Your feedback helps us improve and lets others know what to expect.
+
+Best regards,
+The {business_name} Team"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+
+    from app import app  # noqa: F401 - sets up the models
+    from models import ReviewTemplate
+    from template_engine import render_many
+
+    template = ReviewTemplate(id=1, subject=SUBJECT, message=MESSAGE, updated_at=datetime.utcnow())
+    rows = [{
+        "customer_name": f"Customer {i}",
+        "business_name": "Bench Cafe",
+        "review_link": f"https://reviewpilot.example.com/review/{i:032x}",
+    } for i in range(args.messages)]
+
+    started = time.perf_counter()
+    naive = [(template.subject.format(**row), template.message.format(**row)) for row in rows]
+    naive_rate = args.messages / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    compiled = render_many(template, rows)
+    compiled_rate = args.messages / (time.perf_counter() - started)
+
+    assert compiled == naive, "compiled output differs from str.format"
+
+    print(f"str.format per message: {naive_rate:12,.0f} msgs/s")
+    print(f"render_many:            {compiled_rate:12,.0f} msgs/s")
+    print(f"Speedup: {compiled_rate / naive_rate:.1f}x for {args.messages:,} messages")
+
+if __name__ == "__main__":
+    main()
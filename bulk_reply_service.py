@@ -0,0 +1,224 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from threading import Thread, Lock, Event
+from typing import List, Optional
+
+from sqlalchemy import or_, update
+
+from app import db
+from models import Review, User, AutomationSettings, BulkReplyJob, ReviewDailyStats
+
+logger = logging.getLogger(__name__)
+
+class BulkReplyJobRunner:
+    """
+    Generates AI reply suggestions for every pending review of a user.
+
+    Reviews are processed in ID order, one chunk at a time. Each chunk is
+    sent to Mistral concurrently through the async client and committed
+    together with the job's checkpoint (last_review_id), so a restarted
+    worker picks up after the last committed chunk. A job is leased through
+    heartbeat_at so only one worker runs it at a time; a BulkReplyHeartbeat
+    thread renews it while a chunk waits on the rate limiter or retries.
+    """
+
+    LEASE_SECONDS = 120
+
+    def __init__(self, chunk_size: int = None, max_concurrency: int = None):
+        self.chunk_size = chunk_size or int(os.environ.get('BULK_REPLY_CHUNK_SIZE', 25))
+        self.max_concurrency = max_concurrency or int(os.environ.get('BULK_REPLY_CONCURRENCY', 8))
+        self._facade = None
+        self._lock = Lock()
+
+    def _get_facade(self):
+        with self._lock:
+            if self._facade is None:
+                from ai_service import mistral_service
+                from async_ai_service import AsyncMistralAIService, SyncMistralFacade
+
+                self._facade = SyncMistralFacade(AsyncMistralAIService(
+                    cache=mistral_service.cache,
+                    rate_limiter=mistral_service.rate_limiter,
+                    max_concurrency=self.max_concurrency
+                ))
+            return self._facade
+
+    @staticmethod
+    def _pending_query(user_id: int):
+        return Review.query.filter(
+            Review.user_id == user_id,
+            Review.status == 'pending',
+            Review.ai_suggested_response.is_(None),
+            Review.comment.isnot(None)
+        )
+
+    @staticmethod
+    def active_job(user_id: int) -> Optional[BulkReplyJob]:
+        return BulkReplyJob.query.filter(
+            BulkReplyJob.user_id == user_id,
+            BulkReplyJob.status.in_(BulkReplyJob.ACTIVE_STATUSES)
+        ).order_by(BulkReplyJob.id.desc()).first()
+
+    def start_job(self, user_id: int) -> BulkReplyJob:
+        """Create a job for the user (or return the one already active) and run it in the background"""
+        job = self.active_job(user_id)
+        if job:
+            return job
+
+        job = BulkReplyJob(user_id=user_id, total_reviews=self._pending_query(user_id).count())
+        db.session.add(job)
+        db.session.commit()
+
+        self.launch(job.id)
+        return job
+
+    def launch(self, job_id: int):
+        Thread(target=self._run_thread, args=(job_id,), name=f'bulk-reply-{job_id}', daemon=True).start()
+
+    def resume_incomplete(self) -> List[int]:
+        """Relaunch queued or running jobs whose worker stopped heartbeating"""
+        stale_before = datetime.utcnow() - timedelta(seconds=self.LEASE_SECONDS)
+        job_ids = [job_id for (job_id,) in db.session.query(BulkReplyJob.id).filter(
+            BulkReplyJob.status.in_(BulkReplyJob.ACTIVE_STATUSES),
+            or_(BulkReplyJob.heartbeat_at.is_(None), BulkReplyJob.heartbeat_at < stale_before)
+        ).all()]
+
+        for job_id in job_ids:
+            logger.info(f"Resuming bulk reply job {job_id}")
+            self.launch(job_id)
+        return job_ids
+
+    def _claim(self, job_id: int) -> bool:
+        """Take the job's lease; fails if another worker heartbeated recently"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.LEASE_SECONDS)
+        claimed = db.session.execute(
+            update(BulkReplyJob)
+            .where(
+                BulkReplyJob.id == job_id,
+                BulkReplyJob.status.in_(BulkReplyJob.ACTIVE_STATUSES),
+                or_(BulkReplyJob.heartbeat_at.is_(None), BulkReplyJob.heartbeat_at < stale_before)
+            )
+            .values(status='running', heartbeat_at=now)
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    def _run_thread(self, job_id: int):
+        from app import app
+
+        with app.app_context():
+            try:
+                self.run(job_id)
+            except Exception as e:
+                logger.error(f"Bulk reply job {job_id} failed: {e}")
+                db.session.rollback()
+                job = BulkReplyJob.query.get(job_id)
+                if job:
+                    job.status = 'failed'
+                    job.error = str(e)
+                    job.finished_at = datetime.utcnow()
+                    db.session.commit()
+
+    def run(self, job_id: int):
+        """Process the job chunk by chunk until no pending reviews remain"""
+        if not self._claim(job_id):
+            logger.info(f"Bulk reply job {job_id} is already being processed")
+            return
+
+        heartbeat = BulkReplyHeartbeat(job_id, self.LEASE_SECONDS)
+        heartbeat.start()
+        try:
+            self._process(job_id)
+        finally:
+            heartbeat.stop()
+
+    def _process(self, job_id: int):
+        job = BulkReplyJob.query.get(job_id)
+        if not job.started_at:
+            job.started_at = datetime.utcnow()
+            # Don't hold the job's row lock while the first chunk runs; the heartbeat updates it
+            db.session.commit()
+
+        user = User.query.get(job.user_id)
+        settings = AutomationSettings.query.filter_by(user_id=job.user_id).first()
+        business_name = user.business_name or "our business"
+        tone = settings.ai_tone if settings else 'professional'
+
+        while True:
+            reviews = self._pending_query(job.user_id)\
+                .filter(Review.id > (job.last_review_id or 0))\
+                .order_by(Review.id)\
+                .limit(self.chunk_size).all()
+
+            if not reviews:
+                break
+
+            results = self._get_facade().analyze_reviews([
+                {
+                    'review_text': review.comment,
+                    'rating': review.rating,
+                    'business_name': business_name,
+                    'tone': tone,
+                    'fallback': False,
+                }
+                for review in reviews
+            ])
+
+            analyzed = []
+            for review, result in zip(reviews, results):
+                if isinstance(result, Exception) or result is None:
+                    job.failed_count = (job.failed_count or 0) + 1
+                    continue
+                review.ai_suggested_response = result['suggested_response']
+                if not review.sentiment:
+                    review.sentiment = result['sentiment']
+                    review.sentiment_score = result['confidence']
+                    analyzed.append(review)
+                if not review.review_category:
+                    review.review_category = result['category']
+                job.processed_count = (job.processed_count or 0) + 1
+            ReviewDailyStats.invalidate(analyzed)
+
+            # Results and checkpoint land in the same commit
+            job.last_review_id = reviews[-1].id
+            job.heartbeat_at = datetime.utcnow()
+            db.session.commit()
+            logger.info(f"Bulk reply job {job.id}: {job.processed_count}/{job.total_reviews} reviews")
+
+        job.status = 'completed'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+class BulkReplyHeartbeat(Thread):
+    """Keeps a running job's lease fresh however long one chunk takes"""
+
+    def __init__(self, job_id: int, lease_seconds: int):
+        super().__init__(name=f'bulk-reply-heartbeat-{job_id}', daemon=True)
+        self.job_id = job_id
+        self.lease_seconds = lease_seconds
+        self._stopped = Event()
+
+    def run(self):
+        from app import app
+
+        while not self._stopped.wait(self.lease_seconds / 3):
+            with app.app_context():
+                try:
+                    db.session.execute(
+                        update(BulkReplyJob)
+                        .where(BulkReplyJob.id == self.job_id, BulkReplyJob.status == 'running')
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    db.session.commit()
+                except Exception as e:
+                    logger.error(f"Error renewing bulk reply job {self.job_id} lease: {e}")
+                    db.session.rollback()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+# Initialize global runner instance
+bulk_reply_runner = BulkReplyJobRunner()
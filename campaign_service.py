@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import uuid
+import logging
+from datetime import datetime, timedelta
+from threading import Thread
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, or_, update
+
+from app import db
+from models import Customer, ReviewRequest, ReviewRequestCampaign, OutboundEmail, ReviewTemplate, User
+from template_engine import render_many
+from email_outbox_service import outbox_worker
+from utils import generate_review_link
+
+logger = logging.getLogger(__name__)
+
+class ReviewRequestCampaignRunner:
+    """
+    Sends review requests to a whole customer segment.
+
+    Creating a campaign bulk-inserts every ReviewRequest together with a
+    pre-rendered OutboundEmail row. Those rows are drained by the campaign's
+    own runner rather than the general outbox worker. The runner works in
+    batches over the pooled SMTP connections, throttled to the campaign's
+    max_per_minute. Progress counters and the runner's lease (heartbeat_at)
+    are updated after every batch. Pausing stops the runner at the next
+    batch boundary; resuming picks up the rows that are still queued.
+    """
+
+    LEASE_SECONDS = 120
+    PLACEHOLDER_TOKEN = '__review_token__'
+
+    def __init__(self, batch_size: int = None, max_per_minute: int = None, idle_wait: float = 1.0):
+        self.batch_size = batch_size or int(os.environ.get('CAMPAIGN_BATCH_SIZE', 100))
+        self.max_per_minute = max_per_minute or int(os.environ.get('CAMPAIGN_MAX_PER_MINUTE', 3000))
+        self.idle_wait = idle_wait
+
+    @staticmethod
+    def active_campaigns(user_id: int) -> List[ReviewRequestCampaign]:
+        return ReviewRequestCampaign.query.filter(
+            ReviewRequestCampaign.user_id == user_id,
+            ReviewRequestCampaign.status.in_(ReviewRequestCampaign.ACTIVE_STATUSES + ('paused',))
+        ).order_by(ReviewRequestCampaign.id.desc()).all()
+
+    def create_campaign(self, user: User, template: ReviewTemplate, customer_ids: Optional[List[int]] = None,
+                        filters: Optional[Dict] = None, max_per_minute: int = None) -> ReviewRequestCampaign:
+        """
+        Create review requests and their emails for the given customers, or
+        for every customer matching the segment filters. Needs a request
+        context to build review links.
+        """
+        if customer_ids is not None:
+            query = Customer.query.filter(Customer.user_id == user.id, Customer.id.in_(customer_ids))
+            filters = {'customer_ids': list(customer_ids)}
+        else:
+            filters = {key: value for key, value in (filters or {}).items() if value}
+            query = Customer.segment_query(user.id, **filters)
+
+        customers = query.with_entities(Customer.id, Customer.name, Customer.email).order_by(Customer.id).all()
+
+        campaign = ReviewRequestCampaign(
+            user_id=user.id,
+            template_id=template.id,
+            filters=json.dumps(filters),
+            total_count=len(customers),
+            max_per_minute=max_per_minute or self.max_per_minute
+        )
+        db.session.add(campaign)
+        db.session.flush()
+
+        if customers:
+            tokens = [str(uuid.uuid4()) for _ in customers]
+            db.session.execute(insert(ReviewRequest), [{
+                'user_id': user.id,
+                'customer_id': customer.id,
+                'template_id': template.id,
+                'unique_token': token,
+                'status': 'queued',
+                'sent_at': None,
+                'campaign_id': campaign.id,
+            } for customer, token in zip(customers, tokens)])
+
+            request_ids = dict(db.session.query(ReviewRequest.unique_token, ReviewRequest.id)
+                               .filter_by(campaign_id=campaign.id).all())
+
+            # Build the link once and swap the token in per customer
+            link_template = generate_review_link(self.PLACEHOLDER_TOKEN)
+            business_name = user.business_name
+            rendered = render_many(template, ({
+                'customer_name': customer.name,
+                'business_name': business_name,
+                'review_link': link_template.replace(self.PLACEHOLDER_TOKEN, token),
+            } for customer, token in zip(customers, tokens)))
+
+            db.session.execute(insert(OutboundEmail), [{
+                'user_id': user.id,
+                'review_request_id': request_ids[token],
+                'campaign_id': campaign.id,
+                'kind': 'review_request',
+                'to_email': customer.email,
+                'subject': subject,
+                'body': message,
+                'idempotency_key': f"review-request:{token}",
+                'status': 'queued',
+                'attempts': 0,
+                'max_attempts': outbox_worker.max_attempts,
+                'next_attempt_at': datetime.utcnow(),
+            } for customer, token, (subject, message) in zip(customers, tokens, rendered)])
+
+            now = datetime.utcnow()
+            customer_ids = [customer.id for customer in customers]
+            for start in range(0, len(customer_ids), 500):
+                Customer.query.filter(Customer.id.in_(customer_ids[start:start + 500]))\
+                    .update({'review_requested': True, 'review_request_date': now}, synchronize_session=False)
+
+        db.session.commit()
+        return campaign
+
+    def launch(self, campaign_id: int):
+        Thread(target=self._run_thread, args=(campaign_id,), name=f'campaign-{campaign_id}', daemon=True).start()
+
+    def pause(self, campaign_id: int) -> bool:
+        """Ask the runner to stop after its current batch"""
+        paused = db.session.execute(
+            update(ReviewRequestCampaign)
+            .where(ReviewRequestCampaign.id == campaign_id,
+                   ReviewRequestCampaign.status.in_(ReviewRequestCampaign.ACTIVE_STATUSES))
+            .values(status='paused')
+        ).rowcount
+        db.session.commit()
+        return paused == 1
+
+    def resume(self, campaign_id: int) -> bool:
+        """Queue a paused campaign again and start a runner for it"""
+        resumed = db.session.execute(
+            update(ReviewRequestCampaign)
+            .where(ReviewRequestCampaign.id == campaign_id, ReviewRequestCampaign.status == 'paused')
+            .values(status='queued')
+        ).rowcount
+        db.session.commit()
+        if resumed:
+            self.launch(campaign_id)
+        return resumed == 1
+
+    def resume_incomplete(self) -> List[int]:
+        """Relaunch queued or running campaigns whose runner stopped heartbeating"""
+        stale_before = datetime.utcnow() - timedelta(seconds=self.LEASE_SECONDS)
+        campaign_ids = [campaign_id for (campaign_id,) in db.session.query(ReviewRequestCampaign.id).filter(
+            ReviewRequestCampaign.status.in_(ReviewRequestCampaign.ACTIVE_STATUSES),
+            or_(ReviewRequestCampaign.heartbeat_at.is_(None), ReviewRequestCampaign.heartbeat_at < stale_before)
+        ).all()]
+
+        for campaign_id in campaign_ids:
+            logger.info(f"Resuming review request campaign {campaign_id}")
+            self.launch(campaign_id)
+        return campaign_ids
+
+    def _claim(self, campaign_id: int) -> bool:
+        """Take the campaign's lease; fails if another runner heartbeated recently"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.LEASE_SECONDS)
+        claimed = db.session.execute(
+            update(ReviewRequestCampaign)
+            .where(
+                ReviewRequestCampaign.id == campaign_id,
+                ReviewRequestCampaign.status.in_(ReviewRequestCampaign.ACTIVE_STATUSES),
+                or_(ReviewRequestCampaign.heartbeat_at.is_(None), ReviewRequestCampaign.heartbeat_at < stale_before)
+            )
+            .values(status='running', heartbeat_at=now)
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    def _checkpoint(self, campaign_id: int, sent: int = 0, failed: int = 0):
+        """Commit the batch's outcome together with the progress counters and a renewed lease"""
+        campaign = ReviewRequestCampaign.__table__.c
+        db.session.execute(
+            update(ReviewRequestCampaign)
+            .where(campaign.id == campaign_id)
+            .values(sent_count=campaign.sent_count + sent,
+                    failed_count=campaign.failed_count + failed,
+                    heartbeat_at=datetime.utcnow())
+        )
+        # Resumed before this runner noticed the pause
+        db.session.execute(
+            update(ReviewRequestCampaign)
+            .where(campaign.id == campaign_id, campaign.status == 'queued')
+            .values(status='running')
+        )
+        db.session.commit()
+
+    def _release_if_paused(self, campaign_id: int) -> bool:
+        """Give up the lease if the campaign was paused, so a resume can start a new runner"""
+        released = db.session.execute(
+            update(ReviewRequestCampaign)
+            .where(ReviewRequestCampaign.id == campaign_id, ReviewRequestCampaign.status == 'paused')
+            .values(heartbeat_at=None)
+        ).rowcount
+        db.session.commit()
+        return released == 1
+
+    def _run_thread(self, campaign_id: int):
+        from app import app
+
+        with app.app_context():
+            try:
+                self.run(campaign_id)
+            except Exception as e:
+                logger.error(f"Review request campaign {campaign_id} failed: {e}")
+                db.session.rollback()
+                campaign = ReviewRequestCampaign.query.get(campaign_id)
+                if campaign:
+                    campaign.status = 'failed'
+                    campaign.error = str(e)
+                    campaign.finished_at = datetime.utcnow()
+                    db.session.commit()
+
+    def run(self, campaign_id: int):
+        """Send the campaign's queued emails batch by batch until none are left"""
+        if not self._claim(campaign_id):
+            logger.info(f"Review request campaign {campaign_id} is already being processed")
+            return
+
+        campaign = ReviewRequestCampaign.query.get(campaign_id)
+        if not campaign.started_at:
+            campaign.started_at = datetime.utcnow()
+            db.session.commit()
+        max_per_minute = campaign.max_per_minute or self.max_per_minute
+        seconds_per_email = 60.0 / max_per_minute
+        # Keep each throttled batch well inside the lease
+        batch_size = max(1, min(self.batch_size, max_per_minute // 2))
+
+        while True:
+            if self._release_if_paused(campaign_id):
+                logger.info(f"Review request campaign {campaign_id} paused")
+                return
+
+            started = time.monotonic()
+            emails = outbox_worker.claim(campaign_id=campaign_id, limit=batch_size)
+
+            if not emails:
+                waiting = db.session.query(OutboundEmail.id).filter_by(
+                    campaign_id=campaign_id, status='queued'
+                ).first()
+                if not waiting:
+                    break
+                # Only retries waiting out their backoff are left
+                self._checkpoint(campaign_id)
+                time.sleep(self.idle_wait)
+                continue
+
+            sent, failed = outbox_worker.process(emails)
+            self._checkpoint(campaign_id, sent, failed)
+
+            # Throttle to the campaign's messages per minute
+            remaining = len(emails) * seconds_per_email - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+        db.session.execute(
+            update(ReviewRequestCampaign)
+            .where(ReviewRequestCampaign.id == campaign_id,
+                   ReviewRequestCampaign.status.in_(ReviewRequestCampaign.ACTIVE_STATUSES))
+            .values(status='completed', finished_at=datetime.utcnow(), heartbeat_at=None)
+        )
+        db.session.commit()
+        logger.info(f"Review request campaign {campaign_id} completed")
+
+# Initialize global runner instance
+campaign_runner = ReviewRequestCampaignRunner()
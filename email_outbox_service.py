@@ -0,0 +1,324 @@
+import os
+import uuid
+import random
+import smtplib
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Event, Lock
+from typing import Dict, List, Tuple
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import User, ReviewRequest, FollowUpSequence, OutboundEmail
+from gmail_service import build_email_message, build_review_request_message, deliver_message
+
+logger = logging.getLogger(__name__)
+
+SERVERLESS = bool(os.environ.get('VERCEL') or os.environ.get('VERCEL_ENV'))
+
+def enqueue_email(to_email: str, subject: str, message: str, user_id: int = None,
+                  attachment_path: str = None, kind: str = 'generic', review_request_id: int = None,
+                  idempotency_key: str = None, commit: bool = True) -> OutboundEmail:
+    """
+    Queue an email for delivery by the outbox worker.
+
+    Takes the same arguments as gmail_service.send_email. With commit=False
+    the row joins the caller's transaction and is picked up on the worker's
+    next poll after the caller commits. An idempotency_key that was already
+    used returns the existing row instead of queueing a second email.
+
+    The attachment is read now and stored with the row: the worker that
+    sends it may run on another machine, or after the file was pruned.
+    """
+    if idempotency_key:
+        existing = OutboundEmail.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+
+    attachment_name = attachment_data = None
+    if attachment_path:
+        with open(attachment_path, 'rb') as f:
+            attachment_data = f.read()
+        attachment_name = os.path.basename(attachment_path)
+
+    email = OutboundEmail(
+        user_id=user_id,
+        review_request_id=review_request_id,
+        kind=kind,
+        to_email=to_email,
+        subject=subject,
+        body=message,
+        attachment_path=attachment_path,
+        attachment_name=attachment_name,
+        attachment_data=attachment_data,
+        idempotency_key=idempotency_key,
+        max_attempts=outbox_worker.max_attempts
+    )
+
+    try:
+        # Savepoint so a duplicate key doesn't roll back the caller's changes
+        with db.session.begin_nested():
+            db.session.add(email)
+    except IntegrityError:
+        existing = OutboundEmail.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+        raise
+
+    if commit:
+        db.session.commit()
+        outbox_worker.wake()
+    return email
+
+class EmailOutboxWorker:
+    """
+    Delivers queued OutboundEmail rows.
+
+    Each batch of due messages is leased with a conditional UPDATE, so
+    several workers can drain the same table without sending a message
+    twice. The batch is sent concurrently over the pooled SMTP connections
+    and the outcome of the whole batch is committed at once. Failed messages
+    are retried with exponential backoff. Once they run out of attempts, or
+    the server rejects them permanently, they are dead-lettered (status
+    'dead') and kept for inspection.
+    """
+
+    LEASE_SECONDS = 300
+
+    def __init__(self, batch_size: int = None, poll_interval: float = None, max_concurrency: int = None,
+                 max_attempts: int = None, backoff_base: float = None, backoff_max: float = None):
+        self.batch_size = batch_size or int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 50))
+        self.poll_interval = poll_interval or float(os.environ.get('EMAIL_OUTBOX_POLL_INTERVAL', 5))
+        self.max_concurrency = max_concurrency or int(os.environ.get('SMTP_POOL_SIZE', 4))
+        self.max_attempts = max_attempts or int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+        self.backoff_base = backoff_base or float(os.environ.get('EMAIL_RETRY_BACKOFF_BASE', 30))
+        self.backoff_max = backoff_max or float(os.environ.get('EMAIL_RETRY_BACKOFF_MAX', 3600))
+
+        self.worker_id = uuid.uuid4().hex
+        self._wakeup = Event()
+        self._thread = None
+        self._executor = None
+        self._lock = Lock()
+        self._stopping = False
+
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+
+    def wake(self):
+        """Tell the worker new mail is waiting"""
+        if SERVERLESS:
+            # Serverless functions can't keep a background thread alive, and
+            # sending here would put SMTP back in the request; the rows wait
+            # for the cron-triggered /_outbox/drain instead
+            return
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        """Start the background worker thread"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+            logger.info("Email outbox worker started")
+
+    def stop(self, timeout: float = None):
+        """Stop the worker thread after its current batch"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix='email-outbox-send'
+            )
+        return self._executor
+
+    def _run(self):
+        from app import app
+
+        while not self._stopping:
+            self._wakeup.clear()
+            with app.app_context():
+                try:
+                    self.drain()
+                except Exception as e:
+                    logger.error(f"Error draining email outbox: {e}")
+                    db.session.rollback()
+            self._wakeup.wait(self.poll_interval)
+
+    def drain(self) -> int:
+        """Deliver due messages batch by batch until none are left"""
+        total = 0
+        while not self._stopping:
+            handled = self.drain_batch()
+            total += handled
+            if handled < self.batch_size:
+                break
+        return total
+
+    def claim(self, campaign_id: int = None, limit: int = None) -> List[OutboundEmail]:
+        """
+        Lease a batch of due messages for this worker. Campaign messages are
+        left to the campaign runner unless campaign_id asks for them.
+        """
+        now = datetime.utcnow()
+        due = or_(OutboundEmail.locked_until.is_(None), OutboundEmail.locked_until < now)
+
+        ids = [email_id for (email_id,) in db.session.query(OutboundEmail.id).filter(
+            OutboundEmail.status == 'queued',
+            OutboundEmail.next_attempt_at <= now,
+            OutboundEmail.campaign_id.is_(None) if campaign_id is None else OutboundEmail.campaign_id == campaign_id,
+            due
+        ).order_by(OutboundEmail.next_attempt_at, OutboundEmail.id).limit(limit or self.batch_size).all()]
+        if not ids:
+            return []
+
+        # Another worker may have leased some of these since the select
+        lease = f"{self.worker_id}:{uuid.uuid4().hex[:8]}"
+        db.session.execute(
+            update(OutboundEmail)
+            .where(OutboundEmail.id.in_(ids), OutboundEmail.status == 'queued', due)
+            .values(locked_by=lease, locked_until=now + timedelta(seconds=self.LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        return OutboundEmail.query.filter_by(locked_by=lease).order_by(OutboundEmail.id).all()
+
+    @staticmethod
+    def _snapshot(emails: List[OutboundEmail]) -> List[Dict]:
+        """Plain data for the sender threads, with business names loaded in one query"""
+        user_ids = {email.user_id for email in emails if email.user_id}
+        business_names = dict(
+            db.session.query(User.id, User.business_name).filter(User.id.in_(user_ids)).all()
+        ) if user_ids else {}
+
+        return [{
+            'id': email.id,
+            'kind': email.kind,
+            'to_email': email.to_email,
+            'subject': email.subject,
+            'body': email.body,
+            'attachment_path': email.attachment_path,
+            'attachment_name': email.attachment_name,
+            'attachment_data': email.attachment_data,
+            'business_name': business_names.get(email.user_id),
+        } for email in emails]
+
+    @staticmethod
+    def _deliver(job: Dict):
+        if job['kind'] == 'review_request':
+            msg = build_review_request_message(job['to_email'], job['subject'], job['body'], job['business_name'])
+        else:
+            # Raises if a row queued with only a path has lost its file, so it is retried
+            msg = build_email_message(job['to_email'], job['subject'], job['body'], job['business_name'],
+                                      job['attachment_path'], job['attachment_name'], job['attachment_data'])
+        deliver_message(msg)
+
+    @staticmethod
+    def _is_permanent(error: Exception) -> bool:
+        """Rejections that retrying won't fix"""
+        if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+            return True
+        return (isinstance(error, smtplib.SMTPResponseException)
+                and not isinstance(error, smtplib.SMTPAuthenticationError)
+                and error.smtp_code >= 500)
+
+    def _retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with jitter"""
+        delay = min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+        return random.uniform(delay / 2, delay)
+
+    def process(self, emails: List[OutboundEmail]) -> Tuple[int, int]:
+        """
+        Send claimed messages concurrently and record each outcome on its row,
+        and on the review request or follow-up it belongs to. Returns (sent,
+        dead-lettered); the caller commits.
+        """
+        jobs = self._snapshot(emails)
+        futures = [self._get_executor().submit(self._deliver, job) for job in jobs]
+
+        now = datetime.utcnow()
+        sent_requests, dead_requests = [], []
+        sent_follow_ups, dead_follow_ups = [], []
+        sent = dead = 0
+        for email, future in zip(emails, futures):
+            try:
+                future.result()
+                error = None
+            except Exception as e:
+                error = e
+
+            email.attempts = (email.attempts or 0) + 1
+            email.locked_by = None
+            email.locked_until = None
+
+            if error is None:
+                email.status = 'sent'
+                email.sent_at = now
+                email.last_error = None
+                if email.review_request_id:
+                    sent_requests.append(email.review_request_id)
+                if email.follow_up_id:
+                    sent_follow_ups.append(email.follow_up_id)
+                sent += 1
+            elif self._is_permanent(error) or email.attempts >= (email.max_attempts or self.max_attempts):
+                email.status = 'dead'
+                email.last_error = str(error)
+                if email.review_request_id:
+                    dead_requests.append(email.review_request_id)
+                if email.follow_up_id:
+                    dead_follow_ups.append(email.follow_up_id)
+                logger.error(f"Giving up on email {email.id} to {email.to_email}: {error}")
+                dead += 1
+            else:
+                delay = self._retry_delay(email.attempts)
+                email.next_attempt_at = now + timedelta(seconds=delay)
+                email.last_error = str(error)
+                logger.warning(f"Email {email.id} to {email.to_email} failed ({error}), retrying in {delay:.0f}s")
+                self.retried += 1
+
+        if sent_requests:
+            ReviewRequest.query.filter(ReviewRequest.id.in_(sent_requests))\
+                .update({'sent_at': now}, synchronize_session=False)
+            ReviewRequest.query.filter(ReviewRequest.id.in_(sent_requests), ReviewRequest.status == 'queued')\
+                .update({'status': 'sent'}, synchronize_session=False)
+        if dead_requests:
+            ReviewRequest.query.filter(ReviewRequest.id.in_(dead_requests))\
+                .update({'status': 'failed'}, synchronize_session=False)
+        if sent_follow_ups:
+            FollowUpSequence.query.filter(FollowUpSequence.id.in_(sent_follow_ups))\
+                .update({'status': 'sent', 'sent_at': now}, synchronize_session=False)
+        if dead_follow_ups:
+            FollowUpSequence.query.filter(FollowUpSequence.id.in_(dead_follow_ups))\
+                .update({'status': 'failed'}, synchronize_session=False)
+
+        self.sent += sent
+        self.dead += dead
+        return sent, dead
+
+    def drain_batch(self) -> int:
+        """Claim, send and record one batch; returns how many messages were handled"""
+        emails = self.claim()
+        if not emails:
+            return 0
+
+        self.process(emails)
+        db.session.commit()
+        return len(emails)
+
+# Initialize global worker instance
+outbox_worker = EmailOutboxWorker()
@@ -0,0 +1,246 @@
+import os
+import time
+import queue
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Lock
+from typing import Dict, List
+
+from sqlalchemy import or_, update
+
+from app import db
+from models import Review, AutomationSettings, ReviewDailyStats
+from ai_service import mistral_service
+
+logger = logging.getLogger(__name__)
+
+class ReviewEnrichmentPipeline:
+    """
+    Background pipeline that runs AI analysis for new reviews.
+
+    Review IDs are taken off a queue and processed in batches. The combined
+    analyze_review call for every review in a batch is fanned out over a
+    bounded thread pool, so many reviews are in flight at once. Each batch
+    is written back with a single commit.
+
+    The queue lives in memory, so a review is also flagged
+    enrichment_pending when it is queued. A batch claims its reviews with a
+    conditional UPDATE on enrichment_locked_until before calling the AI, so
+    a review is analyzed by one process at a time, and clears the flag when
+    it writes the results back. The sweep_pending job picks up flagged
+    reviews whose process died or whose claim expired.
+    """
+
+    LEASE_SECONDS = 300
+
+    def __init__(self, ai_service=mistral_service, max_concurrency: int = None,
+                 batch_size: int = None, batch_timeout: float = 2.0):
+        self.ai_service = ai_service
+        self.max_concurrency = max_concurrency or int(os.environ.get('ENRICHMENT_CONCURRENCY', 8))
+        self.batch_size = batch_size or int(os.environ.get('ENRICHMENT_BATCH_SIZE', 20))
+        self.batch_timeout = batch_timeout
+
+        self._queue = queue.Queue()
+        self._executor = None
+        self._thread = None
+        self._lock = Lock()
+        self._stopping = False
+
+        self.processed = 0
+        self.failed = 0
+
+    def enqueue(self, review_id: int):
+        """Queue a review for enrichment, starting the worker if needed"""
+        self.start()
+        self._queue.put(review_id)
+
+    def sweep_pending(self) -> int:
+        """
+        Enrich flagged reviews nobody holds a claim on, e.g. ones queued in a
+        process that restarted before getting to them. Runs as a scheduled
+        job; returns how many reviews were enriched.
+        """
+        enriched = 0
+        last_id = 0
+        while True:
+            review_ids = [review_id for (review_id,) in db.session.query(Review.id).filter(
+                Review.enrichment_pending.is_(True),
+                or_(Review.enrichment_locked_until.is_(None), Review.enrichment_locked_until < datetime.utcnow()),
+                Review.id > last_id
+            ).order_by(Review.id).limit(self.batch_size).all()]
+            if not review_ids:
+                break
+            last_id = review_ids[-1]
+            enriched += self.process_batch(review_ids)
+
+        if enriched:
+            logger.info(f"Swept {enriched} reviews left unenriched")
+        return enriched
+
+    def start(self):
+        """Start the background worker thread"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = Thread(target=self._run, name='review-enrichment', daemon=True)
+            self._thread.start()
+            logger.info("Review enrichment pipeline started")
+
+    def stop(self, timeout: float = None):
+        """Drain the queue and stop the worker thread"""
+        self._stopping = True
+        if self._thread:
+            self._thread.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix='review-enrichment-call'
+            )
+        return self._executor
+
+    def _next_batch(self) -> List[int]:
+        """Block for the first ID, then collect more until the batch fills or times out"""
+        try:
+            batch = [self._queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        from app import app
+
+        while not (self._stopping and self._queue.empty()):
+            review_ids = self._next_batch()
+            if not review_ids:
+                continue
+
+            with app.app_context():
+                try:
+                    self.process_batch(review_ids)
+                except Exception as e:
+                    logger.error(f"Error enriching reviews {review_ids}: {e}")
+                    db.session.rollback()
+                finally:
+                    for _ in review_ids:
+                        self._queue.task_done()
+
+    def _claim(self, review_ids: List[int]) -> List[int]:
+        """Lease the flagged reviews no other process is analyzing; returns the IDs this one got"""
+        now = datetime.utcnow()
+        claimed = []
+        for review_id in review_ids:
+            rowcount = db.session.execute(
+                update(Review)
+                .where(
+                    Review.id == review_id,
+                    Review.enrichment_pending.is_(True),
+                    or_(Review.enrichment_locked_until.is_(None), Review.enrichment_locked_until < now)
+                )
+                .values(enrichment_locked_until=now + timedelta(seconds=self.LEASE_SECONDS))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if rowcount == 1:
+                claimed.append(review_id)
+        db.session.commit()
+        return claimed
+
+    def _load_jobs(self, review_ids: List[int]) -> List[Dict]:
+        """Snapshot what the AI calls need so worker threads never touch the ORM"""
+        rows = db.session.query(Review, AutomationSettings)\
+            .outerjoin(AutomationSettings, AutomationSettings.user_id == Review.user_id)\
+            .filter(Review.id.in_(review_ids)).all()
+
+        jobs = []
+        for review, settings in rows:
+            if not review.comment:
+                # Nothing to analyze
+                review.enrichment_pending = False
+                review.enrichment_locked_until = None
+                continue
+            jobs.append({
+                'review_id': review.id,
+                'comment': review.comment,
+                'rating': review.rating,
+                'business_name': review.user.business_name or "our business",
+                'auto_reply': bool(settings and settings.ai_auto_reply_enabled),
+                'tone': settings.ai_tone if settings else 'professional',
+            })
+        return jobs
+
+    def _submit(self, job: Dict):
+        """Start the AI analysis for one review without waiting on it"""
+        return self._get_executor().submit(
+            self.ai_service.analyze_review,
+            job['comment'], job['rating'], job['business_name'], job['tone'],
+            include_response=job['auto_reply']
+        )
+
+    def process_batch(self, review_ids: List[int]) -> int:
+        """
+        Enrich a batch of reviews and commit the results together. Reviews
+        another process has claimed are skipped; ones whose analysis fails
+        stay flagged and are retried by the sweep once the claim expires.
+        """
+        from automation_service import AutomationService
+
+        jobs = self._load_jobs(self._claim(review_ids))
+        # Release the connection while the AI calls are in flight
+        db.session.commit()
+
+        in_flight = [(job, self._submit(job)) for job in jobs]
+
+        results = {}
+        for job, future in in_flight:
+            try:
+                results[job['review_id']] = (job, future.result())
+            except Exception as e:
+                logger.error(f"Error enriching review {job['review_id']}: {e}")
+                self.failed += 1
+
+        if not results:
+            return 0
+
+        five_star_reviews = []
+        reviews = Review.query.filter(Review.id.in_(list(results))).all()
+        for review in reviews:
+            job, analysis = results[review.id]
+            review.sentiment = analysis['sentiment']
+            review.sentiment_score = analysis['confidence']
+            review.review_category = analysis['category']
+            if job['auto_reply']:
+                review.ai_suggested_response = analysis['suggested_response']
+            if review.rating == 5:
+                five_star_reviews.append(review)
+            review.enrichment_pending = False
+            review.enrichment_locked_until = None
+        ReviewDailyStats.invalidate(reviews)
+
+        db.session.commit()
+        self.processed += len(results)
+        logger.info(f"Enriched {len(results)} reviews")
+
+        # Referral rewards send email and commit on their own
+        for review in five_star_reviews:
+            AutomationService.trigger_referral_reward(review.customer_id, review.id)
+
+        return len(results)
+
+# Initialize global pipeline instance
+enrichment_pipeline = ReviewEnrichmentPipeline()
@@ -0,0 +1,168 @@
+import io
+import os
+import csv
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from app import db
+from models import Customer, Review, ReviewConversation
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the cursor, and written out, per chunk
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+class ExportError(ValueError):
+    """An export was requested with an unknown dataset, format, column or date"""
+
+class ExportDataset:
+    """
+    One exportable table: the columns a user may pick, keyed by their name
+    in the output, how to scope rows to a user and which timestamp the date
+    range applies to.
+    """
+
+    def __init__(self, name: str, model, columns: Dict, date_column, user_column, joins=()):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.date_column = date_column
+        self.user_column = user_column
+        self.joins = joins
+
+    def statement(self, user_id: int, columns: List[str], start: Optional[date], end: Optional[date]):
+        """SELECT of just the requested columns, oldest row first"""
+        query = select(*[self.columns[name].label(name) for name in columns]).select_from(self.model)
+        for target, onclause in self.joins:
+            query = query.join(target, onclause)
+        query = query.where(self.user_column == user_id)
+        if start:
+            query = query.where(self.date_column >= datetime.combine(start, datetime.min.time()))
+        if end:
+            # The end date is inclusive
+            query = query.where(self.date_column < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        return query.order_by(self.model.id)
+
+DATASETS = {
+    'reviews': ExportDataset('reviews', Review, {
+        'id': Review.id,
+        'created_at': Review.created_at,
+        'customer_id': Review.customer_id,
+        'customer_name': Customer.name,
+        'customer_email': Customer.email,
+        'rating': Review.rating,
+        'status': Review.status,
+        'comment': Review.comment,
+        'sentiment': Review.sentiment,
+        'sentiment_score': Review.sentiment_score,
+        'review_category': Review.review_category,
+        'admin_response': Review.admin_response,
+        'response_date': Review.response_date,
+    }, date_column=Review.created_at, user_column=Review.user_id,
+        joins=[(Customer, Customer.id == Review.customer_id)]),
+    'customers': ExportDataset('customers', Customer, {
+        'id': Customer.id,
+        'created_at': Customer.created_at,
+        'name': Customer.name,
+        'email': Customer.email,
+        'phone': Customer.phone,
+        'service_type': Customer.service_type,
+        'appointment_date': Customer.appointment_date,
+        'review_requested': Customer.review_requested,
+        'review_request_date': Customer.review_request_date,
+        'total_services': Customer.total_services,
+        'average_rating': Customer.average_rating,
+        'last_rating': Customer.last_rating,
+        'location': Customer.location,
+    }, date_column=Customer.created_at, user_column=Customer.user_id),
+    'conversations': ExportDataset('conversations', ReviewConversation, {
+        'id': ReviewConversation.id,
+        'sent_at': ReviewConversation.sent_at,
+        'review_id': ReviewConversation.review_id,
+        'rating': Review.rating,
+        'sender': ReviewConversation.sender,
+        'is_ai_generated': ReviewConversation.is_ai_generated,
+        'message': ReviewConversation.message,
+    }, date_column=ReviewConversation.sent_at, user_column=Review.user_id,
+        joins=[(Review, Review.id == ReviewConversation.review_id)]),
+}
+
+def _parse_date(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ExportError(f"{name} must be a date like 2024-01-31")
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _csv_chunks(names: List[str], partitions) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for rows in partitions:
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _ndjson_chunks(names: List[str], partitions) -> Iterator[str]:
+    for rows in partitions:
+        yield ''.join(
+            json.dumps(dict(zip(names, [_plain(value) for value in row]))) + '\n'
+            for row in rows
+        )
+
+def build_export(user_id: int, dataset: str, fmt: str, columns: Optional[str] = None,
+                 start: Optional[str] = None, end: Optional[str] = None) -> Iterator[str]:
+    """
+    Validate an export request and return a generator of CSV or NDJSON text
+    chunks. Rows are read through a server-side cursor EXPORT_BATCH_SIZE at
+    a time and written out chunk by chunk, so memory stays flat whatever
+    the number of rows. The query only runs once the generator is iterated.
+    """
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        raise ExportError(f"Unknown dataset '{dataset}'")
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}'")
+
+    names = [name.strip() for name in columns.split(',') if name.strip()] if columns else list(spec.columns)
+    unknown = [name for name in names if name not in spec.columns]
+    if unknown or not names:
+        raise ExportError(f"Unknown columns for {dataset}: {', '.join(unknown) or '(none given)'}")
+
+    start_date, end_date = _parse_date(start, 'start'), _parse_date(end, 'end')
+    statement = spec.statement(user_id, names, start_date, end_date)
+    write = _csv_chunks if fmt == 'csv' else _ndjson_chunks
+
+    def generate():
+        result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        try:
+            yield from write(names, result.partitions())
+        except Exception as e:
+            logger.error(f"Error exporting {dataset} for user {user_id}: {e}")
+            raise
+        finally:
+            result.close()
+
+    return generate()
+
+def export_filename(dataset: str, fmt: str) -> str:
+    return f"{dataset}_{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, PasswordField, SubmitField, SelectField, DateTimeField, IntegerField, BooleanField, HiddenField
-from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange, Optional, URL
+from wtforms.validators import DataRequired, Email, Length, EqualTo, NumberRange, Optional, URL, ValidationError
 from wtforms.widgets import TextArea
 
 class LoginForm(FlaskForm):
@@ -24,6 +24,21 @@ class ReviewTemplateForm(FlaskForm):
                            widget=TextArea(), render_kw={"rows": 8})
     is_default = BooleanField('Set as Default Template')
     submit = SubmitField('Save Template')
+    
+    def validate_subject(self, field):
+        self._validate_placeholders(field)
+    
+    def validate_message(self, field):
+        self._validate_placeholders(field)
+    
+    @staticmethod
+    def _validate_placeholders(field):
+        from template_engine import TemplateError, validate
+        
+        try:
+            validate(field.data or '')
+        except TemplateError as e:
+            raise ValidationError(str(e))
 
 class CustomerForm(FlaskForm):
     name = StringField('Customer Name', validators=[DataRequired(), Length(min=2, max=200)])
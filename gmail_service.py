@@ -1,46 +1,235 @@
 import os
+import time
+import uuid
 import smtplib
+from contextlib import contextmanager
 from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from email.utils import formatdate
+from threading import Condition, Lock
 import logging
 
+from metrics import registry
+
 logger = logging.getLogger(__name__)
 
+SMTP_SENDS = registry.counter('smtp_sends_total', 'Emails handed to the SMTP server, by outcome', ['outcome'])
+SMTP_SEND_SECONDS = registry.histogram('smtp_send_duration_seconds', 'Time to send one email over SMTP')
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of authenticated SMTP connections.
+    
+    Idle connections are reused instead of paying for a new TCP connection,
+    STARTTLS handshake and login per email. A connection that has been idle
+    for a while is checked with NOOP before reuse, idle connections older
+    than idle_timeout are closed, and each connection is retired after
+    max_messages sends.
+    """
+    
+    def __init__(self, host, port, username, password, use_tls=True, max_size=4,
+                 idle_timeout=60, health_check_after=10, max_messages=100, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.max_messages = max_messages
+        self.timeout = timeout
+        
+        self._idle = []  # [(server, last_used, messages_sent)]
+        self._open = 0
+        self._condition = Condition(Lock())
+        
+        self.connections_opened = 0
+        self.messages_sent = 0
+    
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        self.connections_opened += 1
+        return server
+    
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+    
+    def _is_healthy(self, server):
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+    
+    def _acquire(self):
+        """Return (server, messages_sent), reusing an idle connection when one is usable"""
+        while True:
+            with self._condition:
+                while not self._idle and self._open >= self.max_size:
+                    self._condition.wait()
+                if self._idle:
+                    server, last_used, sent = self._idle.pop()
+                else:
+                    self._open += 1
+                    server = None
+            
+            if server is None:
+                try:
+                    return self._connect(), 0
+                except Exception:
+                    self._discard()
+                    raise
+            
+            idle_for = time.monotonic() - last_used
+            if idle_for < self.idle_timeout and (idle_for < self.health_check_after or self._is_healthy(server)):
+                return server, sent
+            
+            # Stale or dead connection: drop it and try again
+            self._close(server)
+            self._discard()
+    
+    def _discard(self):
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+    
+    def _release(self, server, sent, broken=False):
+        if broken or sent >= self.max_messages:
+            self._close(server)
+            self._discard()
+            return
+        with self._condition:
+            self._idle.append((server, time.monotonic(), sent))
+            self._condition.notify()
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it goes back to the pool unless an error broke it"""
+        server, sent = self._acquire()
+        try:
+            yield server
+        except Exception:
+            self._release(server, sent, broken=True)
+            raise
+        self._release(server, sent + 1)
+    
+    def send_message(self, msg):
+        """Send one message, reconnecting once if the pooled connection was dropped"""
+        for attempt in range(2):
+            try:
+                with self.connection() as server:
+                    server.send_message(msg)
+                self.messages_sent += 1
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                if attempt:
+                    raise
+                logger.warning(f"SMTP connection dropped ({e}), reconnecting")
+    
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for server, _, _ in idle:
+            self._close(server)
+
+_smtp_pool = None
+_smtp_pool_lock = Lock()
+
+def get_smtp_pool(gmail_user, gmail_password):
+    """Shared pool for the configured account, rebuilt if the credentials change"""
+    global _smtp_pool
+    host = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+    port = int(os.environ.get('SMTP_PORT', 587))
+    
+    with _smtp_pool_lock:
+        pool = _smtp_pool
+        if pool is None or (pool.host, pool.port, pool.username, pool.password) != (host, port, gmail_user, gmail_password):
+            if pool is not None:
+                pool.close_all()
+            pool = _smtp_pool = SMTPConnectionPool(
+                host, port, gmail_user, gmail_password,
+                use_tls=os.environ.get('SMTP_USE_TLS', 'true').lower() != 'false',
+                max_size=int(os.environ.get('SMTP_POOL_SIZE', 4)),
+                idle_timeout=float(os.environ.get('SMTP_IDLE_TIMEOUT', 60)),
+                max_messages=int(os.environ.get('SMTP_MAX_MESSAGES_PER_CONNECTION', 100))
+            )
+        return pool
+
+def format_review_request_message(message_template, customer_name, business_name, review_link):
+    """Fill the review request template placeholders"""
+    from template_engine import compile_text
+    
+    return compile_text(message_template).render({
+        'customer_name': customer_name,
+        'business_name': business_name,
+        'review_link': review_link
+    })
+
+def build_review_request_message(to_email, subject, message, business_name):
+    """Build the plain text review request email"""
+    gmail_user = os.environ.get('GMAIL_USER')
+    
+    msg = MIMEText(message, 'plain')
+    msg['Subject'] = subject
+    msg['From'] = f"{business_name} <{gmail_user}>"
+    msg['To'] = to_email
+    msg['Reply-To'] = gmail_user
+    return msg
+
+def deliver_message(msg):
+    """Send a built message over the pooled connection; raises on failure"""
+    gmail_user = os.environ.get('GMAIL_USER')
+    gmail_password = os.environ.get('GMAIL_PASSWORD')
+    
+    if not gmail_user or not gmail_password:
+        raise RuntimeError("Gmail credentials not configured. Please set GMAIL_USER and GMAIL_PASSWORD.")
+    
+    started = time.monotonic()
+    try:
+        get_smtp_pool(gmail_user, gmail_password).send_message(msg)
+    except Exception:
+        SMTP_SENDS.inc(outcome='failed')
+        raise
+    finally:
+        SMTP_SEND_SECONDS.observe(time.monotonic() - started)
+    SMTP_SENDS.inc(outcome='sent')
+
 def send_review_request_email(to_email, subject, message_template, customer_name, business_name, review_link):
     """
     Send a review request email to a customer using Gmail SMTP.
     """
     try:
         # Format the message with variables
-        formatted_message = message_template.format(
-            customer_name=customer_name,
-            business_name=business_name,
-            review_link=review_link
+        formatted_message = format_review_request_message(
+            message_template, customer_name, business_name, review_link
         )
         
-        # Get Gmail credentials
-        gmail_user = os.environ.get('GMAIL_USER')
-        gmail_password = os.environ.get('GMAIL_PASSWORD')
-        
-        if not gmail_user or not gmail_password:
+        if not os.environ.get('GMAIL_USER') or not os.environ.get('GMAIL_PASSWORD'):
             logger.error("Gmail credentials not configured. Please set GMAIL_USER and GMAIL_PASSWORD.")
             logger.info(f"Would send email to: {to_email}")
             logger.info(f"Subject: {subject}")
             logger.info(f"Message: {formatted_message}")
             return False
         
-        # Create email message
-        msg = MIMEText(formatted_message, 'plain')
-        msg['Subject'] = subject
-        msg['From'] = f"{business_name} <{gmail_user}>"
-        msg['To'] = to_email
-        msg['Reply-To'] = gmail_user
-        
-        # Send via Gmail SMTP
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(gmail_user, gmail_password)
-        server.send_message(msg)
-        server.quit()
+        # Send via Gmail SMTP over a pooled connection
+        deliver_message(build_review_request_message(to_email, subject, formatted_message, business_name))
         
         logger.info(f"Email sent successfully to {to_email}")
         return True
@@ -65,81 +254,87 @@ def send_admin_notification(admin_email, customer_name, rating, comment):
         logger.error(f"Error with admin notification: {str(e)}")
         return False
 
+def build_email_message(to_email, subject, message, business_name=None, attachment_path=None,
+                        attachment_name=None, attachment_data=None):
+    """
+    Build the HTML + plain text email used by the automation features.
+    The attachment is either attachment_data (named attachment_name) or the
+    file at attachment_path; a path that doesn't exist raises rather than
+    sending the email without it.
+    """
+    gmail_user = os.environ.get('GMAIL_USER')
+    business_name = business_name or "Review Automation Platform"
+    
+    # Create message with proper headers
+    msg = MIMEMultipart()
+    msg['From'] = f"{business_name} <{gmail_user}>"
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg['Reply-To'] = gmail_user
+    
+    # Add headers
+    msg['Message-ID'] = f"<{uuid.uuid4()}@{gmail_user.split('@')[1] if gmail_user else 'localhost'}>"
+    msg['Date'] = formatdate(localtime=True)
+    
+    # Create HTML version
+    html_body = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+            <p>{message.replace(chr(10), '<br>')}</p>
+            <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
+            <p style="font-size: 12px; color: #666;">
+                This email was sent from {business_name}.
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    # Add both versions
+    msg.attach(MIMEText(message, 'plain'))
+    msg.attach(MIMEText(html_body, 'html'))
+    
+    # Add attachment if provided
+    if attachment_data is None and attachment_path:
+        with open(attachment_path, 'rb') as attachment:
+            attachment_data = attachment.read()
+        attachment_name = attachment_name or os.path.basename(attachment_path)
+    
+    if attachment_data is not None:
+        from email.mime.base import MIMEBase
+        from email import encoders
+        
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(attachment_data)
+        encoders.encode_base64(part)
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename= {attachment_name or "attachment"}'
+        )
+        msg.attach(part)
+    
+    return msg
+
 def send_email(to_email, subject, message, user_id=None, attachment_path=None):
     """
     Generic email sending function for automation features
     """
     try:
-        # Create message with proper headers
-        msg = MIMEMultipart()
-        gmail_user = os.environ.get('GMAIL_USER')
-        
         # Get business name from user if provided
-        business_name = "Review Automation Platform"
+        business_name = None
         if user_id:
-            from models import User
-            user = User.query.get(user_id)
+            from user_cache import load_cached_user
+            user = load_cached_user(user_id)
             if user and user.business_name:
                 business_name = user.business_name
         
-        msg['From'] = f"{business_name} <{gmail_user}>"
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg['Reply-To'] = gmail_user
-        
-        # Add headers
-        msg['Message-ID'] = f"<{uuid.uuid4()}@{gmail_user.split('@')[1] if gmail_user else 'localhost'}>"
-        msg['Date'] = formatdate(localtime=True)
-        
-        # Create HTML version
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <p>{message.replace(chr(10), '<br>')}</p>
-                <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
-                <p style="font-size: 12px; color: #666;">
-                    This email was sent from {business_name}.
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Add both versions
-        msg.attach(MIMEText(message, 'plain'))
-        msg.attach(MIMEText(html_body, 'html'))
-        
-        # Add attachment if provided
-        if attachment_path and os.path.exists(attachment_path):
-            with open(attachment_path, 'rb') as attachment:
-                from email.mime.base import MIMEBase
-                from email import encoders
-                
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename= {os.path.basename(attachment_path)}'
-                )
-                msg.attach(part)
-        
-        # Gmail SMTP configuration
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-        gmail_password = os.environ.get('GMAIL_PASSWORD')
-        
-        if not gmail_user or not gmail_password:
+        if not os.environ.get('GMAIL_USER') or not os.environ.get('GMAIL_PASSWORD'):
             logger.warning("Gmail credentials not configured - email not sent")
             return False
         
-        # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(gmail_user, gmail_password)
-        server.send_message(msg)
-        server.quit()
+        # Send email over a pooled connection
+        deliver_message(build_email_message(to_email, subject, message, business_name, attachment_path))
         
         logger.info(f"Email sent successfully to {to_email}")
         return True
@@ -0,0 +1,9 @@
+"""
+Gunicorn settings read automatically from the working directory. Command
+line options (Procfile, render.yaml) still take precedence.
+"""
+
+def on_starting(server):
+    # Metrics files left by a previous run would be added to this run's counters
+    from metrics import clear_multiproc_dir
+    clear_multiproc_dir()
@@ -0,0 +1,284 @@
+import os
+import json
+import atexit
+import glob
+import time
+import logging
+from contextlib import contextmanager
+from threading import Lock, Thread
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Shared directory where every process (gunicorn workers, worker.py) writes
+# its samples so any one of them can serve the combined /metrics. Unset
+# means each process only reports its own.
+MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+# How often a process writes its samples to MULTIPROC_DIR
+FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class Metric:
+    """A named metric with a fixed set of labels; values are kept by its registry"""
+
+    kind = None
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.registry.updating() as values:
+            samples = values.setdefault(self.name, {})
+            samples[key] = samples.get(key, 0) + amount
+
+class Gauge(Metric):
+    """A value that goes up and down; across processes the most recently set one wins"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.registry.updating() as values:
+            values.setdefault(self.name, {})[key] = [value, time.time()]
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.registry.updating() as values:
+            samples = values.setdefault(self.name, {})
+            sample = samples.get(key)
+            if sample is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                sample = samples[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the with block takes, even when it raises"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms rendered in the Prometheus text
+    exposition format.
+
+    With METRICS_MULTIPROC_DIR set, every process writes its samples to its
+    own file there every FLUSH_SECONDS. A scrape writes the serving
+    process's file, then adds up all the files: counters and histograms are
+    summed, and for gauges the most recently set value wins. Files of exited
+    processes are kept so counters don't go backwards; the directory is
+    emptied when gunicorn starts (see gunicorn.conf.py).
+    """
+
+    def __init__(self, multiproc_dir: str = None, flush_seconds: float = FLUSH_SECONDS):
+        self.multiproc_dir = multiproc_dir
+        self.flush_seconds = flush_seconds
+        self.metrics: Dict[str, Metric] = {}
+        self._values: Dict[str, Dict] = {}
+        self._lock = Lock()
+        self._pid = os.getpid()
+        self._flusher = None
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    @contextmanager
+    def updating(self):
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Forked (e.g. gunicorn --preload): the parent's samples aren't ours
+                self._values = {}
+                self._pid = os.getpid()
+                self._flusher = None
+            if self.multiproc_dir and self._flusher is None:
+                self._flusher = Thread(target=self._flush_forever, name='metrics-flush', daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+            yield self._values
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.multiproc_dir, f"metrics_{pid}.json")
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error writing metrics: {e}")
+
+    def _snapshot(self) -> Dict[str, List]:
+        """A copy of this process's samples as {name: [[label values, value], ...]}"""
+        with self._lock:
+            if os.getpid() != self._pid:
+                return {}
+            return json.loads(json.dumps({name: [[list(key), value] for key, value in samples.items()]
+                                          for name, samples in self._values.items()}))
+
+    def flush(self):
+        """Write this process's samples to the shared directory"""
+        if not self.multiproc_dir:
+            return
+        data = self._snapshot()
+        path = self._path(os.getpid())
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    def collect(self) -> Dict[str, Dict]:
+        """Samples by metric name, combined across processes when MULTIPROC_DIR is set"""
+        if self.multiproc_dir:
+            self.flush()
+            sources = []
+            for path in glob.glob(os.path.join(self.multiproc_dir, 'metrics_*.json')):
+                try:
+                    with open(path) as f:
+                        sources.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        else:
+            sources = [self._snapshot()]
+
+        combined: Dict[str, Dict] = {}
+        for data in sources:
+            for name, samples in data.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                merged = combined.setdefault(name, {})
+                for key, value in samples:
+                    merged[tuple(key)] = _merge(metric.kind, merged.get(tuple(key)), value)
+        return combined
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        values = self.collect()
+        lines: List[str] = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(values.get(name, {}).items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind == 'counter':
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                elif metric.kind == 'gauge':
+                    lines.append(f"{name}{_labels(labels)} {_number(value[0])}")
+                else:
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket in zip(metric.buckets + (float('inf'),), counts):
+                        cumulative += bucket
+                        le = '+Inf' if bound == float('inf') else _number(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app):
+        """Time every request by endpoint, and record the SQL the profiler counted for it"""
+        from flask import g, request
+
+        @app.before_request
+        def start_request_timer():
+            g.metrics_started = time.monotonic()
+
+        @app.after_request
+        def observe_request(response):
+            started = g.get('metrics_started')
+            if started is None or request.endpoint in (None, 'static'):
+                return response
+            endpoint = request.endpoint
+            HTTP_REQUEST_SECONDS.observe(time.monotonic() - started, endpoint=endpoint, method=request.method)
+            HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+            # Set by sql_profiler for this request
+            DB_REQUEST_SECONDS.observe(g.get('sql_ms', 0.0) / 1000, endpoint=endpoint)
+            DB_STATEMENTS.inc(g.get('sql_statements', 0), endpoint=endpoint)
+            return response
+
+def _merge(kind: str, current, value):
+    if current is None:
+        return value
+    if kind == 'counter':
+        return current + value
+    if kind == 'gauge':
+        return value if value[1] >= current[1] else current
+    return [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1], current[2] + value[2]]
+
+def _number(value: float) -> str:
+    value = float(value)
+    return '+Inf' if value == float('inf') else repr(value)
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', r'\\').replace('\n', r'\n')
+
+def _labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="' + value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') + '"'
+        for name, value in labels
+    ) + '}'
+
+def clear_multiproc_dir(path: str = None):
+    """Remove every process's samples; run once before the workers start"""
+    path = path or MULTIPROC_DIR
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, 'metrics_*.json*')):
+        os.remove(stale)
+
+# Initialize global registry instance
+registry = MetricsRegistry(MULTIPROC_DIR)
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by endpoint', ['endpoint', 'method'])
+HTTP_REQUESTS = registry.counter(
+    'http_requests_total', 'Requests handled, by endpoint and response status', ['endpoint', 'method', 'status'])
+DB_REQUEST_SECONDS = registry.histogram(
+    'http_request_db_seconds', 'Time spent in SQL per request, by endpoint', ['endpoint'])
+DB_STATEMENTS = registry.counter(
+    'db_statements_total', 'SQL statements run by requests, by endpoint', ['endpoint'])
@@ -16,7 +16,8 @@ def create_tables():
             from models import (
                 User, ReviewTemplate, Customer, Review, ReviewRequest,
                 ReviewConversation, FollowUpSequence, Referral, 
-                AutomationSettings, ReportGeneration
+                AutomationSettings, ReportGeneration, ReviewStats, ReviewDailyStats, BulkReplyJob,
+                OutboundEmail, ReviewRequestCampaign, ScheduledJob, ShardLease, ShardMember
             )
             
             print("Creating database tables...")
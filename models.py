@@ -1,6 +1,8 @@
-from datetime import datetime
+import json
+from datetime import date, datetime, timedelta
 from app import db
 from flask_login import UserMixin
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(UserMixin, db.Model):
@@ -40,6 +42,7 @@ class ReviewTemplate(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Template variables that can be used: {customer_name}, {business_name}, {review_link}
+    # (compiled and validated by template_engine)
     
     def __repr__(self):
         return f'<ReviewTemplate {self.name}>'
@@ -64,12 +67,37 @@ class Customer(db.Model):
     location = db.Column(db.String(200))
     segment_tags = db.Column(db.Text)  # JSON array of tags
     
+    __table_args__ = (
+        db.Index('ix_customer_user_created', 'user_id', 'created_at'),
+    )
+    
     # Relationships
     reviews = db.relationship('Review', backref='customer', lazy=True)
     follow_ups = db.relationship('FollowUpSequence', backref='customer', lazy=True, cascade='all, delete-orphan')
     sent_referrals = db.relationship('Referral', foreign_keys='Referral.customer_id', backref='referrer_customer', lazy=True, cascade='all, delete-orphan')
     received_referrals = db.relationship('Referral', foreign_keys='Referral.referred_customer_id', backref='referred_customer', lazy=True)
     
+    @classmethod
+    def segment_query(cls, user_id, min_services=None, rating_filter=None, service_type=None, location=None):
+        """Customers of a user matching the customer segment filters"""
+        query = cls.query.filter_by(user_id=user_id)
+        
+        if min_services:
+            query = query.filter(cls.total_services >= min_services)
+        
+        if rating_filter == 'high':
+            query = query.filter(cls.average_rating >= 4.0)
+        elif rating_filter == 'low':
+            query = query.filter(cls.average_rating < 3.0)
+        
+        if service_type:
+            query = query.filter(cls.service_type.ilike(f'%{service_type}%'))
+        
+        if location:
+            query = query.filter(cls.location.ilike(f'%{location}%'))
+        
+        return query
+    
     def __repr__(self):
         return f'<Customer {self.name}>'
 
@@ -91,12 +119,21 @@ class Review(db.Model):
     voice_recording_path = db.Column(db.String(500))  # path to voice file
     voice_transcription = db.Column(db.Text)
     review_category = db.Column(db.String(100))  # complaint, praise, suggestion
+    enrichment_pending = db.Column(db.Boolean, default=False, nullable=False)  # queued for AI analysis, not done yet
+    enrichment_locked_until = db.Column(db.DateTime)  # a worker is analyzing it until then
+    
+    __table_args__ = (
+        db.Index('ix_review_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('ix_review_enrichment_pending', 'enrichment_pending'),
+        db.Index('ix_review_user_created_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_review_customer_rating_created', 'customer_id', 'rating', 'created_at'),
+    )
     
     # Relationships
     conversation_history = db.relationship('ReviewConversation', backref='review', lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
-        return f'<Review {self.rating} stars from {self.customer.name}>'
+        return f'<Review {self.id}: {self.rating} stars from customer {self.customer_id}>'
 
 class ReviewRequest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -107,7 +144,8 @@ class ReviewRequest(db.Model):
     sent_at = db.Column(db.DateTime, default=datetime.utcnow)
     opened_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
-    status = db.Column(db.String(50), default='sent')  # sent, opened, completed
+    status = db.Column(db.String(50), default='sent')  # queued, sent, opened, completed, failed
+    campaign_id = db.Column(db.Integer, db.ForeignKey('review_request_campaign.id'), index=True)
     
     # Relationships
     template = db.relationship('ReviewTemplate', backref='requests')
@@ -126,6 +164,10 @@ class ReviewConversation(db.Model):
     sent_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_ai_generated = db.Column(db.Boolean, default=False)
     
+    __table_args__ = (
+        db.Index('ix_review_conversation_review_sent', 'review_id', 'sent_at'),
+    )
+    
     def __repr__(self):
         return f'<ReviewConversation {self.sender}: {self.message[:50]}>'
 
@@ -137,9 +179,15 @@ class FollowUpSequence(db.Model):
     sequence_step = db.Column(db.Integer, default=1)  # 1, 2, 3
     scheduled_for = db.Column(db.DateTime, nullable=False)
     sent_at = db.Column(db.DateTime)
-    status = db.Column(db.String(50), default='scheduled')  # scheduled, sent, cancelled
+    status = db.Column(db.String(50), default='scheduled')  # scheduled, queued, sent, failed, cancelled
     email_content = db.Column(db.Text)
     
+    __table_args__ = (
+        db.Index('ix_follow_up_status_scheduled', 'status', 'scheduled_for'),
+        # Cancelling a customer's remaining follow-ups once they review
+        db.Index('ix_follow_up_customer_status', 'customer_id', 'status'),
+    )
+    
     def __repr__(self):
         return f'<FollowUpSequence Step {self.sequence_step} for {self.customer.name}>'
 
@@ -148,12 +196,18 @@ class Referral(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)  # referrer
+    review_id = db.Column(db.Integer, db.ForeignKey('review.id'))  # the 5-star review that earned it
     referral_token = db.Column(db.String(100), unique=True, nullable=False)
     referred_customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'))  # referred customer
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     used_at = db.Column(db.DateTime)
     reward_sent = db.Column(db.Boolean, default=False)
     
+    __table_args__ = (
+        # One referral reward per review
+        db.Index('ix_referral_review_id', 'review_id', unique=True),
+    )
+    
     # Relationships with explicit foreign keys to avoid ambiguity
     referrer = db.relationship('Customer', foreign_keys=[customer_id], overlaps="referrer_customer,sent_referrals")
     referred = db.relationship('Customer', foreign_keys=[referred_customer_id], overlaps="received_referrals,referred_customer")
@@ -206,6 +260,466 @@ class ReportGeneration(db.Model):
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
     file_path = db.Column(db.String(500))
     sent_to = db.Column(db.Text)  # JSON array of recipient emails
+    collect_ms = db.Column(db.Integer)  # time spent gathering the report data
+    render_ms = db.Column(db.Integer)  # time spent laying out the PDF, 0 when served from cache
     
     def __repr__(self):
         return f'<ReportGeneration {self.report_type} for {self.user.username}>'
+
+
+class ReviewStats(db.Model):
+    """Per-user review rollup kept current on every review write"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True, nullable=False)
+    
+    total_reviews = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    rating_1 = db.Column(db.Integer, default=0, nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Status counters
+    pending_count = db.Column(db.Integer, default=0, nullable=False)
+    responded_count = db.Column(db.Integer, default=0, nullable=False)
+    forwarded_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    monthly_counts = db.Column(db.Text)  # JSON object of {"YYYY-MM": count}
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    user = db.relationship('User', backref=db.backref('review_stats', uselist=False))
+    
+    STATUS_COLUMNS = {
+        'pending': 'pending_count',
+        'responded': 'responded_count',
+        'forwarded_to_google': 'forwarded_count',
+    }
+    
+    @property
+    def rating_counts(self):
+        return {i: getattr(self, f'rating_{i}') or 0 for i in range(1, 6)}
+    
+    @property
+    def average_rating(self):
+        if not self.total_reviews:
+            return 0
+        return round(self.rating_sum / self.total_reviews, 1)
+    
+    def month_buckets(self):
+        return json.loads(self.monthly_counts) if self.monthly_counts else {}
+    
+    def monthly_reviews(self):
+        """Review counts grouped by calendar month, as the analytics chart expects"""
+        by_month = {}
+        for key, count in self.month_buckets().items():
+            month = int(key.split('-')[1])
+            by_month[month] = by_month.get(month, 0) + count
+        return [{'month': month, 'count': count} for month, count in sorted(by_month.items())]
+    
+    @classmethod
+    def for_user(cls, user_id, lock=False):
+        """
+        Return the stats row for a user, building it from the review table
+        the first time it is needed. With lock=True the row is selected
+        FOR UPDATE so concurrent writers serialize on it.
+        """
+        with db.session.no_autoflush:
+            query = cls.query.filter_by(user_id=user_id)
+            if lock:
+                query = query.with_for_update()
+            stats = query.first()
+            if not stats:
+                stats = cls(user_id=user_id)
+                stats.rebuild()
+                try:
+                    # Savepoint: two first requests can race to create the row
+                    with db.session.begin_nested():
+                        db.session.add(stats)
+                except IntegrityError:
+                    stats = query.first()
+                    if stats is None:
+                        raise
+        return stats
+    
+    def rebuild(self):
+        """Recompute every counter from the review table"""
+        from sqlalchemy import extract, func
+        
+        self.total_reviews = 0
+        self.rating_sum = 0
+        for i in range(1, 6):
+            setattr(self, f'rating_{i}', 0)
+        for column in self.STATUS_COLUMNS.values():
+            setattr(self, column, 0)
+        
+        rows = db.session.query(
+            Review.rating, Review.status, func.count(Review.id)
+        ).filter(Review.user_id == self.user_id).group_by(Review.rating, Review.status).all()
+        
+        for rating, status, count in rows:
+            self.total_reviews += count
+            self.rating_sum += (rating or 0) * count
+            if rating in range(1, 6):
+                setattr(self, f'rating_{rating}', getattr(self, f'rating_{rating}') + count)
+            column = self.STATUS_COLUMNS.get(status)
+            if column:
+                setattr(self, column, getattr(self, column) + count)
+        
+        months = db.session.query(
+            extract('year', Review.created_at).label('year'),
+            extract('month', Review.created_at).label('month'),
+            func.count(Review.id)
+        ).filter(Review.user_id == self.user_id, Review.created_at.isnot(None))\
+            .group_by('year', 'month').all()
+        
+        self.monthly_counts = json.dumps(
+            {f"{int(year):04d}-{int(month):02d}": count for year, month, count in months}
+        )
+    
+    @classmethod
+    def record_new_review(cls, review):
+        """Count a review that has been added to the session but not yet committed"""
+        stats = cls.for_user(review.user_id, lock=True)
+        
+        stats.total_reviews += 1
+        stats.rating_sum += review.rating
+        if review.rating in range(1, 6):
+            column = f'rating_{review.rating}'
+            setattr(stats, column, getattr(stats, column) + 1)
+        
+        stats._adjust_status(review.status or 'pending', 1)
+        
+        buckets = stats.month_buckets()
+        key = (review.created_at or datetime.utcnow()).strftime('%Y-%m')
+        buckets[key] = buckets.get(key, 0) + 1
+        stats.monthly_counts = json.dumps(buckets)
+        return stats
+    
+    @classmethod
+    def record_status_change(cls, user_id, old_status, new_status):
+        """Move a review between status counters"""
+        old_status = old_status or 'pending'
+        if old_status == new_status:
+            return None
+        
+        stats = cls.for_user(user_id, lock=True)
+        stats._adjust_status(old_status, -1)
+        stats._adjust_status(new_status, 1)
+        return stats
+    
+    def _adjust_status(self, status, delta):
+        column = self.STATUS_COLUMNS.get(status)
+        if column:
+            setattr(self, column, max((getattr(self, column) or 0) + delta, 0))
+    
+    def __repr__(self):
+        return f'<ReviewStats for user {self.user_id}>'
+
+class ReviewDailyStats(db.Model):
+    """
+    Per-user review rollup for one settled UTC day. Reports sum these
+    instead of scanning every review in their window. Rows are only stored
+    once a day has been over for SETTLE_HOURS, so new reviews never touch
+    them; later changes to a settled day's reviews invalidate its row.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    
+    review_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    rating_1 = db.Column(db.Integer, default=0, nullable=False)
+    rating_2 = db.Column(db.Integer, default=0, nullable=False)
+    rating_3 = db.Column(db.Integer, default=0, nullable=False)
+    rating_4 = db.Column(db.Integer, default=0, nullable=False)
+    rating_5 = db.Column(db.Integer, default=0, nullable=False)
+    sentiment_counts = db.Column(db.Text)  # JSON object of {sentiment: count}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_review_daily_stats_user_day'),
+    )
+    
+    SETTLE_HOURS = 1
+    
+    @classmethod
+    def settled_before(cls):
+        """Days before this one are closed and can be stored"""
+        return (datetime.utcnow() - timedelta(hours=cls.SETTLE_HOURS)).date()
+    
+    @staticmethod
+    def _empty():
+        return {'review_count': 0, 'rating_sum': 0, 'ratings': {i: 0 for i in range(1, 6)}, 'sentiments': {}}
+    
+    @classmethod
+    def aggregate(cls, user_id, start_day, end_day):
+        """Counters per day from the review table for start_day..end_day, in one grouped query"""
+        from sqlalchemy import func
+        
+        day_column = func.date(Review.created_at)
+        rows = db.session.query(
+            day_column, Review.rating, Review.sentiment, func.count(Review.id)
+        ).filter(
+            Review.user_id == user_id,
+            Review.created_at >= datetime.combine(start_day, datetime.min.time()),
+            Review.created_at < datetime.combine(end_day + timedelta(days=1), datetime.min.time())
+        ).group_by(day_column, Review.rating, Review.sentiment).all()
+        
+        days = {}
+        for day, rating, sentiment, count in rows:
+            # SQLite returns the date as a string
+            day = date.fromisoformat(str(day)[:10])
+            counters = days.setdefault(day, cls._empty())
+            counters['review_count'] += count
+            counters['rating_sum'] += (rating or 0) * count
+            if rating in range(1, 6):
+                counters['ratings'][rating] += count
+            if sentiment:
+                counters['sentiments'][sentiment] = counters['sentiments'].get(sentiment, 0) + count
+        return days
+    
+    def counters(self):
+        return {
+            'review_count': self.review_count,
+            'rating_sum': self.rating_sum,
+            'ratings': {i: getattr(self, f'rating_{i}') or 0 for i in range(1, 6)},
+            'sentiments': json.loads(self.sentiment_counts) if self.sentiment_counts else {},
+        }
+    
+    @classmethod
+    def summarize(cls, user_id, start_day, end_day):
+        """
+        Totals for start_day..end_day: stored rows for settled days, backfilling
+        any that are missing, plus the unsettled days read live. The caller
+        commits to keep the backfilled rows.
+        """
+        from sqlalchemy.exc import IntegrityError
+        
+        settled_before = cls.settled_before()
+        settled_end = min(end_day, settled_before - timedelta(days=1))
+        per_day = []
+        
+        if start_day <= settled_end:
+            stored = {row.day: row for row in cls.query.filter(
+                cls.user_id == user_id, cls.day >= start_day, cls.day <= settled_end
+            ).all()}
+            per_day.extend(row.counters() for row in stored.values())
+            
+            missing = [start_day + timedelta(days=i) for i in range((settled_end - start_day).days + 1)]
+            missing = [day for day in missing if day not in stored]
+            if missing:
+                computed = cls.aggregate(user_id, missing[0], missing[-1])
+                rows = []
+                for day in missing:
+                    counters = computed.get(day, cls._empty())
+                    per_day.append(counters)
+                    rows.append(cls(
+                        user_id=user_id,
+                        day=day,
+                        review_count=counters['review_count'],
+                        rating_sum=counters['rating_sum'],
+                        sentiment_counts=json.dumps(counters['sentiments']),
+                        **{f'rating_{i}': counters['ratings'][i] for i in range(1, 6)}
+                    ))
+                try:
+                    with db.session.begin_nested():
+                        db.session.add_all(rows)
+                except IntegrityError:
+                    # Another report stored them first; the totals are the same
+                    pass
+        
+        if end_day >= settled_before:
+            per_day.extend(cls.aggregate(user_id, max(start_day, settled_before), end_day).values())
+        
+        totals = cls._empty()
+        for counters in per_day:
+            totals['review_count'] += counters['review_count']
+            totals['rating_sum'] += counters['rating_sum']
+            for rating, count in counters['ratings'].items():
+                totals['ratings'][int(rating)] += count
+            for sentiment, count in counters['sentiments'].items():
+                totals['sentiments'][sentiment] = totals['sentiments'].get(sentiment, 0) + count
+        return totals
+    
+    @classmethod
+    def invalidate(cls, reviews):
+        """Drop stored days whose reviews changed, so the next report recounts them"""
+        settled_before = cls.settled_before()
+        stale = {(review.user_id, review.created_at.date()) for review in reviews
+                 if review.created_at and review.created_at.date() < settled_before}
+        
+        by_user = {}
+        for user_id, day in stale:
+            by_user.setdefault(user_id, []).append(day)
+        for user_id, days in by_user.items():
+            cls.query.filter(cls.user_id == user_id, cls.day.in_(days)).delete(synchronize_session=False)
+    
+    def __repr__(self):
+        return f'<ReviewDailyStats for user {self.user_id} on {self.day}>'
+
+
+class BulkReplyJob(db.Model):
+    """Track bulk AI reply generation for a user's pending reviews"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    status = db.Column(db.String(50), default='queued')  # queued, running, completed, failed
+    total_reviews = db.Column(db.Integer, default=0)
+    processed_count = db.Column(db.Integer, default=0)
+    failed_count = db.Column(db.Integer, default=0)
+    last_review_id = db.Column(db.Integer, default=0)  # checkpoint: every review up to this ID is done
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # refreshed per chunk; stale means the worker died
+    finished_at = db.Column(db.DateTime)
+    
+    ACTIVE_STATUSES = ('queued', 'running')
+    
+    @property
+    def percent_complete(self):
+        if not self.total_reviews:
+            return 100 if self.status == 'completed' else 0
+        done = (self.processed_count or 0) + (self.failed_count or 0)
+        return min(int(done * 100 / self.total_reviews), 100)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': self.total_reviews,
+            'processed': self.processed_count,
+            'failed': self.failed_count,
+            'percent': self.percent_complete,
+            'error': self.error,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+    
+    def __repr__(self):
+        return f'<BulkReplyJob {self.id} {self.status} for user {self.user_id}>'
+
+class OutboundEmail(db.Model):
+    """Outbox row for an email waiting to be delivered by the email worker"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    review_request_id = db.Column(db.Integer, db.ForeignKey('review_request.id'))
+    follow_up_id = db.Column(db.Integer, db.ForeignKey('follow_up_sequence.id'))
+    campaign_id = db.Column(db.Integer, db.ForeignKey('review_request_campaign.id'), index=True)  # sent by the campaign runner
+    kind = db.Column(db.String(50), default='generic')  # generic (HTML + text), review_request (plain text)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.Text, nullable=False)  # rendered from templates whose subject alone may be 300 chars
+    body = db.Column(db.Text, nullable=False)
+    attachment_path = db.Column(db.String(500))  # rows queued before attachments were stored inline
+    attachment_name = db.Column(db.String(255))
+    attachment_data = db.Column(db.LargeBinary)  # the file itself, so any worker on any machine can send it
+    idempotency_key = db.Column(db.String(200), unique=True)  # enqueueing the same key twice sends once
+    status = db.Column(db.String(50), default='queued')  # queued, sent, dead
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=5)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))  # worker holding the lease
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # The worker polls for due messages
+        db.Index('ix_outbound_email_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self):
+        return f'<OutboundEmail {self.id} {self.status} to {self.to_email}>'
+
+class ReviewRequestCampaign(db.Model):
+    """Review requests sent to a whole customer segment at once"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('review_template.id'), nullable=False)
+    filters = db.Column(db.Text)  # JSON segment filters, or {"customer_ids": [...]}
+    status = db.Column(db.String(50), default='queued')  # queued, running, paused, completed, failed
+    max_per_minute = db.Column(db.Integer)  # throttle
+    total_count = db.Column(db.Integer, default=0)
+    sent_count = db.Column(db.Integer, default=0)
+    failed_count = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # refreshed per batch; stale means the runner died
+    finished_at = db.Column(db.DateTime)
+    
+    ACTIVE_STATUSES = ('queued', 'running')
+    
+    # Relationships
+    template = db.relationship('ReviewTemplate')
+    
+    @property
+    def percent_complete(self):
+        if not self.total_count:
+            return 100 if self.status == 'completed' else 0
+        done = (self.sent_count or 0) + (self.failed_count or 0)
+        return min(int(done * 100 / self.total_count), 100)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': self.total_count,
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'percent': self.percent_complete,
+            'error': self.error,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+    
+    def __repr__(self):
+        return f'<ReviewRequestCampaign {self.id} {self.status} for user {self.user_id}>'
+
+class ScheduledJob(db.Model):
+    """A recurring background job, run by whichever worker leases it first"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    schedule = db.Column(db.String(100), nullable=False)  # cron expression, UTC
+    enabled = db.Column(db.Boolean, default=True)
+    catch_up = db.Column(db.Boolean, default=True)  # run once after missed runs instead of skipping them
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    last_run_at = db.Column(db.DateTime)
+    last_finished_at = db.Column(db.DateTime)
+    last_status = db.Column(db.String(50))  # succeeded, failed, skipped
+    last_error = db.Column(db.Text)
+    run_count = db.Column(db.Integer, default=0)
+    locked_by = db.Column(db.String(100))  # worker holding the lease
+    locked_until = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ScheduledJob {self.name} next at {self.next_run_at}>'
+
+class ShardLease(db.Model):
+    """Lease on one shard of a partitioned background job, held by one worker at a time"""
+    id = db.Column(db.Integer, primary_key=True)
+    group = db.Column(db.String(100), nullable=False)  # e.g. follow_ups
+    shard = db.Column(db.Integer, nullable=False)  # 0 .. shard count - 1
+    owner = db.Column(db.String(100))  # worker holding the lease
+    lease_until = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.UniqueConstraint('group', 'shard', name='uq_shard_lease_group_shard'),
+    )
+    
+    def __repr__(self):
+        return f'<ShardLease {self.group}:{self.shard} held by {self.owner}>'
+
+class ShardMember(db.Model):
+    """A live worker taking part in a shard group; shards are split evenly among members"""
+    id = db.Column(db.Integer, primary_key=True)
+    group = db.Column(db.String(100), nullable=False)
+    worker_id = db.Column(db.String(100), nullable=False)
+    heartbeat_at = db.Column(db.DateTime, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('group', 'worker_id', name='uq_shard_member_group_worker'),
+    )
+    
+    def __repr__(self):
+        return f'<ShardMember {self.group}:{self.worker_id}>'
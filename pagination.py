@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import base64
+import logging
+from datetime import datetime
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 20
+# How long a cached list total may be shown before it is counted again
+COUNT_CACHE_SECONDS = int(os.environ.get('PAGINATION_COUNT_CACHE_SECONDS', 60))
+
+def encode_cursor(created_at: datetime, id: int, direction: str) -> str:
+    """Opaque cursor pointing just past (created_at, id) in the given direction"""
+    raw = json.dumps([created_at.isoformat() if created_at else None, id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int, str]]:
+    """(created_at, id, direction) of a cursor, or None when it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, id, direction = json.loads(raw)
+        if direction not in ('next', 'prev'):
+            return None
+        return datetime.fromisoformat(created_at), int(id), direction
+    except (ValueError, TypeError):
+        return None
+
+class KeysetPage:
+    """
+    One page of a list ordered newest first by (created_at, id), with
+    cursors to the pages either side of it. Unlike OFFSET paging, fetching
+    a page costs the same however deep into the list it is.
+    """
+
+    def __init__(self, items: List, next_cursor: Optional[str], prev_cursor: Optional[str],
+                 total: Optional[int] = None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+def keyset_paginate(query, model, cursor: Optional[str] = None, per_page: int = PER_PAGE,
+                    total: Optional[int] = None) -> KeysetPage:
+    """
+    Page query (already filtered to the rows to list) newest first. A
+    malformed or missing cursor gives the first page. One extra row is
+    fetched to tell whether there is another page in the direction of
+    travel; a page reached from a cursor always has one the other way.
+    """
+    created_at, id = model.created_at, model.id
+    position = decode_cursor(cursor)
+
+    if position is None:
+        rows = query.order_by(created_at.desc(), id.desc()).limit(per_page + 1).all()
+        more, items = len(rows) > per_page, rows[:per_page]
+        has_next, has_prev = more, False
+    elif position[2] == 'next':
+        rows = query.filter(tuple_(created_at, id) < position[:2])\
+            .order_by(created_at.desc(), id.desc()).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_next, has_prev = len(rows) > per_page, True
+    else:
+        rows = query.filter(tuple_(created_at, id) > position[:2])\
+            .order_by(created_at.asc(), id.asc()).limit(per_page + 1).all()
+        items = list(reversed(rows[:per_page]))
+        has_next, has_prev = True, len(rows) > per_page
+
+    if not items:
+        return KeysetPage([], None, None, total)
+    return KeysetPage(
+        items,
+        encode_cursor(items[-1].created_at, items[-1].id, 'next') if has_next else None,
+        encode_cursor(items[0].created_at, items[0].id, 'prev') if has_prev else None,
+        total
+    )
+
+_count_cache: Dict[tuple, Tuple[float, int]] = {}
+_count_lock = Lock()
+
+def cached_count(key: tuple, count: Callable[[], int], ttl: int = None) -> int:
+    """
+    A list total counted at most once per ttl seconds per process. Totals
+    are only shown next to the pager, so being a little stale is fine.
+    """
+    ttl = COUNT_CACHE_SECONDS if ttl is None else ttl
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+
+    value = count()
+    with _count_lock:
+        _count_cache[key] = (now + ttl, value)
+    return value
+
+def forget_count(key: tuple):
+    with _count_lock:
+        _count_cache.pop(key, None)
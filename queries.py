@@ -0,0 +1,68 @@
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from models import Customer, Review, ReviewConversation
+
+class ReviewQueries:
+    """
+    Review queries shaped for the view that uses them. Each one loads the
+    relationships its template reads up front, so rendering a page of rows
+    does not lazy-load a customer per row.
+    """
+
+    # Columns the reviews list and its JSON variant read
+    LIST_COLUMNS = (Review.id, Review.customer_id, Review.rating, Review.comment, Review.status,
+                    Review.sentiment, Review.admin_response, Review.response_date, Review.created_at)
+
+    @staticmethod
+    def list_for_user(user_id: int, status: str = None):
+        """The reviews list: list columns plus the customer's name and email, in one query"""
+        query = Review.query.filter_by(user_id=user_id)
+        if status:
+            query = query.filter_by(status=status)
+        return query.options(
+            load_only(*ReviewQueries.LIST_COLUMNS),
+            joinedload(Review.customer).load_only(Customer.name, Customer.email)
+        )
+
+    @staticmethod
+    def recent_for_user(user_id: int, limit: int = 5):
+        """Newest reviews for the dashboard"""
+        return Review.query.filter_by(user_id=user_id).options(
+            load_only(Review.id, Review.rating, Review.comment, Review.status, Review.created_at),
+            joinedload(Review.customer).load_only(Customer.name)
+        ).order_by(Review.created_at.desc(), Review.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def detail(user_id: int, review_id: int):
+        """One review with its customer and the customer's other reviews"""
+        return Review.query.filter_by(id=review_id, user_id=user_id).options(
+            joinedload(Review.customer).selectinload(Customer.reviews).load_only(
+                Review.id, Review.rating, Review.comment, Review.status, Review.created_at
+            )
+        ).first_or_404()
+
+    @staticmethod
+    def with_conversation(user_id: int, review_id: int):
+        """A review with its customer, and its conversation oldest message first"""
+        review = Review.query.filter_by(id=review_id, user_id=user_id).options(
+            joinedload(Review.customer).load_only(Customer.name)
+        ).first_or_404()
+        conversations = ReviewConversation.query.filter_by(review_id=review_id)\
+            .order_by(ReviewConversation.sent_at.asc()).all()
+        return review, conversations
+
+class CustomerQueries:
+    """Customer queries shaped for the view that uses them"""
+
+    @staticmethod
+    def list_for_user(user_id: int):
+        """The customers list, with each customer's reviews fetched in one extra query per page"""
+        return Customer.query.filter_by(user_id=user_id).options(
+            selectinload(Customer.reviews).load_only(Review.id, Review.rating, Review.created_at)
+        )
+
+    @staticmethod
+    def recent_for_user(user_id: int, limit: int = 5):
+        return Customer.query.filter_by(user_id=user_id).options(
+            load_only(Customer.id, Customer.name, Customer.email, Customer.review_requested, Customer.created_at)
+        ).order_by(Customer.created_at.desc(), Customer.id.desc()).limit(limit).all()
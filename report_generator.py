@@ -1,184 +1,248 @@
 import os
+import glob
 import json
+import time
+import hashlib
+import logging
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from datetime import datetime, timedelta
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from collections import Counter
+from typing import Dict, Iterator, List
+from sqlalchemy import func
 
 from app import db
-from models import User, Customer, Review
+from metrics import registry
+from models import User, Customer, Review, ReviewDailyStats
+from report_renderer import RenderTimeout, write_report
 
-def generate_pdf_report(user_id: int, report_type: str = 'weekly') -> str:
-    """Generate PDF report for user"""
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = "reports"
+REPORT_DAYS = {'weekly': 7, 'monthly': 30}
+RECENT_REVIEWS = 5
+PENDING_PER_PAGE = int(os.environ.get('REPORT_PENDING_PER_PAGE', 25))
+# Rendered PDFs kept per user and report type
+CACHE_KEEP = int(os.environ.get('REPORT_CACHE_KEEP', 10))
+
+REPORT_RENDER_SECONDS = registry.histogram(
+    'report_render_duration_seconds', 'Time to lay out and write one PDF report, by where it ran', ['source'])
+REPORT_RENDERS = registry.counter(
+    'report_renders_total', 'PDF reports asked for, by outcome (rendered, cached, failed)', ['outcome'])
+
+def _excerpts(query, length: int, limit: int, offset: int = 0):
+    """
+    Newest reviews of query as plain rows, with the customer's name joined in
+    and only the first length characters of each comment loaded
+    """
+    rows = query.join(Customer, Customer.id == Review.customer_id).with_entities(
+        Review.rating,
+        Customer.name,
+        Review.created_at,
+        func.substr(Review.comment, 1, length + 1),
+        Review.sentiment
+    ).order_by(Review.created_at.desc(), Review.id.desc()).offset(offset).limit(limit).all()
+    return [{
+        'rating': rating,
+        'customer_name': name,
+        'date': created_at.strftime('%B %d, %Y') if created_at else '',
+        'excerpt': comment[:length] if comment else None,
+        'truncated': bool(comment) and len(comment) > length,
+        'sentiment': sentiment,
+    } for rating, name, created_at, comment, sentiment in rows]
+
+def collect_report_data(user_id: int, report_type: str = 'weekly', pending_page: int = 1) -> dict:
+    """
+    Everything a report shows, as plain data. Totals come from the per-day
+    review rollups (committing any it had to backfill); only the few reviews
+    shown are loaded, with their customers' names joined in.
+    """
+    user = User.query.get(user_id)
+    if not user:
+        return None
+    
+    # The window is whole UTC days, ending today
+    end_day = datetime.utcnow().date()
+    start_day = end_day - timedelta(days=REPORT_DAYS.get(report_type, 30) - 1)
+    start = datetime.combine(start_day, datetime.min.time())
+    
+    totals = ReviewDailyStats.summarize(user_id, start_day, end_day)
+    db.session.commit()
+    
+    new_customers = Customer.query.filter(
+        Customer.user_id == user_id,
+        Customer.created_at >= start
+    ).count()
+    
+    recent = _excerpts(
+        Review.query.filter(Review.user_id == user_id, Review.created_at >= start),
+        100, RECENT_REVIEWS
+    )
+    recent.reverse()
+    
+    # Issues requiring attention, newest first, a page at a time
+    pending = Review.query.filter(
+        Review.user_id == user_id,
+        Review.rating <= 3,
+        Review.status == 'pending'
+    )
+    pending_total = pending.count()
+    pages = max(1, -(-pending_total // PENDING_PER_PAGE))
+    pending_page = min(max(1, pending_page), pages)
+    pending_reviews = _excerpts(pending, 150, PENDING_PER_PAGE, (pending_page - 1) * PENDING_PER_PAGE)
+    
+    return {
+        'user_id': user_id,
+        'username': user.username,
+        'business_name': user.business_name or user.username,
+        'report_type': report_type,
+        'period_name': "Weekly" if report_type == 'weekly' else "Monthly",
+        'start_day': start_day.strftime('%B %d, %Y'),
+        'end_day': end_day.strftime('%B %d, %Y'),
+        'total_reviews': totals['review_count'],
+        'average_rating': totals['rating_sum'] / totals['review_count'] if totals['review_count'] else 0,
+        'ratings': totals['ratings'],
+        'sentiments': sorted(totals['sentiments'].items(), key=lambda item: (-item[1], item[0])),
+        'new_customers': new_customers,
+        'recent_reviews': recent,
+        'pending': {
+            'page': pending_page,
+            'pages': pages,
+            'total': pending_total,
+            'first': (pending_page - 1) * PENDING_PER_PAGE + 1,
+            'reviews': pending_reviews,
+        },
+    }
+
+def data_version(data: dict) -> str:
+    """Fingerprint of the report's content; the same data renders the same PDF"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:20]
+
+def report_filename(data: dict, version: str = None) -> str:
+    page = data['pending']['page']
+    suffix = f"_p{page}" if page > 1 else ""
+    version = version or data_version(data)
+    return f"{REPORTS_DIR}/{data['username']}_{data['report_type']}_report_{version}{suffix}.pdf"
+
+def _prune_cache(data: dict):
+    """Keep only the newest CACHE_KEEP rendered reports of this user and type"""
+    pattern = f"{REPORTS_DIR}/{glob.escape(data['username'])}_{data['report_type']}_report_*.pdf"
+    files = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+    for path in files[CACHE_KEEP:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def generate_pdf_report(user_id: int, report_type: str = 'weekly', pending_page: int = 1) -> str:
+    """
+    Generate PDF report for user. Rendered reports are cached by user,
+    report type and data version, so asking again before anything changed
+    returns the stored file without rendering.
+    """
     try:
-        user = User.query.get(user_id)
-        if not user:
+        data = collect_report_data(user_id, report_type, pending_page)
+        if not data:
             return None
         
-        # Calculate date range
-        end_date = datetime.utcnow()
-        if report_type == 'weekly':
-            start_date = end_date - timedelta(days=7)
-            period_name = "Weekly"
-        else:  # monthly
-            start_date = end_date - timedelta(days=30)
-            period_name = "Monthly"
-        
-        # Create reports directory if it doesn't exist
-        reports_dir = "reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        # Generate filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{reports_dir}/{user.username}_{report_type}_report_{timestamp}.pdf"
-        
-        # Create PDF document
-        doc = SimpleDocTemplate(filename, pagesize=letter,
-                              rightMargin=72, leftMargin=72,
-                              topMargin=72, bottomMargin=18)
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            alignment=TA_CENTER,
-            spaceAfter=30
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12
-        )
-        
-        # Content
-        story = []
-        
-        # Title
-        business_name = user.business_name or user.username
-        title = f"{period_name} Review Report - {business_name}"
-        story.append(Paragraph(title, title_style))
-        story.append(Spacer(1, 12))
-        
-        # Report period
-        period_text = f"Report Period: {start_date.strftime('%B %d, %Y')} - {end_date.strftime('%B %d, %Y')}"
-        story.append(Paragraph(period_text, styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Get data for the period
-        reviews = Review.query.filter(
-            Review.user_id == user_id,
-            Review.created_at >= start_date,
-            Review.created_at <= end_date
-        ).all()
+        filename = report_filename(data)
+        if os.path.exists(filename):
+            REPORT_RENDERS.inc(outcome='cached')
+            return filename
         
-        customers = Customer.query.filter(
-            Customer.user_id == user_id,
-            Customer.created_at >= start_date,
-            Customer.created_at <= end_date
-        ).count()
-        
-        # Summary Statistics
-        story.append(Paragraph("Summary Statistics", heading_style))
-        
-        total_reviews = len(reviews)
-        avg_rating = sum(r.rating for r in reviews) / total_reviews if total_reviews > 0 else 0
-        rating_distribution = Counter(r.rating for r in reviews)
-        
-        summary_data = [
-            ['Metric', 'Value'],
-            ['Total Reviews', str(total_reviews)],
-            ['Average Rating', f"{avg_rating:.1f}/5.0"],
-            ['New Customers', str(customers)],
-            ['5-Star Reviews', str(rating_distribution.get(5, 0))],
-            ['4-Star Reviews', str(rating_distribution.get(4, 0))],
-            ['3-Star Reviews', str(rating_distribution.get(3, 0))],
-            ['2-Star Reviews', str(rating_distribution.get(2, 0))],
-            ['1-Star Reviews', str(rating_distribution.get(1, 0))],
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(summary_table)
-        story.append(Spacer(1, 20))
-        
-        # Sentiment Analysis (if available)
-        sentiment_counts = Counter(r.sentiment for r in reviews if r.sentiment)
-        if sentiment_counts:
-            story.append(Paragraph("Sentiment Analysis", heading_style))
-            
-            sentiment_data = [['Sentiment', 'Count']]
-            for sentiment, count in sentiment_counts.most_common():
-                sentiment_data.append([sentiment.title(), str(count)])
-            
-            sentiment_table = Table(sentiment_data, colWidths=[3*inch, 2*inch])
-            sentiment_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(sentiment_table)
-            story.append(Spacer(1, 20))
-        
-        # Recent Reviews
-        if reviews:
-            story.append(Paragraph("Recent Reviews", heading_style))
-            
-            for review in reviews[-5:]:  # Last 5 reviews
-                review_text = f"<b>{review.rating}/5 stars</b> - {review.customer.name}"
-                if review.comment:
-                    review_text += f"<br/><i>\"{review.comment[:100]}{'...' if len(review.comment) > 100 else ''}\"</i>"
-                if review.sentiment:
-                    review_text += f"<br/>Sentiment: {review.sentiment.title()}"
-                
-                story.append(Paragraph(review_text, styles['Normal']))
-                story.append(Spacer(1, 10))
-        
-        # Issues requiring attention
-        pending_reviews = Review.query.filter(
-            Review.user_id == user_id,
-            Review.rating <= 3,
-            Review.status == 'pending'
-        ).all()
-        
-        if pending_reviews:
-            story.append(Paragraph("Reviews Requiring Attention", heading_style))
-            for review in pending_reviews:
-                issue_text = f"<b>{review.rating}/5 stars</b> from {review.customer.name} - {review.created_at.strftime('%B %d, %Y')}"
-                if review.comment:
-                    issue_text += f"<br/>\"{review.comment[:150]}{'...' if len(review.comment) > 150 else ''}\""
-                
-                story.append(Paragraph(issue_text, styles['Normal']))
-                story.append(Spacer(1, 10))
-        
-        # Build PDF
-        doc.build(story)
+        REPORT_RENDER_SECONDS.observe(write_report(data, filename), source='inline')
+        REPORT_RENDERS.inc(outcome='rendered')
+        _prune_cache(data)
         
         return filename
         
     except Exception as e:
-        print(f"Error generating report: {e}")
-        return None
\ No newline at end of file
+        logger.error(f"Error generating report: {e}")
+        return None
+
+def _forget_db_connections():
+    """Drop the connection pool a forked render worker inherited, without closing the parent's sockets"""
+    from app import app
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+RenderResult = namedtuple('RenderResult', 'job filename cached render_seconds wait_seconds error')
+
+class ReportRenderPool:
+    """
+    Renders many reports in worker processes, so CPU-bound ReportLab layout
+    runs in parallel and off the scheduler thread. Each worker is sent only
+    a report's plain data and target filename. Results are yielded in the
+    order renders finish, so callers can act on each report straight away.
+    """
+    
+    def __init__(self, workers: int = None, timeout: int = None, start_method: str = None):
+        self.workers = workers or int(os.environ.get('REPORT_WORKERS', os.cpu_count() or 2))
+        self.timeout = timeout or int(os.environ.get('REPORT_RENDER_TIMEOUT', 120))
+        # The pool is started from a process running the outbox, follow-up,
+        # enrichment and scheduler threads and holding pooled DB connections.
+        # A plain fork copies locks those threads may hold (logging, metrics)
+        # and the connection sockets into the child. forkserver forks from a
+        # clean single-threaded server that has only imported the renderer.
+        # spawn is the last resort: each worker would re-import the entry
+        # script, and with it the whole app.
+        methods = multiprocessing.get_all_start_methods()
+        default_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        self.start_method = start_method or os.environ.get('REPORT_WORKER_START_METHOD', default_method)
+    
+    def render(self, jobs: List[Dict]) -> Iterator[RenderResult]:
+        """
+        Render each job's 'data' to its 'filename'. Reports already in the
+        cache are yielded first without rendering.
+        """
+        to_render = []
+        for job in jobs:
+            if os.path.exists(job['filename']):
+                REPORT_RENDERS.inc(outcome='cached')
+                yield RenderResult(job, job['filename'], True, 0.0, 0.0, None)
+            else:
+                to_render.append(job)
+        if not to_render:
+            return
+        
+        workers = max(1, min(self.workers, len(to_render)))
+        context = multiprocessing.get_context(self.start_method)
+        if self.start_method == 'forkserver':
+            # Instead of the default __main__, which would load the app into the server
+            context.set_forkserver_preload(['report_renderer'])
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            # A forked child must not use the parent's DB connections
+            initializer=_forget_db_connections if self.start_method == 'fork' else None
+        )
+        submitted = {}
+        try:
+            for job in to_render:
+                future = pool.submit(write_report, job['data'], job['filename'], self.timeout)
+                submitted[future] = (job, time.perf_counter())
+            
+            # Workers enforce the per-report timeout; this only catches a stuck pool
+            deadline = self.timeout * -(-len(to_render) // workers) + 30
+            try:
+                for future in as_completed(submitted, timeout=deadline):
+                    job, submitted_at = submitted.pop(future)
+                    elapsed = time.perf_counter() - submitted_at
+                    try:
+                        render_seconds = future.result()
+                        REPORT_RENDER_SECONDS.observe(render_seconds, source='pool')
+                        REPORT_RENDERS.inc(outcome='rendered')
+                        _prune_cache(job['data'])
+                        yield RenderResult(job, job['filename'], False, render_seconds,
+                                           max(0.0, elapsed - render_seconds), None)
+                    except Exception as e:
+                        error = f"timed out after {self.timeout}s" if isinstance(e, RenderTimeout) else str(e)
+                        REPORT_RENDERS.inc(outcome='failed')
+                        yield RenderResult(job, None, False, elapsed, 0.0, error)
+            except FuturesTimeout:
+                for job, submitted_at in submitted.values():
+                    REPORT_RENDERS.inc(outcome='failed')
+                    yield RenderResult(job, None, False, time.perf_counter() - submitted_at, 0.0,
+                                       "render pool timed out")
+        finally:
+            pool.shutdown(wait=not submitted, cancel_futures=True)
@@ -0,0 +1,193 @@
+"""
+ReportLab layout for review reports. Works from the plain data built by
+report_generator.collect_report_data and never touches the database, so
+it can run in worker processes that don't load the app.
+"""
+
+import os
+import time
+import signal
+import tempfile
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+
+class RenderTimeout(Exception):
+    """A report took longer than its render timeout"""
+
+def _on_timeout(signum, frame):
+    raise RenderTimeout()
+
+def write_report(data: dict, filename: str, timeout: int = None) -> float:
+    """
+    Render a report to filename and return the seconds it took. The PDF is
+    built beside the target and swapped in, so readers never see a partial
+    file. With a timeout (on platforms with SIGALRM, in a process's main
+    thread) a slow render raises RenderTimeout.
+    """
+    started = time.perf_counter()
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    partial = f"{filename}.{os.getpid()}.tmp"
+    
+    alarm = bool(timeout) and hasattr(signal, 'SIGALRM')
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.alarm(int(timeout))
+    try:
+        render_pdf_report(data, partial)
+        os.replace(partial, filename)
+    finally:
+        if alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous)
+        if os.path.exists(partial):
+            os.remove(partial)
+    
+    return time.perf_counter() - started
+
+def render_to_buffer(data: dict, max_memory: int = None):
+    """
+    Render a report into a rewound spooled buffer for streaming. It stays in
+    memory up to REPORT_SPOOL_MAX_BYTES (default 8 MB) and only spills to a
+    temporary file beyond that.
+    """
+    max_memory = max_memory or int(os.environ.get('REPORT_SPOOL_MAX_BYTES', 8 * 1024 * 1024))
+    buffer = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    render_pdf_report(data, buffer)
+    buffer.seek(0)
+    return buffer
+
+def render_pdf_report(data: dict, filename) -> str:
+    """Lay out a report from collect_report_data into a path or file object; touches no database"""
+    # Create PDF document
+    doc = SimpleDocTemplate(filename, pagesize=letter,
+                          rightMargin=72, leftMargin=72,
+                          topMargin=72, bottomMargin=18)
+    
+    # Styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        alignment=TA_CENTER,
+        spaceAfter=30
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12
+    )
+    
+    # Content
+    story = []
+    
+    # Title
+    title = f"{data['period_name']} Review Report - {data['business_name']}"
+    story.append(Paragraph(title, title_style))
+    story.append(Spacer(1, 12))
+    
+    # Report period
+    period_text = f"Report Period: {data['start_day']} - {data['end_day']}"
+    story.append(Paragraph(period_text, styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Summary Statistics
+    story.append(Paragraph("Summary Statistics", heading_style))
+    
+    rating_distribution = data['ratings']
+    summary_data = [
+        ['Metric', 'Value'],
+        ['Total Reviews', str(data['total_reviews'])],
+        ['Average Rating', f"{data['average_rating']:.1f}/5.0"],
+        ['New Customers', str(data['new_customers'])],
+        ['5-Star Reviews', str(rating_distribution.get(5, 0))],
+        ['4-Star Reviews', str(rating_distribution.get(4, 0))],
+        ['3-Star Reviews', str(rating_distribution.get(3, 0))],
+        ['2-Star Reviews', str(rating_distribution.get(2, 0))],
+        ['1-Star Reviews', str(rating_distribution.get(1, 0))],
+    ]
+    
+    summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    
+    story.append(summary_table)
+    story.append(Spacer(1, 20))
+    
+    # Sentiment Analysis (if available)
+    if data['sentiments']:
+        story.append(Paragraph("Sentiment Analysis", heading_style))
+        
+        sentiment_data = [['Sentiment', 'Count']]
+        for sentiment, count in data['sentiments']:
+            sentiment_data.append([sentiment.title(), str(count)])
+        
+        sentiment_table = Table(sentiment_data, colWidths=[3*inch, 2*inch])
+        sentiment_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        
+        story.append(sentiment_table)
+        story.append(Spacer(1, 20))
+    
+    # Recent Reviews
+    if data['recent_reviews']:
+        story.append(Paragraph("Recent Reviews", heading_style))
+        
+        for review in data['recent_reviews']:
+            review_text = f"<b>{review['rating']}/5 stars</b> - {review['customer_name']}"
+            if review['excerpt']:
+                review_text += f"<br/><i>\"{review['excerpt']}{'...' if review['truncated'] else ''}\"</i>"
+            if review['sentiment']:
+                review_text += f"<br/>Sentiment: {review['sentiment'].title()}"
+            
+            story.append(Paragraph(review_text, styles['Normal']))
+            story.append(Spacer(1, 10))
+    
+    # Issues requiring attention
+    pending = data['pending']
+    if pending['reviews']:
+        story.append(Paragraph("Reviews Requiring Attention", heading_style))
+        if pending['pages'] > 1:
+            last = pending['first'] + len(pending['reviews']) - 1
+            story.append(Paragraph(
+                f"Showing {pending['first']}-{last} of {pending['total']} (page {pending['page']} of {pending['pages']})",
+                styles['Italic']
+            ))
+            story.append(Spacer(1, 10))
+        
+        for review in pending['reviews']:
+            issue_text = f"<b>{review['rating']}/5 stars</b> from {review['customer_name']} - {review['date']}"
+            if review['excerpt']:
+                issue_text += f"<br/>\"{review['excerpt']}{'...' if review['truncated'] else ''}\""
+            
+            story.append(Paragraph(issue_text, styles['Normal']))
+            story.append(Spacer(1, 10))
+    
+    # Build PDF
+    doc.build(story)
+    
+    return filename
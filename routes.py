@@ -2,21 +2,35 @@ import os
 import uuid
 import logging
 from datetime import datetime
-from flask import render_template, redirect, url_for, flash, request, abort
+from flask import render_template, redirect, url_for, flash, request, abort, jsonify, send_file, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from app import app, db
 from models import (User, ReviewTemplate, Customer, Review, ReviewRequest,
-                  ReviewConversation, FollowUpSequence, Referral, AutomationSettings)
+                  FollowUpSequence, Referral, AutomationSettings, ReviewStats,
+                  BulkReplyJob, ReviewRequestCampaign)
 from forms import (LoginForm, RegistrationForm, ReviewTemplateForm, CustomerForm, 
                   ReviewForm, AdminResponseForm, SettingsForm, SendReviewRequestForm, DetailedFeedbackForm)
-from gmail_service import send_review_request_email, send_admin_notification
+from gmail_service import send_admin_notification
+from template_engine import render as render_template_message
+from email_outbox_service import enqueue_email, outbox_worker
 from utils import generate_review_link
-from ai_service import mistral_service
+from pagination import keyset_paginate, cached_count, forget_count
+from queries import ReviewQueries, CustomerQueries
+from user_cache import invalidate_user
+from sql_profiler import sql_profiler
+from metrics import registry as metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from ai_service import mistral_service, ai_priority, INTERACTIVE
 # Import conditionally to prevent scheduler from starting in serverless environments
 if not os.environ.get('VERCEL') and not os.environ.get('VERCEL_ENV'):
     from automation_service import AutomationService
+    from enrichment_service import enrichment_pipeline
+    from bulk_reply_service import bulk_reply_runner
+    from campaign_service import campaign_runner
 else:
     AutomationService = None
+    enrichment_pipeline = None
+    bulk_reply_runner = None
+    campaign_runner = None
 from voice_service import voice_service
 
 logger = logging.getLogger(__name__)
@@ -70,6 +84,8 @@ def register():
         
         db.session.add(user)
         db.session.commit()
+        # SQLite can hand out a deleted user's id again
+        invalidate_user(user.id)
         
         # Create multiple email template designs
         templates = [
@@ -188,16 +204,16 @@ def logout():
 def dashboard():
     # Get statistics
     total_customers = Customer.query.filter_by(user_id=current_user.id).count()
-    total_reviews = Review.query.filter_by(user_id=current_user.id).count()
-    pending_reviews = Review.query.filter_by(user_id=current_user.id, status='pending').count()
+    stats = ReviewStats.for_user(current_user.id)
+    # Read before the commit expires the row
+    total_reviews, pending_reviews = stats.total_reviews, stats.pending_count
+    db.session.commit()
     
     # Recent reviews
-    recent_reviews = Review.query.filter_by(user_id=current_user.id)\
-        .order_by(Review.created_at.desc()).limit(5).all()
+    recent_reviews = ReviewQueries.recent_for_user(current_user.id)
     
     # Recent customers
-    recent_customers = Customer.query.filter_by(user_id=current_user.id)\
-        .order_by(Customer.created_at.desc()).limit(5).all()
+    recent_customers = CustomerQueries.recent_for_user(current_user.id)
     
     return render_template('dashboard.html', 
                          total_customers=total_customers,
@@ -408,10 +424,26 @@ def test_database():
 @app.route('/customers')
 @login_required
 def customers():
-    page = request.args.get('page', 1, type=int)
-    customers = Customer.query.filter_by(user_id=current_user.id)\
-        .order_by(Customer.created_at.desc())\
-        .paginate(page=page, per_page=20, error_out=False)
+    user_id = current_user.id
+    total = cached_count(('customers', user_id), Customer.query.filter_by(user_id=user_id).count)
+    customers = keyset_paginate(CustomerQueries.list_for_user(user_id), Customer,
+                                request.args.get('cursor'), total=total)
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'customers': [{
+                'id': customer.id,
+                'name': customer.name,
+                'email': customer.email,
+                'phone': customer.phone,
+                'service_type': customer.service_type,
+                'review_requested': customer.review_requested,
+                'created_at': customer.created_at.isoformat() if customer.created_at else None
+            } for customer in customers.items],
+            'next_cursor': customers.next_cursor,
+            'prev_cursor': customers.prev_cursor,
+            'total': customers.total
+        })
     
     return render_template('customers.html', customers=customers)
 
@@ -432,6 +464,7 @@ def new_customer():
         
         db.session.add(customer)
         db.session.commit()
+        forget_count(('customers', current_user.id))
         
         flash('Customer added successfully!', 'success')
         return redirect(url_for('customers'))
@@ -486,37 +519,38 @@ def send_review_request(id):
             user_id=current_user.id,
             customer_id=customer.id,
             template_id=template.id,
-            unique_token=unique_token
+            unique_token=unique_token,
+            status='queued'
         )
         
         db.session.add(review_request)
+        db.session.flush()
         
         # Update customer record
         customer.review_requested = True
         customer.review_request_date = datetime.utcnow()
         
-        db.session.commit()
-        
         # Generate review link
         review_link = generate_review_link(unique_token)
         
-        # Send email
-        try:
-            send_review_request_email(
-                customer.email,
-                template.subject,
-                template.message,
-                customer.name,
-                current_user.business_name,
-                review_link
-            )
-            
-            flash('Review request sent successfully!', 'success')
-        except Exception as e:
-            flash(f'Error sending email: {str(e)}', 'danger')
-            # Rollback the database changes if email fails
-            review_request.status = 'failed'
-            db.session.commit()
+        # Queue the email in the same transaction as the request record
+        subject, message = render_template_message(
+            template,
+            customer.name,
+            current_user.business_name,
+            review_link
+        )
+        enqueue_email(
+            customer.email,
+            subject,
+            message,
+            user_id=current_user.id,
+            kind='review_request',
+            review_request_id=review_request.id,
+            idempotency_key=f"review-request:{unique_token}"
+        )
+        
+        flash('Review request queued and will be emailed shortly.', 'success')
         
         return redirect(url_for('customers'))
     
@@ -526,23 +560,48 @@ def send_review_request(id):
 @app.route('/reviews')
 @login_required
 def reviews():
-    page = request.args.get('page', 1, type=int)
     status_filter = request.args.get('status', 'all')
     
-    query = Review.query.filter_by(user_id=current_user.id)
+    query = ReviewQueries.list_for_user(current_user.id,
+                                        status=status_filter if status_filter != 'all' else None)
     
+    # Totals come from the per-user rollup instead of a COUNT(*) per page
+    stats = ReviewStats.for_user(current_user.id)
     if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
-    
-    reviews = query.order_by(Review.created_at.desc())\
-        .paginate(page=page, per_page=20, error_out=False)
+        column = ReviewStats.STATUS_COLUMNS.get(status_filter)
+        total = getattr(stats, column) if column else None
+    else:
+        total = stats.total_reviews
+    db.session.commit()
     
-    return render_template('reviews.html', reviews=reviews, status_filter=status_filter)
+    reviews = keyset_paginate(query, Review, request.args.get('cursor'), total=total)
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'reviews': [{
+                'id': review.id,
+                'customer_id': review.customer_id,
+                'rating': review.rating,
+                'comment': review.comment,
+                'status': review.status,
+                'sentiment': review.sentiment,
+                'created_at': review.created_at.isoformat() if review.created_at else None
+            } for review in reviews.items],
+            'next_cursor': reviews.next_cursor,
+            'prev_cursor': reviews.prev_cursor,
+            'total': reviews.total
+        })
+    
+    bulk_job = BulkReplyJob.query.filter_by(user_id=current_user.id)\
+        .order_by(BulkReplyJob.id.desc()).first()
+    
+    return render_template('reviews.html', reviews=reviews, status_filter=status_filter,
+                         bulk_job=bulk_job)
 
 @app.route('/reviews/<int:id>')
 @login_required
 def review_detail(id):
-    review = Review.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+    review = ReviewQueries.detail(current_user.id, id)
     
     form = AdminResponseForm()
     if review.admin_response:
@@ -557,6 +616,7 @@ def respond_to_review(id):
     
     form = AdminResponseForm()
     if form.validate_on_submit():
+        ReviewStats.record_status_change(review.user_id, review.status, 'responded')
         review.admin_response = form.admin_response.data
         review.response_date = datetime.utcnow()
         review.status = 'responded'
@@ -590,6 +650,7 @@ def public_review(token):
         )
         
         db.session.add(review)
+        ReviewStats.record_new_review(review)
         
         # Update review request
         review_request.completed_at = datetime.utcnow()
@@ -660,8 +721,10 @@ Suggestions for improvement: {form.suggestions.data or 'Not specified'}
 Contact requested: {'Yes' if form.contact_me.data else 'No'}
             """
             
+            new_status = 'needs_response' if form.contact_me.data else 'pending'
+            ReviewStats.record_status_change(review.user_id, review.status, new_status)
             review.comment = detailed_comment.strip()
-            review.status = 'needs_response' if form.contact_me.data else 'pending'
+            review.status = new_status
             
             db.session.commit()
             
@@ -699,11 +762,13 @@ Contact requested: {'Yes' if form.contact_me.data else 'No'}
 def settings():
     form = SettingsForm(obj=current_user)
     if form.validate_on_submit():
-        current_user.business_name = form.business_name.data
-        current_user.google_business_url = form.google_business_url.data
-        current_user.email = form.email.data
+        user = current_user.record()
+        user.business_name = form.business_name.data
+        user.google_business_url = form.google_business_url.data
+        user.email = form.email.data
         
         db.session.commit()
+        invalidate_user(user.id)
         
         flash('Settings updated successfully!', 'success')
         return redirect(url_for('settings'))
@@ -715,30 +780,18 @@ def settings():
 def analytics():
     # Calculate analytics data
     total_customers = Customer.query.filter_by(user_id=current_user.id).count()
-    total_reviews = Review.query.filter_by(user_id=current_user.id).count()
-    
-    # Review distribution by rating
-    rating_counts = {}
-    for i in range(1, 6):
-        rating_counts[i] = Review.query.filter_by(user_id=current_user.id, rating=i).count()
-    
-    # Reviews by month (last 6 months)
-    from sqlalchemy import extract, func
-    monthly_reviews = db.session.query(
-        extract('month', Review.created_at).label('month'),
-        func.count(Review.id).label('count')
-    ).filter_by(user_id=current_user.id).group_by(extract('month', Review.created_at)).all()
     
-    # Average rating
-    avg_rating = db.session.query(func.avg(Review.rating)).filter_by(user_id=current_user.id).scalar()
-    avg_rating = round(avg_rating, 1) if avg_rating else 0
+    # Review counters come from the per-user rollup instead of scanning reviews
+    stats = ReviewStats.for_user(current_user.id)
+    db.session.commit()
     
     return render_template('analytics.html',
                          total_customers=total_customers,
-                         total_reviews=total_reviews,
-                         rating_counts=rating_counts,
-                         monthly_reviews=monthly_reviews,
-                         avg_rating=avg_rating)
+                         total_reviews=stats.total_reviews,
+                         rating_counts=stats.rating_counts,
+                         monthly_reviews=stats.monthly_reviews(),
+                         avg_rating=stats.average_rating,
+                         stats=stats)
 
 # ==== AI AUTOMATION ROUTES ====
 
@@ -757,13 +810,14 @@ def ai_generate_response(review_id):
         settings = AutomationSettings.query.filter_by(user_id=current_user.id).first()
         tone = settings.ai_tone if settings else 'professional'
         
-        # Generate AI response
-        suggestion = mistral_service.generate_response_suggestion(
-            review.comment,
-            review.rating,
-            current_user.business_name or "our business",
-            tone
-        )
+        # Generate AI response ahead of any queued background AI work
+        with ai_priority(INTERACTIVE):
+            suggestion = mistral_service.generate_response_suggestion(
+                review.comment,
+                review.rating,
+                current_user.business_name or "our business",
+                tone
+            )
         
         # Save suggestion to review
         review.ai_suggested_response = suggestion
@@ -793,7 +847,7 @@ def ai_send_response(review_id):
         if AutomationService:
             success = AutomationService.send_ai_response(review_id, message)
             if success:
-                flash('Response sent successfully!', 'success')
+                flash('Response queued and will be emailed shortly.', 'success')
             else:
                 flash('Error sending response. Please try again.', 'danger')
         else:
@@ -806,6 +860,37 @@ def ai_send_response(review_id):
     
     return redirect(url_for('review_detail', id=review_id))
 
+@app.route('/ai/bulk-generate-responses', methods=['POST'])
+@login_required
+def ai_bulk_generate_responses():
+    """Start a background job that drafts AI replies for all pending reviews"""
+    if not bulk_reply_runner:
+        flash('Bulk AI replies are not available in this environment', 'info')
+        return redirect(url_for('reviews'))
+    
+    try:
+        job = bulk_reply_runner.start_job(current_user.id)
+    except Exception as e:
+        logger.error(f"Error starting bulk AI reply job: {e}")
+        db.session.rollback()
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'Could not start bulk AI replies'}), 500
+        flash('Error starting bulk AI replies. Please try again.', 'danger')
+        return redirect(url_for('reviews'))
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job.to_dict()), 202
+    
+    flash(f'Generating AI replies for {job.total_reviews} pending reviews...', 'info')
+    return redirect(url_for('reviews', status='pending'))
+
+@app.route('/ai/bulk-generate-responses/<int:job_id>')
+@login_required
+def ai_bulk_generate_status(job_id):
+    """Progress of a bulk AI reply job, polled by the reviews page"""
+    job = BulkReplyJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return jsonify(job.to_dict())
+
 @app.route('/automation/settings', methods=['GET', 'POST'])
 @login_required
 def automation_settings():
@@ -880,9 +965,11 @@ def voice_feedback(token):
                 rating=rating,
                 comment=transcription,
                 voice_recording_path=file_path,
-                voice_transcription=transcription
+                voice_transcription=transcription,
+                enrichment_pending=True
             )
             db.session.add(review)
+            ReviewStats.record_new_review(review)
             
             # Update review request status
             review_request.completed_at = datetime.utcnow()
@@ -890,9 +977,9 @@ def voice_feedback(token):
             
             db.session.commit()
             
-            # Process with AI automation if available
-            if AutomationService:
-                AutomationService.process_new_review(review.id)
+            # Queue AI analysis so the customer doesn't wait on it
+            if enrichment_pipeline:
+                enrichment_pipeline.enqueue(review.id)
             
             flash('Voice feedback submitted successfully!', 'success')
             return render_template('review_submitted.html', 
@@ -921,33 +1008,24 @@ def customer_segments():
     location = request.args.get('location')
     
     # Build query
-    query = Customer.query.filter_by(user_id=current_user.id)
-    
-    if min_services:
-        query = query.filter(Customer.total_services >= min_services)
-    
-    if rating_filter == 'high':
-        query = query.filter(Customer.average_rating >= 4.0)
-    elif rating_filter == 'low':
-        query = query.filter(Customer.average_rating < 3.0)
-    
-    if service_type:
-        query = query.filter(Customer.service_type.ilike(f'%{service_type}%'))
-    
-    if location:
-        query = query.filter(Customer.location.ilike(f'%{location}%'))
-    
-    customers = query.all()
+    customers = Customer.segment_query(
+        current_user.id, min_services, rating_filter, service_type, location
+    ).all()
     
     # Get unique values for filters
     all_customers = Customer.query.filter_by(user_id=current_user.id).all()
     service_types = list(set(c.service_type for c in all_customers if c.service_type))
     locations = list(set(c.location for c in all_customers if c.location))
     
+    templates = ReviewTemplate.query.filter_by(user_id=current_user.id, is_active=True).all()
+    campaigns = campaign_runner.active_campaigns(current_user.id) if campaign_runner else []
+    
     return render_template('customer_segments.html', 
                          customers=customers,
                          service_types=service_types,
                          locations=locations,
+                         templates=templates,
+                         campaigns=campaigns,
                          current_filters={
                              'min_services': min_services,
                              'rating_filter': rating_filter,
@@ -955,6 +1033,79 @@ def customer_segments():
                              'location': location
                          })
 
+@app.route('/campaigns', methods=['POST'])
+@login_required
+def create_campaign():
+    """Send review requests to the selected customers or to a whole segment"""
+    if not campaign_runner:
+        flash('Campaigns are not available in this environment', 'info')
+        return redirect(url_for('customer_segments'))
+    
+    template = ReviewTemplate.query.filter_by(
+        id=request.form.get('template_id', type=int), user_id=current_user.id
+    ).first()
+    if not template:
+        flash('Please choose a review template for the campaign.', 'warning')
+        return redirect(url_for('customer_segments'))
+    
+    filters = {
+        'min_services': request.form.get('min_services', type=int),
+        'rating_filter': request.form.get('rating_filter'),
+        'service_type': request.form.get('service_type'),
+        'location': request.form.get('location')
+    }
+    customer_ids = None
+    if request.form.get('scope') != 'segment':
+        customer_ids = request.form.getlist('customer_ids', type=int)
+        if not customer_ids:
+            flash('Please select at least one customer.', 'warning')
+            return redirect(url_for('customer_segments', **filters))
+    
+    try:
+        campaign = campaign_runner.create_campaign(current_user, template, customer_ids=customer_ids, filters=filters)
+        campaign_runner.launch(campaign.id)
+    except Exception as e:
+        logger.error(f"Error creating review request campaign: {e}")
+        db.session.rollback()
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'Could not start the campaign'}), 500
+        flash('Error starting the campaign. Please check the template and try again.', 'danger')
+        return redirect(url_for('customer_segments', **filters))
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(campaign.to_dict()), 202
+    
+    flash(f'Sending review requests to {campaign.total_count} customers...', 'info')
+    return redirect(url_for('customer_segments', **filters))
+
+@app.route('/campaigns/<int:campaign_id>')
+@login_required
+def campaign_status(campaign_id):
+    """Progress of a review request campaign, polled by the segments page"""
+    campaign = ReviewRequestCampaign.query.filter_by(id=campaign_id, user_id=current_user.id).first_or_404()
+    return jsonify(campaign.to_dict())
+
+@app.route('/campaigns/<int:campaign_id>/<action>', methods=['POST'])
+@login_required
+def campaign_action(campaign_id, action):
+    """Pause or resume a review request campaign"""
+    campaign = ReviewRequestCampaign.query.filter_by(id=campaign_id, user_id=current_user.id).first_or_404()
+    if action not in ('pause', 'resume') or not campaign_runner:
+        abort(404)
+    
+    if action == 'pause':
+        changed = campaign_runner.pause(campaign.id)
+    else:
+        changed = campaign_runner.resume(campaign.id)
+    db.session.refresh(campaign)
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(campaign.to_dict()), 200 if changed else 409
+    
+    if changed:
+        flash(f'Campaign {"paused" if action == "pause" else "resumed"}.', 'success')
+    return redirect(url_for('customer_segments'))
+
 @app.route('/referral/<token>')
 def referral_landing(token):
     """Referral landing page"""
@@ -982,35 +1133,146 @@ def generate_report(report_type):
     if report_type not in ['weekly', 'monthly']:
         abort(400)
     
+    return redirect(url_for('download_report', report_type=report_type, page=request.args.get('page', 1, type=int)))
+
+@app.route('/reports/download/<report_type>')
+@login_required
+def download_report(report_type):
+    """
+    Stream a PDF report built in memory. The ETag is the report's data
+    version, so a client revalidating an unchanged report gets a 304
+    without anything being rendered.
+    """
+    if report_type not in ['weekly', 'monthly']:
+        abort(400)
+    
     try:
-        from report_generator import generate_pdf_report
+        from report_generator import (collect_report_data, data_version, report_filename,
+                                      REPORT_RENDER_SECONDS, REPORT_RENDERS)
+        from report_renderer import render_to_buffer
         
-        report_path = generate_pdf_report(current_user.id, report_type)
-        if report_path:
-            flash(f'{report_type.title()} report generated successfully!', 'success')
-            # In a real implementation, you'd send the file as download
-            # For now, just show success message
-        else:
-            flash('Error generating report', 'danger')
+        data = collect_report_data(current_user.id, report_type,
+                                   pending_page=request.args.get('page', 1, type=int))
+        if data:
+            version = data_version(data)
+            if request.if_none_match.contains(version):
+                response = app.response_class(status=304)
+            else:
+                # A scheduled run may already have rendered this exact report
+                cached_path = report_filename(data, version)
+                if os.path.exists(cached_path):
+                    REPORT_RENDERS.inc(outcome='cached')
+                    source = cached_path
+                else:
+                    with REPORT_RENDER_SECONDS.time(source='download'):
+                        source = render_to_buffer(data)
+                    REPORT_RENDERS.inc(outcome='rendered')
+                response = send_file(source, mimetype='application/pdf', as_attachment=True,
+                                     download_name=os.path.basename(cached_path), conditional=False)
+            
+            response.set_etag(version)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
     except Exception as e:
         logger.error(f"Error generating report: {e}")
         flash('Error generating report', 'danger')
     
     return redirect(url_for('analytics'))
 
+@app.route('/export/<dataset>.<fmt>')
+@login_required
+def export_data(dataset, fmt):
+    """
+    Stream reviews, customers or conversations as CSV or NDJSON. Optional
+    query parameters: columns (comma separated), start and end (YYYY-MM-DD,
+    inclusive).
+    """
+    from export_service import ExportError, FORMATS, build_export, export_filename
+
+    try:
+        chunks = build_export(current_user.id, dataset, fmt,
+                              columns=request.args.get('columns'),
+                              start=request.args.get('start'),
+                              end=request.args.get('end'))
+    except ExportError as e:
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': str(e)}), 400
+        flash(str(e), 'danger')
+        return redirect(url_for('customers' if dataset == 'customers' else 'reviews'))
+
+    response = app.response_class(stream_with_context(chunks), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, fmt)}"'
+    response.headers['Cache-Control'] = 'private, no-store'
+    # Let proxies pass chunks through as they are written
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/review/<int:id>/conversation')
 @login_required  
 def review_conversation(id):
     """View conversation history for a review"""
-    review = Review.query.filter_by(id=id, user_id=current_user.id).first_or_404()
-    
-    conversations = ReviewConversation.query.filter_by(review_id=id)\
-        .order_by(ReviewConversation.sent_at.asc()).all()
+    review, conversations = ReviewQueries.with_conversation(current_user.id, id)
     
     return render_template('review_conversation.html', 
                          review=review, 
                          conversations=conversations)
 
+@app.route('/_perf', methods=['GET', 'POST'])
+@login_required
+def perf():
+    """Per-endpoint SQL statement counts, DB time and slowest statements (admins only)"""
+    if current_user.username not in app.config['PERF_ADMINS']:
+        abort(404)
+    
+    if request.method == 'POST':
+        sql_profiler.reset()
+        return redirect(url_for('perf'))
+    
+    endpoints = sql_profiler.snapshot()
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'since': sql_profiler.since.isoformat(),
+            'endpoints': [{
+                'endpoint': stats.endpoint,
+                'requests': stats.requests,
+                'avg_statements': round(stats.avg_statements, 1),
+                'max_statements': stats.max_statements,
+                'avg_db_ms': round(stats.avg_db_ms, 1),
+                'avg_ms': round(stats.avg_ms, 1),
+                'slowest': [{
+                    'ms': round(slow.ms, 1),
+                    'statement': slow.statement,
+                    'path': slow.path,
+                    'at': slow.at.isoformat(),
+                    'plan': slow.plan
+                } for slow in stats.slowest]
+            } for stats in endpoints]
+        })
+    
+    return render_template('perf.html', endpoints=endpoints, since=sql_profiler.since,
+                         slow_ms=sql_profiler.slow_ms)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint; needs METRICS_TOKEN as a bearer token when that is set"""
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    return app.response_class(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/_outbox/drain', methods=['GET', 'POST'])
+def drain_outbox():
+    """
+    Deliver queued email where no background worker runs (serverless);
+    called by the cron in vercel.json with CRON_SECRET as a bearer token
+    """
+    secret = os.environ.get('CRON_SECRET')
+    if not secret:
+        abort(404)
+    if request.headers.get('Authorization') != f'Bearer {secret}':
+        abort(401)
+    return jsonify({'handled': outbox_worker.drain()})
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('404.html'), 404
@@ -0,0 +1,297 @@
+import os
+import uuid
+import socket
+import logging
+from collections import namedtuple
+from datetime import datetime, timedelta
+from threading import Thread, Event
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from metrics import registry
+from models import ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_TICK_SECONDS = registry.histogram(
+    'scheduler_tick_duration_seconds', 'Time for one scheduler poll, including the jobs it ran')
+SCHEDULER_JOB_SECONDS = registry.histogram(
+    'scheduler_job_duration_seconds', 'Time a scheduled job ran for, by job', ['job'])
+SCHEDULER_JOB_RUNS = registry.counter(
+    'scheduler_job_runs_total', 'Scheduled job runs by job and status', ['job', 'status'])
+
+class CronSchedule:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week),
+    evaluated in UTC. Fields accept *, numbers, ranges (a-b), lists (a,b)
+    and steps (*/n, a-b/n); day-of-week runs 0-6 from Sunday, 7 is also
+    Sunday. When both day fields are restricted a day matching either runs,
+    as in cron.
+    """
+
+    FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(parts)}: {expression!r}")
+
+        values = [self._parse(part, name, low, high) for part, (name, low, high) in zip(parts, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse(field: str, name: str, low: int, high: int) -> set:
+        values = set()
+        for item in field.split(','):
+            spec, _, step = item.partition('/')
+            try:
+                step = int(step) if step else 1
+                if spec == '*':
+                    start, end = low, high
+                elif '-' in spec:
+                    start, end = (int(value) for value in spec.split('-', 1))
+                else:
+                    start = int(spec)
+                    end = high if step > 1 else start
+            except ValueError:
+                raise ValueError(f"Invalid cron {name} field: {field!r}")
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Cron {name} field out of range {low}-{high}: {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day and self.any_weekday:
+            return True
+        if self.any_day:
+            return weekday
+        if self.any_weekday:
+            return day
+        return day or weekday
+
+    def next_after(self, after: datetime) -> datetime:
+        """The first matching minute strictly after the given time"""
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+JobDefinition = namedtuple('JobDefinition', 'func schedule cron catch_up lease_seconds')
+
+class _LeaseKeeper(Thread):
+    """Extends a running job's lease so a long run isn't picked up by another worker"""
+
+    def __init__(self, engine, job_id: int, worker_id: str, lease_seconds: int):
+        super().__init__(name=f'scheduled-job-lease-{job_id}', daemon=True)
+        self.engine = engine
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self._stopped = Event()
+
+    def run(self):
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(ScheduledJob)
+                        .where(ScheduledJob.id == self.job_id, ScheduledJob.locked_by == self.worker_id)
+                        .values(locked_until=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                    )
+            except Exception as e:
+                logger.error(f"Error extending lease for scheduled job {self.job_id}: {e}")
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+class JobScheduler:
+    """
+    Runs recurring jobs registered in code on the schedule stored in the
+    ScheduledJob table.
+
+    Any number of processes can poll; a due job is leased to exactly one of
+    them. The lease is taken with SELECT ... FOR UPDATE SKIP LOCKED on
+    PostgreSQL followed by a conditional UPDATE on locked_until, which is
+    also what guards the claim on SQLite (where FOR UPDATE is not
+    supported). Runs missed while no worker was up are caught up with a
+    single run, unless the job opts out with catch_up=False.
+    """
+
+    LEASE_SECONDS = 600
+    MISFIRE_GRACE_SECONDS = 300
+
+    def __init__(self, poll_interval: float = None):
+        self.poll_interval = poll_interval or float(os.environ.get('SCHEDULER_POLL_INTERVAL', 30))
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs: Dict[str, JobDefinition] = {}
+        self._stopping = Event()
+
+    def register(self, name: str, schedule: str, func: Callable, catch_up: bool = True,
+                 lease_seconds: int = None):
+        """Register func to run on a cron schedule (UTC)"""
+        self.jobs[name] = JobDefinition(func, schedule, CronSchedule(schedule), catch_up,
+                                        lease_seconds or self.LEASE_SECONDS)
+
+    def ensure_jobs(self):
+        """
+        Create rows for registered jobs, pick up schedule changes made in
+        code, and delete rows of jobs no longer registered unless one is
+        still running
+        """
+        now = datetime.utcnow()
+        existing = {job.name: job for job in ScheduledJob.query.filter(ScheduledJob.name.in_(self.jobs)).all()}
+
+        for name, definition in self.jobs.items():
+            job = existing.get(name)
+            if job is None:
+                db.session.add(ScheduledJob(
+                    name=name,
+                    schedule=definition.schedule,
+                    catch_up=definition.catch_up,
+                    next_run_at=definition.cron.next_after(now)
+                ))
+            elif job.schedule != definition.schedule or job.catch_up != definition.catch_up:
+                job.schedule = definition.schedule
+                job.catch_up = definition.catch_up
+                job.next_run_at = definition.cron.next_after(now)
+
+        retired = ScheduledJob.query.filter(
+            ScheduledJob.name.notin_(self.jobs),
+            or_(ScheduledJob.locked_until.is_(None), ScheduledJob.locked_until < now)
+        ).all()
+        for job in retired:
+            logger.info(f"Removing scheduled job {job.name}, which is no longer registered")
+            db.session.delete(job)
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created the rows first
+            db.session.rollback()
+
+    def _claim(self) -> Optional[ScheduledJob]:
+        """Lease the most overdue job, or return None if nothing is due"""
+        now = datetime.utcnow()
+        free = or_(ScheduledJob.locked_until.is_(None), ScheduledJob.locked_until < now)
+
+        job = ScheduledJob.query.filter(
+            ScheduledJob.enabled.is_(True),
+            ScheduledJob.next_run_at <= now,
+            ScheduledJob.name.in_(self.jobs),
+            free
+        ).order_by(ScheduledJob.next_run_at).with_for_update(skip_locked=True).first()
+
+        if job is None:
+            db.session.commit()
+            return None
+
+        lease_seconds = self.jobs[job.name].lease_seconds
+        claimed = db.session.execute(
+            update(ScheduledJob)
+            .where(ScheduledJob.id == job.id, free)
+            .values(locked_by=self.worker_id, locked_until=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return job if claimed == 1 else None
+
+    def _run(self, job: ScheduledJob):
+        definition = self.jobs[job.name]
+        job_id, name, due_at, catch_up = job.id, job.name, job.next_run_at, job.catch_up
+        started = datetime.utcnow()
+        late = (started - due_at).total_seconds()
+
+        if not catch_up and late > self.MISFIRE_GRACE_SECONDS:
+            logger.info(f"Skipping missed run of {name} due at {due_at}")
+            status, error, ran = 'skipped', None, False
+        else:
+            if late > self.MISFIRE_GRACE_SECONDS:
+                logger.info(f"Catching up {name}, due at {due_at}")
+            keeper = _LeaseKeeper(db.engine, job_id, self.worker_id, definition.lease_seconds)
+            keeper.start()
+            try:
+                definition.func()
+                status, error = 'succeeded', None
+            except Exception as e:
+                logger.error(f"Scheduled job {name} failed: {e}")
+                db.session.rollback()
+                status, error = 'failed', str(e)
+            finally:
+                keeper.stop()
+            ran = True
+
+        finished = datetime.utcnow()
+        SCHEDULER_JOB_RUNS.inc(job=name, status=status)
+        if ran:
+            SCHEDULER_JOB_SECONDS.observe((finished - started).total_seconds(), job=name)
+        values = {
+            'last_status': status,
+            'last_error': error,
+            'next_run_at': definition.cron.next_after(finished),
+            'locked_by': None,
+            'locked_until': None,
+        }
+        if ran:
+            values.update(last_run_at=started, last_finished_at=finished, run_count=ScheduledJob.run_count + 1)
+
+        # Only the lease holder may record the run
+        db.session.execute(
+            update(ScheduledJob)
+            .where(ScheduledJob.id == job_id, ScheduledJob.locked_by == self.worker_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        logger.info(f"Scheduled job {name} {status} in {(finished - started).total_seconds():.1f}s")
+
+    def run_due_jobs(self) -> int:
+        """Run every job that is due now; returns how many were claimed"""
+        claimed = 0
+        with SCHEDULER_TICK_SECONDS.time():
+            while not self._stopping.is_set():
+                job = self._claim()
+                if job is None:
+                    break
+                claimed += 1
+                self._run(job)
+        return claimed
+
+    def run_forever(self):
+        """Poll for due jobs until stop() is called; needs an app context"""
+        self.ensure_jobs()
+        logger.info(f"Job scheduler {self.worker_id} polling every {self.poll_interval:.0f}s")
+
+        while not self._stopping.is_set():
+            try:
+                self.run_due_jobs()
+            except Exception as e:
+                logger.error(f"Error running scheduled jobs: {e}")
+                db.session.rollback()
+            self._stopping.wait(self.poll_interval)
+
+    def stop(self):
+        self._stopping.set()
+
+# Initialize global scheduler instance
+job_scheduler = JobScheduler()
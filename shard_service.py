@@ -0,0 +1,197 @@
+import os
+import uuid
+import random
+import socket
+import logging
+from datetime import datetime, timedelta
+from threading import Thread, Event
+from typing import List
+
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import ShardLease, ShardMember
+
+logger = logging.getLogger(__name__)
+
+class ShardLeaseManager:
+    """
+    Splits a background job into shard_count shards and leases an even share
+    of them to each live worker in the group.
+
+    Workers announce themselves with a heartbeat in ShardMember. On every
+    rebalance a worker counts the live members and works out its fair share
+    (shard count / members, rounded up). It gives back shards above that
+    share and claims free or expired ones up to it. Each claim is a
+    conditional UPDATE checked by rowcount, so a shard has one owner at a
+    time. When a worker joins, the others shed shards for it on their next
+    rebalance. When one stops heartbeating, its leases expire and the rest
+    pick them up.
+
+    Lease bookkeeping runs in its own short transactions on the engine,
+    separate from the session the work itself uses.
+    """
+
+    def __init__(self, group: str, shard_count: int, lease_seconds: int = None, worker_id: str = None):
+        self.group = group
+        self.shard_count = shard_count
+        self.lease_seconds = lease_seconds or int(os.environ.get('SHARD_LEASE_SECONDS', 120))
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.engine = None
+
+    def _engine(self):
+        if self.engine is None:
+            self.engine = db.engine
+        return self.engine
+
+    def _ensure_shards(self, conn):
+        existing = set(conn.execute(
+            select(ShardLease.shard).where(ShardLease.group == self.group)
+        ).scalars())
+        missing = [shard for shard in range(self.shard_count) if shard not in existing]
+        if missing:
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(ShardLease), [{'group': self.group, 'shard': shard} for shard in missing])
+            except IntegrityError:
+                # Another worker created them first
+                pass
+
+    def heartbeat(self):
+        """Record that this worker is alive and extend the leases it holds"""
+        now = datetime.utcnow()
+        with self._engine().begin() as conn:
+            self._heartbeat(conn, now)
+            self._renew(conn, now)
+
+    def _heartbeat(self, conn, now: datetime):
+        refreshed = conn.execute(
+            update(ShardMember)
+            .where(ShardMember.group == self.group, ShardMember.worker_id == self.worker_id)
+            .values(heartbeat_at=now)
+        ).rowcount
+        if not refreshed:
+            conn.execute(insert(ShardMember).values(group=self.group, worker_id=self.worker_id, heartbeat_at=now))
+
+    def _renew(self, conn, now: datetime):
+        conn.execute(
+            update(ShardLease)
+            .where(ShardLease.group == self.group, ShardLease.owner == self.worker_id)
+            .values(lease_until=now + timedelta(seconds=self.lease_seconds))
+        )
+
+    def live_members(self) -> int:
+        stale_before = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        with self._engine().connect() as conn:
+            return conn.execute(
+                select(func.count(ShardMember.id))
+                .where(ShardMember.group == self.group, ShardMember.heartbeat_at >= stale_before)
+            ).scalar()
+
+    def rebalance(self) -> List[int]:
+        """Heartbeat, shed or claim shards to hold a fair share, and return the shards held"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.lease_seconds)
+        engine = self._engine()
+
+        with engine.begin() as conn:
+            self._ensure_shards(conn)
+            self._heartbeat(conn, now)
+            self._renew(conn, now)
+            conn.execute(
+                delete(ShardMember)
+                .where(ShardMember.group == self.group, ShardMember.heartbeat_at < stale_before)
+            )
+
+        with engine.begin() as conn:
+            members = conn.execute(
+                select(func.count(ShardMember.id))
+                .where(ShardMember.group == self.group, ShardMember.heartbeat_at >= stale_before)
+            ).scalar() or 1
+            fair_share = -(-self.shard_count // members)
+
+            held = self.held_shards(conn)
+            if len(held) > fair_share:
+                extra = held[fair_share:]
+                conn.execute(
+                    update(ShardLease)
+                    .where(ShardLease.group == self.group, ShardLease.owner == self.worker_id,
+                           ShardLease.shard.in_(extra))
+                    .values(owner=None, lease_until=None)
+                )
+                logger.info(f"Worker {self.worker_id} released {self.group} shards {extra}")
+                held = held[:fair_share]
+
+        if len(held) < fair_share:
+            free = or_(ShardLease.owner.is_(None), ShardLease.lease_until < now)
+            with engine.connect() as conn:
+                candidates = list(conn.execute(
+                    select(ShardLease.shard)
+                    .where(ShardLease.group == self.group, ShardLease.shard < self.shard_count, free)
+                ).scalars())
+
+            # Random order so workers starting together don't all race for shard 0
+            random.shuffle(candidates)
+            for shard in candidates:
+                if len(held) >= fair_share:
+                    break
+                with engine.begin() as conn:
+                    claimed = conn.execute(
+                        update(ShardLease)
+                        .where(ShardLease.group == self.group, ShardLease.shard == shard, free)
+                        .values(owner=self.worker_id, lease_until=now + timedelta(seconds=self.lease_seconds))
+                    ).rowcount
+                if claimed:
+                    held.append(shard)
+            held.sort()
+
+        return held
+
+    def held_shards(self, conn=None) -> List[int]:
+        """Shards this worker holds an unexpired lease on"""
+        query = select(ShardLease.shard).where(
+            ShardLease.group == self.group,
+            ShardLease.owner == self.worker_id,
+            ShardLease.shard < self.shard_count,
+            ShardLease.lease_until >= datetime.utcnow()
+        ).order_by(ShardLease.shard)
+        if conn is not None:
+            return list(conn.execute(query).scalars())
+        with self._engine().connect() as conn:
+            return list(conn.execute(query).scalars())
+
+    def holds(self, shard: int) -> bool:
+        return shard in self.held_shards()
+
+    def leave(self):
+        """Give up every lease and the membership so the others rebalance right away"""
+        with self._engine().begin() as conn:
+            conn.execute(
+                update(ShardLease)
+                .where(ShardLease.group == self.group, ShardLease.owner == self.worker_id)
+                .values(owner=None, lease_until=None)
+            )
+            conn.execute(
+                delete(ShardMember)
+                .where(and_(ShardMember.group == self.group, ShardMember.worker_id == self.worker_id))
+            )
+
+class ShardHeartbeat(Thread):
+    """Keeps a worker's membership and leases fresh while it is busy with a long shard"""
+
+    def __init__(self, leases: ShardLeaseManager):
+        super().__init__(name=f'shard-heartbeat-{leases.group}', daemon=True)
+        self.leases = leases
+        self._stopped = Event()
+
+    def run(self):
+        while not self._stopped.wait(self.leases.lease_seconds / 3):
+            try:
+                self.leases.heartbeat()
+            except Exception as e:
+                logger.error(f"Error renewing {self.leases.group} shard leases: {e}")
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
@@ -0,0 +1,156 @@
+import os
+import time
+import logging
+from collections import namedtuple
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, Optional
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Statements at least this slow are logged and kept per endpoint
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+# Also run EXPLAIN for slow SELECTs and keep the plan
+EXPLAIN_SLOW_QUERIES = os.environ.get('EXPLAIN_SLOW_QUERIES', 'false').lower() == 'true'
+# Slowest statements kept per endpoint
+SLOWEST_KEPT = 5
+
+SlowStatement = namedtuple('SlowStatement', ['ms', 'statement', 'path', 'at', 'plan'])
+
+class EndpointStats:
+    """Running SQL totals for one endpoint"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.db_ms = 0.0
+        self.total_ms = 0.0
+        self.slowest: List[SlowStatement] = []
+
+    @property
+    def avg_statements(self) -> float:
+        return self.statements / self.requests if self.requests else 0
+
+    @property
+    def avg_db_ms(self) -> float:
+        return self.db_ms / self.requests if self.requests else 0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.requests if self.requests else 0
+
+class SQLProfiler:
+    """
+    Counts and times the SQL statements each request runs, using engine
+    cursor events, and keeps per-endpoint totals and the slowest statements
+    for the /_perf page. Every response gets a Server-Timing header with the
+    request's DB time and statement count.
+
+    Totals are per process; with several gunicorn workers each keeps its own.
+    Statements run outside a request (background threads, streamed response
+    bodies) are not counted.
+    """
+
+    def __init__(self, slow_ms: float = None, explain: bool = None):
+        self.slow_ms = SLOW_QUERY_MS if slow_ms is None else slow_ms
+        self.explain = EXPLAIN_SLOW_QUERIES if explain is None else explain
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.since = datetime.utcnow()
+        self._lock = Lock()
+
+    def init_app(self, app):
+        event.listen(Engine, 'before_cursor_execute', self._before_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.sql_statements = g.get('sql_statements', 0) + 1
+            context._profiler_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_profiler_started', None)
+        if started is None or not has_request_context():
+            return
+        ms = (time.perf_counter() - started) * 1000
+        g.sql_ms = g.get('sql_ms', 0.0) + ms
+
+        if ms >= self.slow_ms:
+            plan = self._explain(conn, statement, parameters) if self.explain and not executemany else None
+            g.setdefault('sql_slow', []).append(
+                SlowStatement(ms, statement, request.path, datetime.utcnow(), plan)
+            )
+            logger.warning(f"Slow SQL ({ms:.0f} ms) in {request.endpoint}: {statement[:300]}"
+                           + (f"\n{plan}" if plan else ""))
+
+    def _explain(self, conn, statement: str, parameters) -> Optional[str]:
+        """The plan for a slow SELECT, run on the raw DBAPI cursor so it isn't profiled itself"""
+        if not statement.lstrip().upper().startswith('SELECT'):
+            return None
+        dialect = conn.dialect.name
+        prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+        cursor = conn.connection.cursor()
+        try:
+            # A failed EXPLAIN must not abort the request's transaction
+            if dialect == 'postgresql':
+                cursor.execute('SAVEPOINT sql_profiler_explain')
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            finally:
+                if dialect == 'postgresql':
+                    cursor.execute('ROLLBACK TO SAVEPOINT sql_profiler_explain')
+            return '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+        except Exception as e:
+            logger.debug(f"Could not EXPLAIN slow statement: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def _start_request(self):
+        g.request_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        started = g.get('request_started')
+        if started is None or request.endpoint in (None, 'static'):
+            return response
+
+        total_ms = (time.perf_counter() - started) * 1000
+        statements = g.get('sql_statements', 0)
+        db_ms = g.get('sql_ms', 0.0)
+        response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{statements} queries"')
+        response.headers.add('Server-Timing', f'app;dur={total_ms:.1f}')
+
+        with self._lock:
+            stats = self.endpoints.get(request.endpoint)
+            if stats is None:
+                stats = self.endpoints[request.endpoint] = EndpointStats(request.endpoint)
+            stats.requests += 1
+            stats.statements += statements
+            stats.max_statements = max(stats.max_statements, statements)
+            stats.db_ms += db_ms
+            stats.total_ms += total_ms
+            slow = g.get('sql_slow')
+            if slow:
+                stats.slowest = sorted(stats.slowest + slow, key=lambda s: s.ms, reverse=True)[:SLOWEST_KEPT]
+        return response
+
+    def snapshot(self) -> List[EndpointStats]:
+        """Endpoint totals, most DB time first"""
+        with self._lock:
+            return sorted(self.endpoints.values(), key=lambda s: s.db_ms, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.since = datetime.utcnow()
+
+# Initialize global profiler instance
+sql_profiler = SQLProfiler()
@@ -0,0 +1,130 @@
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Iterable, List, Tuple
+
+# Variables a ReviewTemplate subject or message may use
+PLACEHOLDERS = ('customer_name', 'business_name', 'review_link')
+
+_TOKEN = re.compile(r'\{\{|\}\}|\{([^{}]*)\}|[{}]')
+
+class TemplateError(ValueError):
+    """A template uses an unknown placeholder or has unbalanced braces"""
+
+class CompiledText:
+    """
+    A subject or message parsed once into a %-style format string, so
+    rendering is a single C-level string operation. Braces are escaped
+    {{ and }} as with str.format.
+    """
+
+    __slots__ = ('source', 'format', 'fields')
+
+    def __init__(self, source: str, strict: bool = False):
+        self.source = source
+        self.fields = []
+        parts = []
+        position = 0
+
+        for match in _TOKEN.finditer(source):
+            parts.append(source[position:match.start()].replace('%', '%%'))
+            position = match.end()
+            token = match.group()
+
+            if token == '{{':
+                parts.append('{')
+            elif token == '}}':
+                parts.append('}')
+            elif match.group(1) is not None and match.group(1).strip() in PLACEHOLDERS:
+                name = match.group(1).strip()
+                parts.append(f'%({name})s')
+                if name not in self.fields:
+                    self.fields.append(name)
+            elif strict:
+                if match.group(1) is None:
+                    raise TemplateError(f"Unmatched '{token}' - use '{token}{token}' for a literal brace")
+                raise TemplateError(
+                    f"Unknown placeholder {token} - use "
+                    + ", ".join(f"{{{name}}}" for name in PLACEHOLDERS)
+                )
+            else:
+                # Templates saved before validation render the text as written
+                parts.append(token.replace('%', '%%'))
+
+        parts.append(source[position:].replace('%', '%%'))
+        self.format = ''.join(parts)
+
+    def render(self, values: Dict[str, str]) -> str:
+        return self.format % values
+
+class CompiledTemplate:
+    """Compiled subject and message of one ReviewTemplate"""
+
+    __slots__ = ('subject', 'message')
+
+    def __init__(self, subject: str, message: str):
+        self.subject = CompiledText(subject or '')
+        self.message = CompiledText(message or '')
+
+    def render(self, customer_name: str, business_name: str, review_link: str) -> Tuple[str, str]:
+        values = {'customer_name': customer_name, 'business_name': business_name, 'review_link': review_link}
+        return self.subject.render(values), self.message.render(values)
+
+    def render_many(self, rows: Iterable[Dict[str, str]]) -> List[Tuple[str, str]]:
+        """Render (subject, message) for every row of placeholder values"""
+        message = self.message.format
+        if not self.subject.fields:
+            subject = self.subject.render({})
+            return [(subject, message % row) for row in rows]
+        subject = self.subject.format
+        return [(subject % row, message % row) for row in rows]
+
+@lru_cache(maxsize=1024)
+def compile_text(source: str) -> CompiledText:
+    """Compiled form of a raw template string, cached by its content"""
+    return CompiledText(source)
+
+def validate(text: str) -> None:
+    """Raise TemplateError if text uses anything but the supported placeholders"""
+    CompiledText(text, strict=True)
+
+class TemplateCache:
+    """LRU of compiled templates keyed by template ID and updated_at"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, template) -> CompiledTemplate:
+        if template.id is None:
+            return CompiledTemplate(template.subject, template.message)
+
+        key = (template.id, template.updated_at)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+
+        compiled = CompiledTemplate(template.subject, template.message)
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+# Initialize global cache instance
+template_cache = TemplateCache()
+
+def render(template, customer_name: str, business_name: str, review_link: str) -> Tuple[str, str]:
+    """Render (subject, message) of a ReviewTemplate for one customer"""
+    return template_cache.get(template).render(customer_name, business_name, review_link)
+
+def render_many(template, rows: Iterable[Dict[str, str]]) -> List[Tuple[str, str]]:
+    """
+    Render (subject, message) of a ReviewTemplate for many customers at once.
+    Each row maps customer_name, business_name and review_link to values.
+    """
+    return template_cache.get(template).render_many(rows)
@@ -0,0 +1,83 @@
+import os
+import time
+import logging
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from typing import Optional
+
+from flask_login import UserMixin
+
+from app import db
+from models import User
+
+logger = logging.getLogger(__name__)
+
+# How long a cached user may be served, and how many are kept per process
+USER_CACHE_SECONDS = float(os.environ.get('USER_CACHE_SECONDS', 60))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+
+class UserSnapshot(namedtuple('UserSnapshot', 'id username email business_name google_business_url '
+                                             'created_at is_active'), UserMixin):
+    """
+    Read-only copy of the User fields requests read, used as current_user so
+    an authenticated request does not have to load the user row. The
+    relationships and record() load the real row on first use; the session's
+    identity map keeps it for the rest of the request.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, user: User) -> 'UserSnapshot':
+        return cls(user.id, user.username, user.email, user.business_name, user.google_business_url,
+                   user.created_at, user.is_active is not False)
+
+    def record(self) -> Optional[User]:
+        """The User row, for changing it"""
+        return db.session.get(User, self.id)
+
+    @property
+    def customers(self):
+        return self.record().customers
+
+    @property
+    def reviews(self):
+        return self.record().reviews
+
+    @property
+    def templates(self):
+        return self.record().templates
+
+_users = OrderedDict()
+_lock = Lock()
+
+def load_cached_user(user_id: int) -> Optional[UserSnapshot]:
+    """
+    Snapshot of a user, read from the database at most once per
+    USER_CACHE_SECONDS per process. Unknown users are not cached.
+    """
+    now = time.monotonic()
+    with _lock:
+        hit = _users.get(user_id)
+        if hit and hit[0] > now:
+            _users.move_to_end(user_id)
+            return hit[1]
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    snapshot = UserSnapshot.of(user)
+    with _lock:
+        _users[user_id] = (now + USER_CACHE_SECONDS, snapshot)
+        _users.move_to_end(user_id)
+        while len(_users) > USER_CACHE_SIZE:
+            _users.popitem(last=False)
+    return snapshot
+
+def invalidate_user(user_id: int):
+    """
+    Drop a user's snapshot after changing the row. Other processes keep
+    theirs until it expires.
+    """
+    with _lock:
+        _users.pop(user_id, None)
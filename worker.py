@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Standalone worker for scheduled jobs, run separately from the web process.
+
+Set SCHEDULER_IN_WEB=false on the web service so only workers poll for jobs.
+Several workers can run at once; each due job is leased to one of them, and
+follow-up processing is split between them by tenant shard.
+
+Usage: python worker.py [--once] [--list]
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# Jobs run here, not in the background thread the web app starts
+os.environ['SCHEDULER_IN_WEB'] = 'false'
+
+from app import app
+from automation_service import follow_up_worker  # also registers the recurring jobs
+from models import ScheduledJob, ShardLease
+from scheduler_service import job_scheduler
+from email_outbox_service import outbox_worker
+
+logger = logging.getLogger(__name__)
+
+def list_jobs():
+    for job in ScheduledJob.query.order_by(ScheduledJob.name).all():
+        state = 'enabled' if job.enabled else 'disabled'
+        print(f"{job.name:32} {job.schedule:16} {state:9} next {job.next_run_at}  "
+              f"last {job.last_status or '-'} at {job.last_run_at or '-'}  runs {job.run_count or 0}")
+
+    owners = {}
+    for lease in ShardLease.query.filter_by(group=follow_up_worker.GROUP).order_by(ShardLease.shard).all():
+        owners.setdefault(lease.owner or 'unassigned', []).append(lease.shard)
+    for owner, shards in owners.items():
+        print(f"follow-up shards {shards} held by {owner}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ReviewPilot scheduled jobs")
+    parser.add_argument("--once", action="store_true", help="run the jobs that are due now and exit")
+    parser.add_argument("--list", action="store_true", help="show scheduled jobs and exit")
+    args = parser.parse_args()
+
+    with app.app_context():
+        job_scheduler.ensure_jobs()
+
+        if args.list:
+            list_jobs()
+            return 0
+
+        if args.once:
+            claimed = job_scheduler.run_due_jobs()
+            sent = follow_up_worker.run_round()
+            follow_up_worker.leases.leave()
+            emails = outbox_worker.drain()
+            logger.info(f"Ran {claimed} due job(s), sent {sent} follow-up(s), handled {emails} queued email(s)")
+            return 0
+
+        follow_up_worker.start()
+        try:
+            job_scheduler.run_forever()
+        except KeyboardInterrupt:
+            job_scheduler.stop()
+            follow_up_worker.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())